@@ -5,6 +5,8 @@ import os
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    from app.services.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Context processor for Firebase config
     @app.context_processor
@@ -39,4 +41,8 @@ def create_app():
     app.register_blueprint(chatbot_bp)
     app.register_blueprint(emergency_chat_bp)
     
+    # Priorité aux alertes sous charge (voies d'admission + délestage)
+    from app.services.admission import install_admission
+    install_admission(app)
+    
     return app
\ No newline at end of file
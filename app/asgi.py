@@ -0,0 +1,268 @@
+"""
+Mode de service ASGI (SERVER_MODE=asgi) :
+- les routes réécrites en asyncio (géocodage : HTTP asynchrone) tournent directement sur la boucle,
+  sans thread : ce sont les seules dont le nombre de requêtes en vol n'est pas borné par un pool ;
+- les routes dominées par les attentes réseau (création d'alerte, chatbots : ORS, Photon, Groq,
+  Infermedica) passent par l'adaptateur WSGI avec un pool de threads d'E/S dédié et large ;
+- les flux SSE de suivi occupent un thread pendant toute leur durée : ils ont leur propre pool,
+  des centaines de trackers ouverts ne peuvent pas bloquer POST /api/alert ;
+- tout le reste (pages, admin) passe par l'adaptateur avec un petit pool séparé.
+Les routes sont reconnues par correspondance exacte (expressions régulières sur tout le chemin) :
+un préfixe comme /api/alert engloberait aussi /api/alert/<id>/stream.
+Le reste de l'application restant synchrone, c'est un pont WSGI sur pools de threads : le gain
+porte sur l'isolation des pools et sur les routes natives, pas sur le nombre de threads.
+"""
+import asyncio
+import io
+import json
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config_settings import Config
+
+_END = object()
+
+
+def build_environ(scope, body):
+    """Environnement WSGI (PEP 3333) à partir d'un scope HTTP ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        # Corps déjà lu en entier (y compris envoi chunked) : la longueur réelle fait foi
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name in ('CONTENT_LENGTH', 'TRANSFER_ENCODING'):
+            continue
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class WsgiBridge:
+    """
+    Adaptateur WSGI -> ASGI : l'application Flask tourne dans `executor`, la réponse est
+    renvoyée morceau par morceau (les flux SSE restent en streaming). Une déconnexion du
+    client arrête l'itération et ferme la réponse WSGI.
+    """
+
+    def __init__(self, wsgi_app, executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send, body=None):
+        if body is None:
+            body = await read_body(receive)
+            if body is None:
+                return
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return lambda data: started.setdefault('early', []).append(data)
+
+        def call_app():
+            result = self.wsgi_app(environ, start_response)
+            return result, iter(result)
+
+        result, chunks = await loop.run_in_executor(self.executor, call_app)
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            first = await loop.run_in_executor(self.executor, next, chunks, _END)
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            for early in started.get('early', []):
+                await send({'type': 'http.response.body', 'body': early, 'more_body': True})
+            chunk = first
+            while chunk is not _END and not disconnected.is_set():
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, _END)
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            watcher.cancel()
+            close = getattr(result, 'close', None)
+            if close:
+                await loop.run_in_executor(self.executor, close)
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _route_matcher(patterns):
+    """Expressions régulières de chemins -> fonction de correspondance exacte (chemin entier)"""
+    if not patterns:
+        return lambda path: False
+    regex = re.compile('^(?:' + '|'.join(f'(?:{p})' for p in patterns) + ')$')
+    return lambda path: regex.match(path) is not None
+
+
+class AsgiApp:
+    """
+    Point d'entrée ASGI : routes natives asynchrones, puis adaptateur WSGI (pool des flux pour
+    ASGI_STREAM_ROUTES, pool d'E/S pour ASGI_IO_ROUTES, pool standard pour le reste).
+    """
+
+    def __init__(self, flask_app, io_threads=None, wsgi_threads=None, io_routes=None,
+                 stream_threads=None, stream_routes=None):
+        self.flask_app = flask_app
+        self.is_io = _route_matcher(io_routes if io_routes is not None else Config.ASGI_IO_ROUTES)
+        self.is_stream = _route_matcher(stream_routes if stream_routes is not None else Config.ASGI_STREAM_ROUTES)
+        self.io_threads = io_threads or Config.ASGI_IO_THREADS
+        self.wsgi_threads = wsgi_threads or Config.ASGI_WSGI_THREADS
+        self.stream_threads = stream_threads or Config.ASGI_STREAM_THREADS
+        self.io_pool = ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix='asgi-io')
+        self.wsgi_pool = ThreadPoolExecutor(max_workers=self.wsgi_threads, thread_name_prefix='asgi-wsgi')
+        self.stream_pool = ThreadPoolExecutor(max_workers=self.stream_threads, thread_name_prefix='asgi-sse')
+        self.io_bridge = WsgiBridge(flask_app.wsgi_app, self.io_pool)
+        self.wsgi_bridge = WsgiBridge(flask_app.wsgi_app, self.wsgi_pool)
+        self.stream_bridge = WsgiBridge(flask_app.wsgi_app, self.stream_pool)
+        self.routes = []
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._http = None
+
+    def route(self, method, pattern):
+        """Enregistre un gestionnaire natif : handler(scope, body, send, **groupes)"""
+        def decorator(handler):
+            self.routes.append((method, re.compile(f'^{pattern}$'), handler))
+            return handler
+        return decorator
+
+    def http_client(self):
+        """Client HTTP asynchrone partagé (connexions réutilisées entre requêtes)"""
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(limits=httpx.Limits(max_connections=Config.ASGI_HTTP_CONNECTIONS))
+        return self._http
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            for method, pattern, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match and scope['method'] == method:
+                    body = await read_body(receive)
+                    if body is not None:
+                        await handler(scope, body, send, **match.groupdict())
+                    return
+            await self.bridge_for(scope['path'])(scope, receive, send)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def bridge_for(self, path):
+        if self.is_stream(path):
+            return self.stream_bridge
+        if self.is_io(path):
+            return self.io_bridge
+        return self.wsgi_bridge
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._http is not None:
+                    await self._http.aclose()
+                self.io_pool.shutdown(wait=False)
+                self.wsgi_pool.shutdown(wait=False)
+                self.stream_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': self.in_flight, 'peak_in_flight': self.peak_in_flight,
+                    'io_threads': self.io_threads, 'wsgi_threads': self.wsgi_threads,
+                    'stream_threads': self.stream_threads}
+
+
+def create_asgi_app(flask_app=None, geolocation_service=None):
+    """Application ASGI : routes asynchrones natives + blueprints Flask existants"""
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    asgi = AsgiApp(flask_app)
+
+    @asgi.route('POST', '/api/geocode')
+    async def geocode(scope, body, send):
+        # Même contrat que api.geocode_address, sans thread bloqué pendant Photon / Nominatim
+        nonlocal geolocation_service
+        if geolocation_service is None:
+            from app.services.geolocation import GeolocationService
+            geolocation_service = GeolocationService()
+        try:
+            data = json.loads(body or b'{}')
+            address = (data.get('address') or '').strip()
+            if not address:
+                return await send_json(send, {'success': False, 'error': 'No address provided'}, 400)
+            print(f'[Geocode API] Received address: {address}')
+            result = await geolocation_service.geocode_address_async(address, client=asgi.http_client())
+            if result and result.get('lat') and result.get('lng'):
+                return await send_json(send, {'success': True, 'lat': result['lat'], 'lng': result['lng'],
+                                              'display_name': result.get('display_name', address)})
+            return await send_json(send, {'success': False, 'error': 'Could not geocode address'}, 400)
+        except Exception as e:
+            print(f'[Geocode API] Exception: {str(e)}')
+            return await send_json(send, {'error': str(e)}, 500)
+
+    @asgi.route('GET', '/api/asgi/stats')
+    async def stats(scope, body, send):
+        await send_json(send, asgi.stats())
+
+    return asgi
@@ -24,11 +24,157 @@ class Config:
     
     # ORS Configuration
     ORS_BASE_URL = "https://api.openrouteservice.org"
-    
+    ORS_TIMEOUT_SECONDS = float(os.environ.get('ORS_TIMEOUT_SECONDS') or 10)
+    ORS_CACHE_SIZE = int(os.environ.get('ORS_CACHE_SIZE') or 2048)
+    ORS_CACHE_TTL = float(os.environ.get('ORS_CACHE_TTL') or 3600)
+    GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE') or 1024)
+    GEOCODE_CACHE_TTL = float(os.environ.get('GEOCODE_CACHE_TTL') or 86400)
+
+    # Alert creation SLA: the alert is acknowledged within this budget (seconds),
+    # slow stages fall back to cached / local / straight-line results
+    ALERT_SLA_SECONDS = float(os.environ.get('ALERT_SLA_SECONDS') or 2.0)
+
+    # Alert form pre-warming (/api/alert/prepare): token lifetime, budget, max location drift at submit
+    ALERT_PREPARE_TTL = float(os.environ.get('ALERT_PREPARE_TTL') or 120)
+    ALERT_PREPARE_SECONDS = float(os.environ.get('ALERT_PREPARE_SECONDS') or 5)
+    ALERT_PREPARE_MAX_TOKENS = int(os.environ.get('ALERT_PREPARE_MAX_TOKENS') or 10000)
+    ALERT_PREPARE_MAX_DRIFT_KM = float(os.environ.get('ALERT_PREPARE_MAX_DRIFT_KM') or 0.3)
+
+    # Dispatch scoring ('nearest' or 'capacity'); capacity adds a penalty (km) to hospitals without free beds
+    DISPATCH_SCORING = os.environ.get('DISPATCH_SCORING') or 'nearest'
+    DISPATCH_FULL_PENALTY_KM = float(os.environ.get('DISPATCH_FULL_PENALTY_KM') or 15)
+
     # Abstract API Configuration
     ABSTRACT_API_URL = "https://ipgeolocation.abstractapi.com/v1/"
     
     # Infermedica Configuration
     INFERMEDICA_APP_ID = os.environ.get('INFERMEDICA_APP_ID')
     INFERMEDICA_APP_KEY = os.environ.get('INFERMEDICA_APP_KEY')
-    INFERMEDICA_API_URL = os.environ.get('INFERMEDICA_API_URL') or 'https://api.infermedica.com/v3'
\ No newline at end of file
+    INFERMEDICA_API_URL = os.environ.get('INFERMEDICA_API_URL') or 'https://api.infermedica.com/v3'
+
+    # Fleet Coverage Configuration
+    COVERAGE_MINUTES = float(os.environ.get('COVERAGE_MINUTES') or 10)
+    COVERAGE_CELL_KM = float(os.environ.get('COVERAGE_CELL_KM') or 1.0)
+    # Demand history used by the coverage grid: last N days, at most N alerts
+    COVERAGE_HISTORY_DAYS = float(os.environ.get('COVERAGE_HISTORY_DAYS') or 90)
+    COVERAGE_HISTORY_LIMIT = int(os.environ.get('COVERAGE_HISTORY_LIMIT') or 5000)
+
+    # Dispatch Worker Configuration
+    DISPATCH_MAX_QUEUE = int(os.environ.get('DISPATCH_MAX_QUEUE') or 500)
+    DISPATCH_MAX_CONCURRENT = int(os.environ.get('DISPATCH_MAX_CONCURRENT') or 1000)
+
+    # Region sharding: dispatch nodes sharing the workflow queue (empty: one node handles every region).
+    # Regions are assigned to nodes by consistent hashing; another node's jobs are taken over
+    # (cross-border fallback) once they have waited DISPATCH_REGION_STEAL_SECONDS.
+    DISPATCH_NODES = [n for n in (os.environ.get('DISPATCH_NODES') or '').split(',') if n]
+    DISPATCH_NODE_ID = os.environ.get('DISPATCH_NODE_ID') or ''
+    DISPATCH_REGION_STEAL_SECONDS = float(os.environ.get('DISPATCH_REGION_STEAL_SECONDS') or 15)
+    DISPATCH_REGION_NEIGHBOURS = int(os.environ.get('DISPATCH_REGION_NEIGHBOURS') or 2)
+    # Regional catalog refresh (seconds): hospitals rarely change, the free fleet often
+    DISPATCH_CATALOG_TTL = float(os.environ.get('DISPATCH_CATALOG_TTL') or 300)
+    DISPATCH_FLEET_TTL = float(os.environ.get('DISPATCH_FLEET_TTL') or 5)
+    # An ambulance picked for an alert stays reserved until the reloaded fleet no longer lists it
+    # as available (marked busy by the workflow), at most this long (seconds)
+    DISPATCH_RESERVE_SECONDS = float(os.environ.get('DISPATCH_RESERVE_SECONDS') or 900)
+
+    # Durable Workflow Queue Configuration
+    WORKFLOW_QUEUE_BACKEND = os.environ.get('WORKFLOW_QUEUE_BACKEND') or 'sqlite'
+    WORKFLOW_QUEUE_PATH = os.environ.get('WORKFLOW_QUEUE_PATH') or os.path.join('data', 'workflow_queue.sqlite3')
+    WORKFLOW_LEASE_SECONDS = float(os.environ.get('WORKFLOW_LEASE_SECONDS') or 30)
+    WORKFLOW_POLL_INTERVAL = float(os.environ.get('WORKFLOW_POLL_INTERVAL') or 2)
+    WORKFLOW_MAX_ATTEMPTS = int(os.environ.get('WORKFLOW_MAX_ATTEMPTS') or 5)
+
+    # Workflow Clock ('real' | 'accelerated' | 'virtual') ; 'virtual' : simulation seulement, refusé par le worker
+    CLOCK_MODE = os.environ.get('CLOCK_MODE') or 'real'
+    CLOCK_SPEEDUP = float(os.environ.get('CLOCK_SPEEDUP') or 10)
+
+    # Firestore I/O pool used by async code (orchestrator, hospital / ambulance services)
+    FIRESTORE_IO_WORKERS = int(os.environ.get('FIRESTORE_IO_WORKERS') or 16)
+
+    # Alert Write Coalescing (position updates flushed at most every N ms)
+    ALERT_WRITE_FLUSH_MS = float(os.environ.get('ALERT_WRITE_FLUSH_MS') or 10000)
+
+    # Incremental ETA (ORS re-route only beyond this deviation from the route)
+    ETA_REROUTE_DEVIATION_KM = float(os.environ.get('ETA_REROUTE_DEVIATION_KM') or 0.3)
+    ETA_WRITE_DELTA_MIN = float(os.environ.get('ETA_WRITE_DELTA_MIN') or 1)
+    # Roles allowed to post ambulance GPS fixes (crew devices, admins)
+    TELEMETRY_ROLES = [r.strip() for r in (os.environ.get('TELEMETRY_ROLES') or 'ambulancier,admin').split(',') if r.strip()]
+
+    # Alert tracking stream (Server-Sent Events)
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS') or 15)
+    SSE_HISTORY = int(os.environ.get('SSE_HISTORY') or 200)
+
+    # Versioned alert reads (ETag / 304, ?since=<version> deltas)
+    ALERT_VERSION_CACHE_ALERTS = int(os.environ.get('ALERT_VERSION_CACHE_ALERTS') or 2000)
+    ALERT_VERSION_CACHE_DEPTH = int(os.environ.get('ALERT_VERSION_CACHE_DEPTH') or 8)
+
+    # Active / recent alerts view (in-memory, optional Firestore listener for multi-instance setups)
+    ALERT_INDEX_RECENT = int(os.environ.get('ALERT_INDEX_RECENT') or 500)
+    ALERT_INDEX_LISTENER = (os.environ.get('ALERT_INDEX_LISTENER') or 'false').lower() in ('1', 'true', 'yes')
+    ALERT_INDEX_LISTENER_HOURS = float(os.environ.get('ALERT_INDEX_LISTENER_HOURS') or 24)
+
+    # Mass-casualty batch intake (POST /api/alerts/batch)
+    BATCH_MAX_PATIENTS = int(os.environ.get('BATCH_MAX_PATIENTS') or 50)
+    BATCH_MAX_PER_HOSPITAL = int(os.environ.get('BATCH_MAX_PER_HOSPITAL') or 4)
+
+    # Duplicate alert suppression (Idempotency-Key, same user + same area within a short window)
+    IDEMPOTENCY_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS') or 86400)
+    DUPLICATE_WINDOW_SECONDS = float(os.environ.get('DUPLICATE_WINDOW_SECONDS') or 120)
+    DUPLICATE_CELL_KM = float(os.environ.get('DUPLICATE_CELL_KM') or 0.2)
+
+    # Serving mode: 'wsgi' (Flask dev server) or 'asgi' (uvicorn, see app/asgi.py)
+    SERVER_MODE = os.environ.get('SERVER_MODE') or 'wsgi'
+    # One worker by default: duplicate suppression, prepared alert tokens, the alert index and the
+    # SSE event bus are process-local; more workers would each see only part of that state
+    ASGI_WORKERS = int(os.environ.get('ASGI_WORKERS') or 1)
+    ASGI_IO_THREADS = int(os.environ.get('ASGI_IO_THREADS') or 256)
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or 32)
+    ASGI_STREAM_THREADS = int(os.environ.get('ASGI_STREAM_THREADS') or 1024)
+    ASGI_HTTP_CONNECTIONS = int(os.environ.get('ASGI_HTTP_CONNECTIONS') or 200)
+    # Full-path regular expressions (exact match): network-bound routes, long-lived SSE streams
+    ASGI_IO_ROUTES = [r for r in (os.environ.get('ASGI_IO_ROUTES') or
+                                  '/api/alert,/api/alert/prepare,/api/alerts/batch,'
+                                  '/api/chatbot/.*,/api/chat(/.*)?').split(',') if r]
+    ASGI_STREAM_ROUTES = [r for r in (os.environ.get('ASGI_STREAM_ROUTES') or
+                                      '/api/alert/[^/]+/stream').split(',') if r]
+
+    # Admission control: lane -> (max concurrent requests, max queue wait in seconds, shed at pressure level)
+    ADMISSION_LANES = {
+        'critical': (int(os.environ.get('ADMISSION_CRITICAL_LIMIT') or 64),
+                     float(os.environ.get('ADMISSION_CRITICAL_TIMEOUT') or 10), None),
+        'triage': (int(os.environ.get('ADMISSION_TRIAGE_LIMIT') or 16),
+                   float(os.environ.get('ADMISSION_TRIAGE_TIMEOUT') or 5), None),
+        'general': (int(os.environ.get('ADMISSION_GENERAL_LIMIT') or 8),
+                    float(os.environ.get('ADMISSION_GENERAL_TIMEOUT') or 1), 1),
+        'admin': (int(os.environ.get('ADMISSION_ADMIN_LIMIT') or 4),
+                  float(os.environ.get('ADMISSION_ADMIN_TIMEOUT') or 2), 2),
+    }
+    # Adaptive shedding thresholds: dispatch queue fill ratio, LLM latency (moving average)
+    SHED_QUEUE_RATIO = float(os.environ.get('SHED_QUEUE_RATIO') or 0.6)
+    SHED_LLM_LATENCY_SECONDS = float(os.environ.get('SHED_LLM_LATENCY_SECONDS') or 8)
+    # Half-life (seconds) of the LLM latency average when no new call is observed
+    SHED_LLM_HALF_LIFE = float(os.environ.get('SHED_LLM_HALF_LIFE') or 30)
+    SHED_RETRY_AFTER = int(os.environ.get('SHED_RETRY_AFTER') or 10)
+
+    # Dumps JSON complets de chaque agent dans les logs de la crew (coûteux : désactivé par défaut)
+    CREW_JSON_LOGS = (os.environ.get('CREW_JSON_LOGS') or 'false').lower() in ('1', 'true', 'yes')
+    # Contexte des prompts de la crew : champs déclarés par tâche, sans géométrie, budget de tokens par agent
+    CREW_CONTEXT_PROJECTION = (os.environ.get('CREW_CONTEXT_PROJECTION') or 'true').lower() in ('1', 'true', 'yes')
+    CREW_CONTEXT_TOKENS = int(os.environ.get('CREW_CONTEXT_TOKENS') or 600)
+    # Mesure du contexte historique (json.dumps(indent=2) de tout) pour le rapport de réduction : coûteux, désactivé par défaut
+    CREW_CONTEXT_COMPARE = (os.environ.get('CREW_CONTEXT_COMPARE') or 'false').lower() in ('1', 'true', 'yes')
+
+    # LLM response cache (exact match on model, temperature, normalized messages) shared by every Groq call.
+    # LLM_CACHE_PATH: optional SQLite file kept across restarts and processes (empty: memory only)
+    LLM_CACHE_ENABLED = (os.environ.get('LLM_CACHE_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    LLM_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE') or 1000)
+    LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL') or 3600)
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or ''
+
+    # Workflow Phase Timeouts (seconds)
+    PHASE_TIMEOUTS = {
+        'hospital': float(os.environ.get('PHASE_TIMEOUT_HOSPITAL') or 15),
+        'ambulance': float(os.environ.get('PHASE_TIMEOUT_AMBULANCE') or 10),
+        'routes': float(os.environ.get('PHASE_TIMEOUT_ROUTES') or 20),
+        'specialist': float(os.environ.get('PHASE_TIMEOUT_SPECIALIST') or 45),
+    }
\ No newline at end of file
@@ -0,0 +1,175 @@
+import contextvars
+import json
+from app.config_settings import Config
+from app.services.serialization import dumps
+
+# Géométries et tableaux de points : inutiles au raisonnement des agents, l'essentiel du volume
+GEOMETRY_KEYS = {
+    'coordinates', 'geometry', 'route_geometry', 'trajectory_geometry', 'polyline_route',
+    'polyline_encodee', 'points_passage', 'route_coordinates', 'cum_km', 'cum_s', 'bounds',
+}
+
+# Champs utiles à chaque tâche, par source (résultat d'agent ou donnée calculée), dans l'ordre
+# de priorité : quand le budget est atteint, les dernières sources sont tronquées puis omises.
+# Si aucun des champs déclarés n'est présent (sortie LLM hors format), la source est reprise
+# entière, géométries exclues.
+CONTEXT_FIELDS = {
+    'analyse_medicale_d_urgence': {
+        'alert': ['patient_data', 'alerte_patient', 'localisation.adresse_detectee', 'localisation.source'],
+    },
+    'triage_patients_et_selection_ambulance': {
+        'medical': ['triage_medical'],
+        'nearest_hospital': ['id', 'name', 'service', 'distance_km', 'eta_minutes', 'locality'],
+    },
+    'valider_la_demande_du_coordonnateur': {
+        'route': ['distance_km', 'duration_min'],
+        'coordinator': ['decision_operationnelle', 'selected_hospital.name', 'selected_hospital.distance_km',
+                        'selected_hospital.eta_minutes'],
+    },
+    'recevoir_les_patients': {
+        'medical': ['triage_medical'],
+        'ambulance': ['logistique.eta_hopital_minutes', 'logistique.segment_retour', 'logistique.temps_total_mission_min',
+                      'logistique.heure_arrivee_estimee_hopital', 'logistique.heure_arrivee_estimee'],
+    },
+    'traitement_du_specialiste': {
+        'medical': ['triage_medical'],
+    },
+    'consolider_dossier_pour_ui': {
+        'medical': ['triage_medical.niveau_gravite', 'triage_medical.type_vecteur_requis',
+                    'triage_medical.specialite_requise', 'triage_medical.score_ccmu'],
+        'coordinator': ['decision_operationnelle', 'selected_hospital.name', 'selected_hospital.service',
+                        'selected_hospital.distance_km', 'selected_hospital.eta_minutes'],
+        'ambulance': ['logistique'],
+        'hospital': ['accueil_hopital', 'preparation_hopital'],
+        'specialist': ['support_clinique'],
+        'alert': ['patient_data.nom', 'patient_data.age', 'patient_data.sexe'],
+    },
+}
+
+# Budget de contexte (tokens) par tâche ; CREW_CONTEXT_TOKENS par défaut
+CONTEXT_BUDGETS = {
+    'consolider_dossier_pour_ui': 1200,
+}
+
+# Relevé du passage de crew en cours : hérité par les tâches asyncio des agents, propre à chaque passage
+_run_usage = contextvars.ContextVar('crew_context_usage', default=None)
+
+
+def estimate_tokens(text):
+    """Estimation sans tokenizer : ~4 caractères par token (texte FR / JSON)"""
+    return (len(text) + 3) // 4
+
+
+def strip_geometry(value):
+    if isinstance(value, dict):
+        return {k: strip_geometry(v) for k, v in value.items() if k not in GEOMETRY_KEYS}
+    if isinstance(value, list):
+        return [strip_geometry(v) for v in value]
+    return value
+
+
+def _get(value, path):
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _set(target, path, value):
+    keys = path.split('.')
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    target[keys[-1]] = value
+
+
+def project(value, fields):
+    """Sous-ensemble déclaré d'un résultat ; tout le résultat (sans géométrie) si rien ne correspond"""
+    if not isinstance(value, dict):
+        return strip_geometry(value)
+    projected = {}
+    for path in fields:
+        found = _get(value, path)
+        if found is not None:
+            _set(projected, path, strip_geometry(found))
+    return projected or strip_geometry(value)
+
+
+class ContextProjector:
+    """
+    Contexte des prompts de la crew : pour chaque tâche, seulement les champs déclarés
+    (CONTEXT_FIELDS), sans géométrie, en JSON compact, dans un budget de tokens par agent.
+    Le relevé des tokens est propre à chaque passage (begin(), puis report(usage)) : deux passages
+    simultanés sur la même crew ne se mélangent pas. La taille du contexte historique
+    (json.dumps(indent=2) de tout) n'est calculée que si compare (CREW_CONTEXT_COMPARE).
+    """
+
+    def __init__(self, fields=None, budgets=None, default_budget=None, enabled=None, compare=None):
+        self.fields = fields or CONTEXT_FIELDS
+        self.budgets = budgets or CONTEXT_BUDGETS
+        self.default_budget = default_budget or Config.CREW_CONTEXT_TOKENS
+        self.enabled = Config.CREW_CONTEXT_PROJECTION if enabled is None else enabled
+        self.compare = Config.CREW_CONTEXT_COMPARE if compare is None else compare
+
+    @staticmethod
+    def begin():
+        """Nouveau passage : relevé vide, rattaché au contexte asyncio courant (et aux tâches qu'il lance)"""
+        usage = {}
+        _run_usage.set(usage)
+        return usage
+
+    @staticmethod
+    def _legacy(sources):
+        return ''.join(f"{name}: {json.dumps(value, indent=2, default=str)}\n" for name, value in sources.items())
+
+    def render(self, task_name, sources):
+        """sources : {nom: résultat} ; renvoie le texte de contexte à insérer dans le prompt"""
+        if not self.enabled:
+            legacy = self._legacy(sources)
+            self._record(task_name, legacy, legacy, False)
+            return legacy
+
+        declared = self.fields.get(task_name, {})
+        order = [name for name in declared if name in sources] + [name for name in sources if name not in declared]
+        budget = self.budgets.get(task_name, self.default_budget) * 4
+        lines, used, truncated = [], 0, False
+        for name in order:
+            value = project(sources[name], declared[name]) if name in declared else strip_geometry(sources[name])
+            line = f"{name}: {dumps(value)}\n"
+            if used + len(line) > budget:
+                room = budget - used - len(name) - 16
+                if room > 40:
+                    lines.append(line[:len(name) + 2 + room] + " …[tronqué]\n")
+                truncated = True
+                break
+            lines.append(line)
+            used += len(line)
+        text = ''.join(lines)
+        self._record(task_name, (lambda: self._legacy(sources)) if self.compare else None, text, truncated)
+        return text
+
+    @staticmethod
+    def _record(task_name, legacy, text, truncated):
+        usage = _run_usage.get()
+        if usage is None:
+            return
+        if callable(legacy):
+            legacy = legacy()
+        usage[task_name] = {
+            'legacy_tokens': estimate_tokens(legacy) if legacy is not None else None,
+            'tokens': estimate_tokens(text),
+            'truncated': truncated
+        }
+
+    @staticmethod
+    def report(usage):
+        """Tokens de contexte par tâche d'un passage ; réduction vs historique si elle a été mesurée"""
+        tokens = sum(entry['tokens'] for entry in usage.values())
+        compared = bool(usage) and all(entry['legacy_tokens'] is not None for entry in usage.values())
+        legacy = sum(entry['legacy_tokens'] for entry in usage.values()) if compared else None
+        return {
+            'tasks': {name: dict(entry) for name, entry in usage.items()},
+            'legacy_tokens': legacy,
+            'tokens': tokens,
+            'reduction': round(1 - tokens / legacy, 3) if legacy else None
+        }
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 import yaml
 import os
 from langchain_groq import ChatGroq
@@ -6,6 +9,34 @@ from app.services.hospital_service import HospitalService
 from app.services.ors_service import ORSService
 import json
 from datetime import datetime
+from app.services.serialization import dumps
+from app.services.workflow_dag import WorkflowDAG, Phase
+from app.crew.context_projector import ContextProjector
+from app.services.llm_cache import cached_ainvoke
+
+# Résultats renvoyés par execute_emergency_response (un par agent, dans l'ordre de la crew)
+AGENT_RESULTS = ('alert', 'medical', 'coordinator', 'ambulance', 'hospital', 'specialist', 'ui')
+
+# Noms des agents dans tasks.yaml / agents.yaml et leurs noms longs (rôles)
+AGENT_ALIASES = {
+    'agentpatient': 'emetteur_d_alerte',
+    'agentmedecinurgence': 'medical_regulation_ai_triage',
+    'agentcordonnateur': 'operational_regulation_chief',
+    'agentambulence': 'mobile_intervention_pilot',
+    'agenthopital': 'hospital_resource_manager',
+    'agentmedecinspecialiste': 'clinical_protocols_engine',
+    'agentadministratif': 'patient_interface_reporting'
+}
+
+# Tâches dont la sortie doit rester unique (identifiant d'alerte, horodatages) : hors cache LLM
+UNCACHED_TASKS = {'creer_l_alerte', 'consolider_dossier_pour_ui'}
+
+
+def _log_json(agent, result):
+    # Sortie JSON complète de l'agent, seulement si CREW_JSON_LOGS est activé
+    if Config.CREW_JSON_LOGS:
+        print(f"[{agent}] JSON Output:\n{dumps(result, indent=True)}\n", flush=True)
+
 
 class MediAlertCrew:
     def __init__(self):
@@ -16,6 +47,9 @@ class MediAlertCrew:
         )
         self.hospital_service = HospitalService()
         self.ors_service = ORSService()
+        self.projector = ContextProjector()
+        self._loop = None
+        self._loop_lock = threading.Lock()
         self._load_configurations()
     
     def _load_configurations(self):
@@ -32,78 +66,132 @@ class MediAlertCrew:
     
     def execute_emergency_response(self, inputs):
         """Execute the complete emergency response workflow"""
-        results = {}
-        
-        print("\n" + "="*70, flush=True)
-        print("  MEDIALERT SMA - SYSTÈME MULTI-AGENTS D'URGENCE MÉDICALE", flush=True)
-        print("="*70, flush=True)
-        print(f"\nPatient: {inputs.get('nom_prenom', 'N/A')}", flush=True)
-        print(f"Âge: {inputs.get('age', 'N/A')} ans", flush=True)
-        print(f"Sexe: {inputs.get('sexe', 'N/A')}", flush=True)
-        print(f"Symptômes: {inputs.get('symptomes', 'N/A')}", flush=True)
-        print(f"Localisation: {inputs.get('localisation', 'N/A')}", flush=True)
-        print("\n" + "-"*70 + "\n", flush=True)
-        
-        try:
-            # Task 1: Create Alert
+        return self._run(self.execute_emergency_response_async(inputs))
+
+    def _run(self, coro):
+        """Boucle asyncio dédiée à la crew (client LLM asynchrone réutilisé d'un appel à l'autre)"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='crew-llm', daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _build_pipeline(self, inputs):
+        """
+        Graphe des agents : chacun démarre dès que ses entrées sont prêtes.
+        - La recherche d'hôpital (Haversine + ORS) part en même temps que l'alerte.
+        - Le spécialiste ne dépend que de l'analyse médicale : il tourne pendant
+          coordination -> ambulance -> préparation hôpital.
+        """
+        async def alert(r):
             print("\n[AGENT PATIENT] Création de l'alerte...", flush=True)
-            alert_result = self._execute_task('creer_l_alerte', inputs)
-            results['alert'] = alert_result
-            print(f"[AGENT PATIENT] ✓ Alerte créée: {alert_result.get('alerte_patient', {}).get('id_alerte', 'N/A')}", flush=True)
-            print(f"[AGENT PATIENT] JSON Output:\n{json.dumps(alert_result, indent=2, ensure_ascii=False)}\n", flush=True)
-            
-            # Task 2: Medical Analysis
+            result = await self._execute_task('creer_l_alerte', inputs)
+            print(f"[AGENT PATIENT] ✓ Alerte créée: {result.get('alerte_patient', {}).get('id_alerte', 'N/A')}", flush=True)
+            _log_json("AGENT PATIENT", result)
+            return result
+
+        async def nearest_hospital(r):
+            # Default coordinates (Casablanca)
+            return await asyncio.to_thread(self.hospital_service.find_nearest_hospital, 33.5731, -7.5898)
+
+        async def medical(r):
             print("\n[AGENT MÉDECIN URGENCE] Analyse médicale en cours...", flush=True)
-            medical_result = self._execute_task('analyse_medicale_d_urgence', inputs, alert_result)
-            results['medical'] = medical_result
-            triage = medical_result.get('triage_medical', {})
+            result = await self._execute_task('analyse_medicale_d_urgence', inputs, {'alert': r['alert']})
+            triage = result.get('triage_medical', {})
             print(f"[AGENT MÉDECIN URGENCE] ✓ Niveau d'urgence: {triage.get('niveau_urgence', 'N/A')}", flush=True)
             print(f"[AGENT MÉDECIN URGENCE] ✓ Score CCMU: {triage.get('score_ccmu', 'N/A')}", flush=True)
             print(f"[AGENT MÉDECIN URGENCE] ✓ Type de vecteur: {triage.get('type_vecteur', 'N/A')}", flush=True)
-            print(f"[AGENT MÉDECIN URGENCE] JSON Output:\n{json.dumps(medical_result, indent=2, ensure_ascii=False)}\n", flush=True)
-            
-            # Task 3: Coordinator Decision (with hospital search)
+            _log_json("AGENT MÉDECIN URGENCE", result)
+            return result
+
+        async def coordinator(r):
             print("\n[AGENT COORDONNATEUR] Sélection hôpital et ambulance...", flush=True)
-            coordinator_result = self._execute_coordinator_task(inputs, alert_result, medical_result)
-            results['coordinator'] = coordinator_result
-            hospital = coordinator_result.get('selected_hospital', {})
+            result = await self._execute_coordinator_task(inputs, r['alert'], r['medical'], r['nearest_hospital'])
+            hospital = result.get('selected_hospital', {})
             print(f"[AGENT COORDONNATEUR] ✓ Hôpital sélectionné: {hospital.get('name', 'N/A')}", flush=True)
             print(f"[AGENT COORDONNATEUR] ✓ Distance: {hospital.get('distance_km', 'N/A')} km", flush=True)
             print(f"[AGENT COORDONNATEUR] ✓ ETA: {hospital.get('eta_minutes', 'N/A')} minutes", flush=True)
             print(f"[AGENT COORDONNATEUR] ✓ Localisation: {hospital.get('locality', 'N/A')}", flush=True)
-            print(f"[AGENT COORDONNATEUR] JSON Output:\n{json.dumps(coordinator_result, indent=2, ensure_ascii=False, default=str)}\n", flush=True)
-            
-            # Task 4: Ambulance Route Calculation
+            _log_json("AGENT COORDONNATEUR", result)
+            return result
+
+        async def ambulance(r):
             print("\n[AGENT AMBULANCE] Calcul de l'itinéraire...", flush=True)
-            ambulance_result = self._execute_ambulance_task(inputs, coordinator_result)
-            results['ambulance'] = ambulance_result
-            logistique = ambulance_result.get('logistique', {})
+            result = await self._execute_ambulance_task(inputs, r['coordinator'])
+            logistique = result.get('logistique', {})
             print(f"[AGENT AMBULANCE] ✓ ETA patient: {logistique.get('eta_patient_minutes', 'N/A')} minutes", flush=True)
             print(f"[AGENT AMBULANCE] ✓ ETA hôpital: {logistique.get('eta_hopital_minutes', 'N/A')} minutes", flush=True)
             print(f"[AGENT AMBULANCE] ✓ Distance totale: {logistique.get('distance_totale_km', 'N/A')} km", flush=True)
-            print(f"[AGENT AMBULANCE] JSON Output:\n{json.dumps(ambulance_result, indent=2, ensure_ascii=False, default=str)}\n", flush=True)
-            
-            # Task 5: Hospital Preparation
+            _log_json("AGENT AMBULANCE", result)
+            return result
+
+        async def hospital(r):
             print("\n[AGENT HÔPITAL] Préparation de l'accueil...", flush=True)
-            hospital_result = self._execute_task('recevoir_les_patients', inputs, medical_result, ambulance_result)
-            results['hospital'] = hospital_result
-            print(f"[AGENT HÔPITAL] ✓ Lit assigné: {hospital_result.get('preparation_hopital', {}).get('numero_lit', 'N/A')}", flush=True)
-            print(f"[AGENT HÔPITAL] JSON Output:\n{json.dumps(hospital_result, indent=2, ensure_ascii=False)}\n", flush=True)
-            
-            # Task 6: Specialist Protocols
+            result = await self._execute_task('recevoir_les_patients', inputs,
+                                              {'medical': r['medical'], 'ambulance': r['ambulance']})
+            print(f"[AGENT HÔPITAL] ✓ Lit assigné: {result.get('preparation_hopital', {}).get('numero_lit', 'N/A')}", flush=True)
+            _log_json("AGENT HÔPITAL", result)
+            return result
+
+        async def specialist(r):
             print("\n[AGENT MÉDECIN SPÉCIALISTE] Protocoles de traitement...", flush=True)
-            specialist_result = self._execute_task('traitement_du_specialiste', inputs, medical_result)
-            results['specialist'] = specialist_result
+            result = await self._execute_task('traitement_du_specialiste', inputs, {'medical': r['medical']})
             print(f"[AGENT MÉDECIN SPÉCIALISTE] ✓ Protocole défini", flush=True)
-            print(f"[AGENT MÉDECIN SPÉCIALISTE] JSON Output:\n{json.dumps(specialist_result, indent=2, ensure_ascii=False)}\n", flush=True)
-            
-            # Task 7: Final UI Consolidation
+            _log_json("AGENT MÉDECIN SPÉCIALISTE", result)
+            return result
+
+        async def ui(r):
             print("\n[AGENT ADMINISTRATIF] Consolidation du dossier...", flush=True)
-            ui_result = self._execute_final_task(inputs, results)
-            results['ui'] = ui_result
+            result = await self._execute_final_task(inputs, {name: r[name] for name in AGENT_RESULTS if name != 'ui'})
             print(f"[AGENT ADMINISTRATIF] ✓ Dossier consolidé", flush=True)
-            print(f"[AGENT ADMINISTRATIF] JSON Output:\n{json.dumps(ui_result, indent=2, ensure_ascii=False, default=str)}\n", flush=True)
-            
+            _log_json("AGENT ADMINISTRATIF", result)
+            return result
+
+        return WorkflowDAG([
+            Phase('alert', alert),
+            Phase('nearest_hospital', nearest_hospital),
+            Phase('medical', medical, ['alert']),
+            Phase('coordinator', coordinator, ['medical', 'nearest_hospital']),
+            Phase('ambulance', ambulance, ['coordinator']),
+            Phase('hospital', hospital, ['medical', 'ambulance']),
+            Phase('specialist', specialist, ['medical']),
+            Phase('ui', ui, ['alert', 'coordinator', 'hospital', 'specialist']),
+        ])
+
+    async def execute_emergency_response_async(self, inputs):
+        """Version asyncio : les agents indépendants appellent le LLM en parallèle"""
+        results = {}
+
+        print("\n" + "="*70, flush=True)
+        print("  MEDIALERT SMA - SYSTÈME MULTI-AGENTS D'URGENCE MÉDICALE", flush=True)
+        print("="*70, flush=True)
+        print(f"\nPatient: {inputs.get('nom_prenom', 'N/A')}", flush=True)
+        print(f"Âge: {inputs.get('age', 'N/A')} ans", flush=True)
+        print(f"Sexe: {inputs.get('sexe', 'N/A')}", flush=True)
+        print(f"Symptômes: {inputs.get('symptomes', 'N/A')}", flush=True)
+        print(f"Localisation: {inputs.get('localisation', 'N/A')}", flush=True)
+        print("\n" + "-"*70 + "\n", flush=True)
+
+        dag = self._build_pipeline(inputs)
+        # Relevé de contexte de ce passage seulement (la crew est partagée entre requêtes)
+        context_usage = self.projector.begin()
+
+        async def keep(name, done):
+            # Résultats partiels conservés en cas d'erreur d'un agent
+            if name in AGENT_RESULTS:
+                results[name] = done[name]
+
+        started = time.perf_counter()
+        try:
+            await dag.run(on_phase_done=keep)
+            latency = self._latency_report(dag, time.perf_counter() - started)
+            latency['context'] = context = self.projector.report(context_usage)
+            if context['reduction'] is None:
+                print(f"🧮 Contexte des prompts: {context['tokens']} tokens", flush=True)
+            else:
+                print(f"🧮 Contexte des prompts: {context['tokens']} tokens (au lieu de {context['legacy_tokens']}, "
+                      f"-{context['reduction']:.0%})", flush=True)
+
             # Final Summary
             print("\n" + "="*70, flush=True)
             print("  ✅ MISSION TERMINÉE - RÉSUMÉ DE L'INTERVENTION", flush=True)
@@ -117,39 +205,54 @@ class MediAlertCrew:
             print(f"ETA Hôpital: {logistique.get('eta_hopital_minutes', 'N/A')} min", flush=True)
             print(f"Niveau d'urgence: {triage.get('niveau_urgence', 'N/A')}", flush=True)
             print(f"Type ambulance: {triage.get('type_vecteur', 'N/A')}", flush=True)
+            print(f"Durée: {latency['wall_s']} s (somme des agents {latency['sum_s']} s)", flush=True)
             print("\n" + "="*70 + "\n", flush=True)
-            
+
+            results = {name: results[name] for name in AGENT_RESULTS}
+            results['latency'] = latency
             return results
-            
+
         except Exception as e:
             print(f"\n[ERROR] {str(e)}\n", flush=True)
             return {'error': str(e), 'partial_results': results}
-    
-    def _execute_task(self, task_name, inputs, *context_results):
+
+    @staticmethod
+    def _latency_report(dag, wall):
+        """Latence de chaque agent, somme des appels, durée réelle et chemin critique du graphe"""
+        path, duration = dag.critical_path()
+        report = {
+            'agents': dict(dag.timings),
+            'sum_s': round(sum(dag.timings.values()), 3),
+            'wall_s': round(wall, 3),
+            'critical_path': path,
+            'critical_path_s': duration
+        }
+        print(f"⏱️ Latence par agent (s): {report['agents']}", flush=True)
+        print(f"⏱️ Chemin critique: {' > '.join(path)} ({duration} s)", flush=True)
+        return report
+
+    def _agent_config(self, name):
+        """Configuration d'un agent, par son nom court (agents.yaml) ou son nom long"""
+        if name in self.agents_config:
+            return self.agents_config[name]
+        for short, long_name in AGENT_ALIASES.items():
+            if name == short and long_name in self.agents_config:
+                return self.agents_config[long_name]
+            if name == long_name and short in self.agents_config:
+                return self.agents_config[short]
+        raise KeyError(name)
+
+    async def _execute_task(self, task_name, inputs, context=None):
         """Execute a single task using Groq LLM"""
         task_config = self.tasks_config[task_name]
         agent_name = task_config['agent']
         
-        # Map task agent names to actual agent config names
-        agent_map = {
-            'agentpatient': 'emetteur_d_alerte',
-            'agentmedecinurgence': 'medical_regulation_ai_triage',
-            'agentcordonnateur': 'operational_regulation_chief',
-            'agentambulence': 'mobile_intervention_pilot',
-            'agenthopital': 'hospital_resource_manager',
-            'agentmedecinspecialiste': 'clinical_protocols_engine',
-            'agentadministratif': 'patient_interface_reporting'
-        }
-        
-        actual_agent_name = agent_map.get(agent_name, agent_name)
-        agent_config = self.agents_config[actual_agent_name]
+        agent_config = self._agent_config(agent_name)
         
-        # Build context from previous results
+        # Build context from previous results (champs utiles seulement, budget de tokens)
         context_text = ""
-        if context_results:
-            context_text = "\n\nContext from previous tasks:\n"
-            for i, result in enumerate(context_results):
-                context_text += f"Result {i+1}: {json.dumps(result, indent=2)}\n"
+        if context:
+            context_text = "\n\nContext from previous tasks:\n" + self.projector.render(task_name, context)
         
         # Create prompt
         prompt = f"""
@@ -165,16 +268,15 @@ Expected Output: {task_config['expected_output']}
 Please execute this task and provide the output in the exact JSON format specified.
 """
         
-        # Execute with Groq
-        response = self.llm.invoke(prompt)
+        # Execute with Groq (cache LLM partagé)
+        content = await cached_ainvoke(self.llm, prompt, bypass=task_name in UNCACHED_TASKS)
         
         try:
             # Try to parse JSON response
-            result = json.loads(response.content)
+            result = json.loads(content)
             return result
         except json.JSONDecodeError:
             # Fallback: extract JSON from response
-            content = response.content
             start = content.find('{')
             end = content.rfind('}') + 1
             if start != -1 and end != 0:
@@ -192,17 +294,18 @@ Please execute this task and provide the output in the exact JSON format specifi
                 'timestamp': datetime.utcnow().isoformat()
             }
     
-    def _execute_coordinator_task(self, inputs, alert_result, medical_result):
+    async def _execute_coordinator_task(self, inputs, alert_result, medical_result, nearest_hospital=None):
         """Execute coordinator task with hospital search integration"""
-        # Default coordinates (Casablanca)
-        lat, lon = 33.5731, -7.5898
-        
-        # Find strictly nearest hospital using Haversine + ORS
-        nearest_hospital = self.hospital_service.find_nearest_hospital(lat, lon)
+        if nearest_hospital is None:
+            # Default coordinates (Casablanca)
+            lat, lon = 33.5731, -7.5898
+
+            # Find strictly nearest hospital using Haversine + ORS
+            nearest_hospital = await asyncio.to_thread(self.hospital_service.find_nearest_hospital, lat, lon)
         
         # Execute coordinator task
         task_config = self.tasks_config['triage_patients_et_selection_ambulance']
-        agent_config = self.agents_config['operational_regulation_chief']
+        agent_config = self._agent_config('operational_regulation_chief')
         
         prompt = f"""
 Role: {agent_config['role']}
@@ -211,20 +314,18 @@ Backstory: {agent_config['backstory']}
 
 Task: {task_config['description'].format(**inputs)}
 
-Nearest Hospital (Validated):
-{json.dumps(nearest_hospital, indent=2)}
-
-Medical Analysis:
-{json.dumps(medical_result, indent=2)}
+Nearest Hospital (Validated) and Medical Analysis:
+{self.projector.render('triage_patients_et_selection_ambulance',
+                       {'medical': medical_result, 'nearest_hospital': nearest_hospital})}
 
 Please confirm hospital assignment in required JSON format:
 {task_config['expected_output']}
 """
         
-        response = self.llm.invoke(prompt)
+        content = await cached_ainvoke(self.llm, prompt)
         
         try:
-            result = json.loads(response.content)
+            result = json.loads(content)
             result['selected_hospital'] = nearest_hospital
             return result
         except:
@@ -240,7 +341,7 @@ Please confirm hospital assignment in required JSON format:
                 'selected_hospital': nearest_hospital
             }
     
-    def _execute_ambulance_task(self, inputs, coordinator_result):
+    async def _execute_ambulance_task(self, inputs, coordinator_result):
         """Execute ambulance task with route calculation"""
         # Get coordinates from selected hospital
         hospital = coordinator_result.get('selected_hospital', {})
@@ -257,14 +358,15 @@ Please confirm hospital assignment in required JSON format:
             }
         else:
             # Calculate route using ORS
-            route_data = self.ors_service.get_route(
-                start_coords=[patient_coords[1], patient_coords[0]],
-                end_coords=[hospital_coords[1], hospital_coords[0]]
+            route_data = await asyncio.to_thread(
+                self.ors_service.get_route,
+                [patient_coords[1], patient_coords[0]],
+                [hospital_coords[1], hospital_coords[0]]
             )
         
         # Execute ambulance task
         task_config = self.tasks_config['valider_la_demande_du_coordonnateur']
-        agent_config = self.agents_config['mobile_intervention_pilot']
+        agent_config = self._agent_config('mobile_intervention_pilot')
         
         prompt = f"""
 Role: {agent_config['role']}
@@ -273,20 +375,18 @@ Backstory: {agent_config['backstory']}
 
 Task: {task_config['description']}
 
-Route Calculation Results:
-{json.dumps(route_data, indent=2)}
-
-Coordinator Decision:
-{json.dumps(coordinator_result, indent=2)}
+Route Calculation Results and Coordinator Decision:
+{self.projector.render('valider_la_demande_du_coordonnateur',
+                       {'route': route_data, 'coordinator': coordinator_result})}
 
 Please provide the logistics information in the required JSON format:
 {task_config['expected_output']}
 """
         
-        response = self.llm.invoke(prompt)
+        content = await cached_ainvoke(self.llm, prompt)
         
         try:
-            result = json.loads(response.content)
+            result = json.loads(content)
             # Add route data for frontend
             result['route_data'] = route_data
             return result
@@ -302,10 +402,10 @@ Please provide the logistics information in the required JSON format:
                 'route_data': route_data
             }
     
-    def _execute_final_task(self, inputs, all_results):
+    async def _execute_final_task(self, inputs, all_results):
         """Execute final UI consolidation task"""
         task_config = self.tasks_config['consolider_dossier_pour_ui']
-        agent_config = self.agents_config['patient_interface_reporting']
+        agent_config = self._agent_config('patient_interface_reporting')
         
         prompt = f"""
 Role: {agent_config['role']}
@@ -315,16 +415,16 @@ Backstory: {agent_config['backstory']}
 Task: {task_config['description']}
 
 All Previous Results:
-{json.dumps(all_results, indent=2, default=str)}
+{self.projector.render('consolider_dossier_pour_ui', all_results)}
 
 Please consolidate all information into the final UI format:
 {task_config['expected_output']}
 """
         
-        response = self.llm.invoke(prompt)
+        content = await cached_ainvoke(self.llm, prompt, bypass='consolider_dossier_pour_ui' in UNCACHED_TASKS)
         
         try:
-            result = json.loads(response.content)
+            result = json.loads(content)
             return result
         except:
             # Fallback UI result
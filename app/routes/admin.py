@@ -4,6 +4,7 @@ from app.models.user import UserStore
 from app.services.system_logs_service import SystemLogsService
 from app.services.firebase_service import FirebaseService
 from firebase_admin import firestore, auth
+from app.services.serialization import decode_field
 import csv
 import io
 
@@ -110,6 +111,19 @@ def get_theme_setting():
     enabled = settings_doc.to_dict().get('enabled', True) if settings_doc.exists else True
     return jsonify({'enabled': enabled})
 
+@admin_bp.route('/admin/api/coverage', methods=['GET'])
+@login_required
+def fleet_coverage():
+    if session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        from app.services.coverage_service import get_coverage_engine
+        max_moves = int(request.args.get('max_moves', 3))
+        return jsonify(get_coverage_engine().snapshot(max_moves=max_moves))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/admin/agents-documentation')
 @login_required
 def agents_documentation():
@@ -153,17 +167,10 @@ def user_detail_view(username):
     for alert in alerts:
         normalized_alert = alert.copy()
         if 'patient' in alert and isinstance(alert['patient'], str):
-            try:
-                import json
-                normalized_alert['patient'] = json.loads(alert['patient'])
-            except:
-                pass
-        if 'dispatch_info' in alert and isinstance(alert['dispatch_info'], str):
-            try:
-                import json
-                normalized_alert['dispatch_result'] = json.loads(alert['dispatch_info'])
-            except:
-                pass
+            normalized_alert['patient'] = decode_field(alert['patient']) or alert['patient']
+        # dispatch_info : dict (format actuel) ou chaîne JSON (anciennes alertes)
+        if alert.get('dispatch_info'):
+            normalized_alert['dispatch_result'] = decode_field(alert['dispatch_info'])
         normalized_alerts.append(normalized_alert)
     
     return render_template('admin/user_detail_view.html', user=user, patient=patient, alerts=normalized_alerts, username=username)
@@ -1,12 +1,12 @@
-from flask import Blueprint, request, jsonify, session
-
-import threading
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 
 import uuid
 
 import sys
 
-import json
+import time
+
+import queue
 
 from datetime import datetime
 
@@ -16,13 +16,45 @@ from app.services.firebase_service import FirebaseService
 
 from app.services.system_logs_service import SystemLogsService
 
-from app.services.emergency_orchestrator import EmergencyOrchestrator
-
-import asyncio
+from app.services.dispatch_worker import get_dispatch_worker, DispatchQueueFull
 
 from app.services.geolocation import GeolocationService
 
-from app.services.smart_dispatch import SmartDispatchEngine
+from app.services.trajectory import ambulance_position, Trajectory
+
+from app.services.eta_service import get_eta_tracker
+
+from app.services.alert_events import get_alert_event_bus, tracking_view, TERMINAL_STATUSES
+
+from app.services.alert_versions import get_versioned_views, versioned, alert_version, strong_etag
+
+from app.services.alert_index import get_alert_index
+
+from app.services.batch_intake import BatchPlanner
+
+from app.services.alert_dedup import get_alert_deduplicator
+
+from app.services.serialization import to_firestore, dumps
+
+from app.services.admission import get_admission_controller
+
+from app.services.deadline import Deadline
+
+from app.services.alert_prepare import AlertPreparer
+
+from app.services.dispatch_engine import DispatchEngine
+
+from app.services.dispatch_regions import RegionalCatalog, region_of
+
+from app.services.hospital_firebase_service import HospitalFirebaseService
+
+from app.services.ambulance_firebase_service import AmbulanceFirebaseService
+
+from app.services.ors_service import ORSService
+
+from app.services.llm_cache import get_llm_cache
+
+from app.config_settings import Config
 
 from app.decorators import login_required
 
@@ -42,7 +74,30 @@ logs_service = SystemLogsService()
 
 geolocation_service = GeolocationService()
 
-smart_dispatch = SmartDispatchEngine()
+dispatch_worker = get_dispatch_worker()
+
+eta_tracker = get_eta_tracker()
+
+event_bus = get_alert_event_bus()
+
+versioned_views = get_versioned_views()
+
+alert_index = get_alert_index()
+
+dedup = get_alert_deduplicator()
+
+# Catalogue hôpitaux / flotte du nœud, indexé par région de dispatch. Le plan reste calculé ici,
+# dans le budget de la requête (voir RegionalCatalog) ; la région ne répartit que l'exécution des workflows.
+regional_catalog = RegionalCatalog(HospitalFirebaseService(), AmbulanceFirebaseService())
+
+dispatch_engine = DispatchEngine(HospitalFirebaseService(), AmbulanceFirebaseService(), ORSService(),
+                                 catalog=regional_catalog)
+# Mission terminée (ou échouée avant le départ) : la réservation du catalogue est libérée
+dispatch_worker.add_release_hook(dispatch_engine.release)
+
+alert_preparer = AlertPreparer(geolocation_service, dispatch_engine)
+
+batch_planner = BatchPlanner(dispatch_engine)
 
 
 
@@ -134,6 +189,13 @@ def create_alert():
 
     """Create new emergency alert with smart dispatch"""
 
+    alert_id = None
+    # Ambulance réservée par le plan, rendue si l'alerte n'atteint pas le workflow
+    assignment = None
+
+    # Budget de la requête : l'alerte est acquittée dans le SLA, les étapes lentes passent en repli
+    deadline = Deadline(Config.ALERT_SLA_SECONDS)
+
     try:
 
         print("\n" + "="*60)
@@ -160,6 +222,20 @@ def create_alert():
 
         print(f"\n[API] Patient: {data.get('nom_prenom')}, Age: {data.get('age')}")
 
+        # Contrôle d'admission : inutile de géocoder / router si le dispatch est saturé
+        if dispatch_worker.is_saturated():
+            response = jsonify({'error': 'Système de dispatch saturé, veuillez réessayer'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        # Double envoi (double clic, renvoi mobile après timeout) : même clé -> même alerte
+        alert_id = str(uuid.uuid4())[:8]
+        user = session.get('user')
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        existing = dedup.claim_key(alert_id, user, idempotency_key)
+        if existing:
+            return _duplicate_alert(existing)
+
         
 
         # Merge location sources
@@ -172,35 +248,48 @@ def create_alert():
 
         manual = {'address': data.get('localisation'), 'lat': lat, 'lng': lng}
 
-        ip = geolocation_service.get_ip_location(request.remote_addr)
+        # Formulaire préchauffé (/alert/prepare) : position résolue, itinéraires ORS en cache
+        prepared = alert_preparer.consume(data.pop('prepare_token', None), user, lat, lng, data.get('localisation'))
 
-        
+        if prepared and lat is None:
+
+            location = prepared['location']
+
+        else:
 
-        location = geolocation_service.merge_all_location_sources(gps, manual, ip)
+            ip = geolocation_service.get_ip_location(request.remote_addr)
+
+            location = geolocation_service.merge_all_location_sources(gps, manual, ip, deadline=deadline)
 
         
 
         if not location.get('lat') or not location.get('lng'):
 
+            dedup.release(alert_id)
+
             return jsonify({'error': 'Unable to determine location coordinates'}), 400
 
+        # Quasi-doublon : même utilisateur, même secteur, quelques instants plus tôt
+        existing = dedup.claim_location(alert_id, user, float(location['lat']), float(location['lng']))
+        if existing:
+            dedup.release(alert_id)
+            return _duplicate_alert(existing)
+
         
 
         # Smart dispatch
 
         emergency_level = int(data.get('emergency_level', 2))
 
-        dispatch_result = smart_dispatch.dispatch_ambulance(
-
-            float(location['lat']), float(location['lng']), emergency_level
+        # Dispatch calculé une seule fois (ou repris du jeton s'il tient encore), puis remis tel quel au workflow
+        patient_lat, patient_lng = float(location['lat']), float(location['lng'])
 
+        assignment = alert_preparer.assign(
+            prepared, patient_lat, patient_lng, emergency_level,
+            age=data.get('age'), symptoms=data.get('symptomes'), deadline=deadline
         )
 
-        
-
-        # Generate alert ID
-
-        alert_id = str(uuid.uuid4())[:8]
+        dispatch_result = dispatch_engine.summary(assignment, patient_lat, patient_lng, emergency_level)
 
         
 
@@ -208,11 +297,11 @@ def create_alert():
 
         alert_data = {
 
-            'patient': json.loads(json.dumps(data, default=str)),
+            'patient': to_firestore(data),
 
-            'location': json.loads(json.dumps(location, default=str)),
+            'location': to_firestore(location),
 
-            'dispatch_info': json.dumps(dispatch_result, default=str),
+            'dispatch_info': to_firestore(dispatch_result),
 
             'emergency_level': emergency_level,
 
@@ -222,14 +311,18 @@ def create_alert():
 
             'username': session.get('user'),
 
-            'created_at': datetime.utcnow().isoformat()
+            'created_at': datetime.utcnow().isoformat(),
+
+            'version': 1
 
         }
+        if idempotency_key:
+            alert_data['idempotency_key'] = idempotency_key
           # --- CORRECTION DISTANCES RÉELLES ---
 
         if dispatch_result and 'mission' in dispatch_result:
 
-            # On récupère les vraies valeurs calculées par ORS dans smart_dispatch.py
+            # On récupère les vraies valeurs calculées par ORS dans le moteur de dispatch
 
             alert_data['dist_amb_pat'] = dispatch_result['mission'].get('dist_leg1_km', 0)
 
@@ -242,92 +335,441 @@ def create_alert():
             alert_data['dist_pat_hosp'] = 0
         
         alerts_collection.document(alert_id).set(alert_data)
+        alert_index.apply(alert_id, alert_data)
         
         # Log alert creation
         logs_service.log_event('alert_created', f'New alert created: {alert_id}', session.get('user'), {'alert_id': alert_id})
 
-        username = session.get('user')
-        def run_async_workflow():
-            try:
-                print(f"\n[ORCHESTRATOR] Starting workflow for alert {alert_id}", flush=True)
-                orchestrator = EmergencyOrchestrator()
-                asyncio.run(orchestrator.run_workflow(
-                    alert_id,
-                    float(location['lat']),
-                    float(location['lng']),
-                    emergency_level,
-                    data.get('symptomes', 'Non spécifié'),
-                    str(data.get('age', 'Inconnu'))
-                ))
-                print(f"[ORCHESTRATOR] Workflow completed for alert {alert_id}", flush=True)
-            except Exception as e:
-                alerts_collection.document(alert_id).update({'status': 'ERROR', 'error': str(e)})
-                print(f"[ERROR] Workflow failed: {e}", flush=True)
-        
-        thread = threading.Thread(target=run_async_workflow)
-        thread.daemon = True
-        thread.start()
+        try:
+            dispatch_worker.submit(
+                alert_id,
+                emergency_level,
+                region=region_of(patient_lat, patient_lng),
+                patient_lat=patient_lat,
+                patient_lng=patient_lng,
+                symptomes=data.get('symptomes', 'Non spécifié'),
+                age=str(data.get('age', 'Inconnu')),
+                assignment=dispatch_engine.for_workflow(assignment)
+            )
+            assignment = None
+        except DispatchQueueFull as e:
+            alerts_collection.document(alert_id).update(versioned({'status': 'REJECTED', 'error': str(e)}))
+            alert_index.apply(alert_id, {'status': 'REJECTED'})
+            # Le client réessaiera avec la même clé : une nouvelle alerte devra être créée
+            dedup.release(alert_id)
+            dispatch_engine.release(assignment)
+            assignment = None
+            response = jsonify({'error': 'Système de dispatch saturé, veuillez réessayer', 'alert_id': alert_id})
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
+        if deadline.expired():
+            print(f"[API] SLA de {Config.ALERT_SLA_SECONDS}s dépassé pour l'alerte {alert_id}")
+
         return jsonify({
             'success': True,
             'alert_id': alert_id,
             'message': 'Alerte créée et traitement en cours',
-            'dispatch': json.loads(json.dumps(dispatch_result, default=str))
+            'dispatch': dispatch_result
         })
         
     except Exception as e:
         print(f"Error in create_alert: {e}")
+        if alert_id:
+            dedup.release(alert_id)
+        dispatch_engine.release(assignment)
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/alert/prepare', methods=['POST'])
+@login_required
+def prepare_alert():
+    """
+    Préchauffage à l'ouverture du formulaire et au fix GPS : position, affectation probable et
+    itinéraires sont calculés d'avance sous un jeton court ; POST /alert les reprend s'ils tiennent encore.
+    """
+    data = request.get_json(silent=True) or {}
+    gps = data.get('gps_coords')
+    if not gps and data.get('lat') and data.get('lng'):
+        gps = {'lat': float(data['lat']), 'lng': float(data['lng']), 'source': 'gps'}
+    try:
+        token, entry = alert_preparer.prepare(
+            session.get('user'), gps=gps, address=data.get('localisation'),
+            ip=geolocation_service.get_ip_location(request.remote_addr),
+            emergency_level=data.get('emergency_level', 2), age=data.get('age'), symptoms=data.get('symptomes'),
+            previous_token=data.get('prepare_token'))
+    except Exception as e:
+        print(f"[Prepare] Erreur: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if not token:
+        return jsonify({'success': False, 'error': 'Unable to determine location coordinates'}), 400
+    return jsonify({'success': True, 'prepare_token': token, 'expires_in': int(alert_preparer.ttl),
+                    'location': entry['location'], 'candidates': entry['candidates']})
+
+def _duplicate_alert(alert_id):
+    """Réponse à un envoi en double : l'alerte existante, sans nouveau traitement"""
+    print(f"[API] Envoi en double, alerte existante: {alert_id}")
+    return jsonify({
+        'success': True,
+        'alert_id': alert_id,
+        'message': 'Alerte déjà en cours de traitement',
+        'duplicate': True
+    })
+
+@api_bp.route('/alerts/batch', methods=['POST'])
+@login_required
+def create_alert_batch():
+    """
+    Intake groupé (accident, effondrement...) : plusieurs patients sur un même lieu.
+    Localisation, hôpitaux candidats et itinéraires calculés une seule fois, répartition conjointe
+    hôpitaux / ambulances, documents d'alerte créés en une écriture groupée Firestore.
+    """
+    # Ambulances réservées par le plan, rendues pour les alertes qui n'atteignent pas le workflow
+    assignments = []
+    deadline = Deadline(Config.ALERT_SLA_SECONDS)
+    try:
+        data = request.get_json() or {}
+        patients = data.get('patients') or []
+        if not isinstance(patients, list) or not patients:
+            return jsonify({'error': 'Missing field: patients'}), 400
+        if len(patients) > Config.BATCH_MAX_PATIENTS:
+            return jsonify({'error': f'Too many patients (max {Config.BATCH_MAX_PATIENTS})'}), 400
+        for i, patient in enumerate(patients):
+            for field in ['nom_prenom', 'age', 'sexe', 'symptomes']:
+                if field not in patient:
+                    return jsonify({'error': f'Missing field: patients[{i}].{field}'}), 400
+
+        print(f"\n[API] Intake groupé: {len(patients)} patients")
+
+        if dispatch_worker.is_saturated():
+            response = jsonify({'error': 'Système de dispatch saturé, veuillez réessayer'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        # Un seul lieu pour tout l'événement
+        lat = float(data.get('lat')) if data.get('lat') else None
+        lng = float(data.get('lng')) if data.get('lng') else None
+        manual = {'address': data.get('localisation'), 'lat': lat, 'lng': lng}
+        ip = geolocation_service.get_ip_location(request.remote_addr)
+        location = geolocation_service.merge_all_location_sources(data.get('gps_coords'), manual, ip,
+                                                                  deadline=deadline)
+        if not location.get('lat') or not location.get('lng'):
+            return jsonify({'error': 'Unable to determine location coordinates'}), 400
+        patient_lat, patient_lng = float(location['lat']), float(location['lng'])
+
+        default_level = int(data.get('emergency_level', 2))
+        patients = [dict(p, emergency_level=int(p.get('emergency_level', default_level)),
+                         localisation=p.get('localisation') or data.get('localisation')) for p in patients]
+        assignments = batch_planner.plan(patient_lat, patient_lng, patients, deadline=deadline)
+
+        incident_id = str(uuid.uuid4())[:8]
+        created_at = datetime.utcnow().isoformat()
+        location_data = to_firestore(location)
+        created = []
+        batch = firebase_service.db.batch()
+        for i, (patient, assignment) in enumerate(zip(patients, assignments)):
+            routes = assignment.get('routes') or {}
+            mission = {
+                'dist_leg1_km': round((routes.get('red') or {}).get('distance_km', 0), 2),
+                'dist_leg2_km': round((routes.get('blue') or {}).get('distance_km', 0), 2),
+                'emergency_level': patient['emergency_level']
+            }
+            alert_id = str(uuid.uuid4())[:8]
+            alert_data = {
+                'patient': to_firestore(patient),
+                'location': location_data,
+                'dispatch_info': to_firestore({'hospital': assignment.get('hospital'), 'mission': mission,
+                                           'incident_id': incident_id}),
+                'emergency_level': patient['emergency_level'],
+                'status': 'processing',
+                'logs': [],
+                'username': session.get('user'),
+                'created_at': created_at,
+                'version': 1,
+                'incident_id': incident_id,
+                'incident_index': i,
+                'dist_amb_pat': mission['dist_leg1_km'],
+                'dist_pat_hosp': mission['dist_leg2_km']
+            }
+            batch.set(alerts_collection.document(alert_id), alert_data)
+            created.append((alert_id, alert_data, assignment))
+            # Limite Firestore : 500 opérations par écriture groupée
+            if len(created) % 500 == 0:
+                batch.commit()
+                batch = firebase_service.db.batch()
+        if len(created) % 500:
+            batch.commit()
+
+        logs_service.log_event('alert_batch_created', f'New incident {incident_id}: {len(created)} alerts',
+                               session.get('user'), {'incident_id': incident_id, 'alerts': [c[0] for c in created]})
+
+        results, rejected = [], []
+        region = region_of(patient_lat, patient_lng)
+        for i, (alert_id, alert_data, assignment) in enumerate(created):
+            alert_index.apply(alert_id, alert_data)
+            try:
+                dispatch_worker.submit(
+                    alert_id,
+                    alert_data['emergency_level'],
+                    region=region,
+                    patient_lat=patient_lat,
+                    patient_lng=patient_lng,
+                    symptomes=alert_data['patient'].get('symptomes', 'Non spécifié'),
+                    age=str(alert_data['patient'].get('age', 'Inconnu')),
+                    assignment=dispatch_engine.for_workflow(assignment)
+                )
+            except DispatchQueueFull as e:
+                dispatch_engine.release(assignment)
+                assignments[i] = None
+                alerts_collection.document(alert_id).update(versioned({'status': 'REJECTED', 'error': str(e)}))
+                alert_index.apply(alert_id, {'status': 'REJECTED'})
+                rejected.append(alert_id)
+                continue
+            # Remise au workflow : la réservation est libérée à la fin de la mission
+            assignments[i] = None
+            results.append({
+                'alert_id': alert_id,
+                'patient': alert_data['patient'].get('nom_prenom'),
+                'emergency_level': alert_data['emergency_level'],
+                'hospital': (assignment.get('hospital') or {}).get('name'),
+                'ambulance': (assignment.get('ambulance') or {}).get('id')
+            })
+
+        response = jsonify({
+            'success': not rejected,
+            'incident_id': incident_id,
+            'alerts': results,
+            'rejected': rejected
+        })
+        if rejected:
+            response.headers['Retry-After'] = '5'
+            return response, 207
+        return response
+    except Exception as e:
+        print(f"Error in create_alert_batch: {e}")
+        batch_planner.release(assignments)
+        return jsonify({'error': str(e)}), 500
+
+def _versioned_response(key, version, body, live=(), wrap=None, extra=None):
+    """
+    Réponse conditionnelle d'une alerte versionnée :
+    - If-None-Match identique à l'ETag de l'état courant : 304 sans corps ;
+    - ?since=<version> : seuls les champs modifiés depuis cette version ('logs_append' pour les logs),
+      ou la représentation complète si cette version n'est plus connue ('delta': false).
+    `live` : champs recalculés à chaque requête, toujours inclus dans un delta.
+    """
+    wrap = wrap or (lambda fields: fields)
+    etag = strong_etag(version, body)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        payload = None
+        since = request.args.get('since', type=int)
+        if since is not None:
+            changes = versioned_views.delta(key, since, body, always=live)
+            if changes is not None:
+                payload = dict(wrap(changes), delta=True, since=since)
+        if payload is None:
+            payload = dict(wrap(body), delta=False)
+        response = jsonify(dict(payload, version=version, **(extra or {})))
+    versioned_views.remember(key, version, body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @api_bp.route('/alert/<alert_id>/data', methods=['GET'])
 @login_required
 def get_alert_data(alert_id):
     """Get alert data for tracking page with real-time updates"""
     try:
         doc = alerts_collection.document(alert_id).get()
-        if doc.exists:
-            data = doc.to_dict()
-        # --- AFFINAGE AFFICHAGE ---
-        dist_amb_pat = data.get('dist_amb_pat', 0)
-        dist_pat_hosp = data.get('dist_pat_hosp', 0)
-        # Si jamais les données manquent (vieilles alertes), on met un fallback
-        if dist_pat_hosp == 0 and data.get('selected_hospital'):
-            dist_pat_hosp = data['selected_hospital'].get('distance_km', 0)
-        return jsonify({
-            'status': data.get('status', 'processing'),
-            'logs': data.get('logs', []),
-            'route_active': data.get('route_active'), 
-            'route_red': data.get('route_red'),
-            'route_blue': data.get('route_blue'),
-            'dist_amb_pat': dist_amb_pat,
-            'dist_pat_hosp': dist_pat_hosp,
-            'severity_level': data.get('emergency_level', 2),
-            'eta_minutes': data.get('eta_minutes'),
-            'selected_hospital': data.get('selected_hospital'),
-            'ambulance': data.get('ambulance'),
-            'patient': data.get('patient'),
-            'location': data.get('location'),
-            'medical_protocol': data.get('medical_protocol')
-        })
-        return jsonify({'error': 'Alert not found'}), 404
+        if not doc.exists:
+            return jsonify({'error': 'Alert not found'}), 404
+        data = doc.to_dict()
+        view = tracking_view(data)
+        # Position courante interpolée depuis le trajet (plus d'écriture par point de route)
+        now = time.time()
+        ambulance = view['ambulance']
+        position = ambulance_position(data, now)
+        if ambulance and position:
+            ambulance = dict(ambulance, current_lat=position[0], current_lng=position[1])
+        # ETA recalculé depuis la position courante (sommes préfixes de la route, sans ORS)
+        eta_minutes = view['eta_minutes']
+        if ambulance and data.get('route_profile') and data.get('status') not in ('RESOLVED', 'ERROR'):
+            if eta_tracker.load(alert_id, data['route_profile']):
+                estimate = eta_tracker.update(alert_id, float(ambulance['current_lat']), float(ambulance['current_lng']), reroute=False)
+                if estimate:
+                    eta_minutes = estimate['eta_minutes']
+        elif data.get('status') in ('RESOLVED', 'ERROR'):
+            eta_tracker.forget(alert_id)
+        body = dict(view, ambulance=ambulance, eta_minutes=eta_minutes)
+        return _versioned_response(('data', alert_id), alert_version(data), body,
+                                   live=('ambulance', 'eta_minutes'), extra={'server_time': now})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/alert/<alert_id>/stream')
+@login_required
+def stream_alert(alert_id):
+    """
+    Flux SSE de suivi : instantané puis champs modifiés uniquement, heartbeats réguliers,
+    reprise via Last-Event-ID. Une seule source Firestore par alerte, partagée par tous les flux.
+    """
+    if not alerts_collection.document(alert_id).get().exists:
+        return jsonify({'error': 'Alert not found'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    sub, backlog = event_bus.subscribe(alert_id, last_event_id)
+    heartbeat = Config.SSE_HEARTBEAT_SECONDS
+
+    def format_event(event_id, name, payload):
+        body = dumps(dict(payload, server_time=time.time()))
+        return f"id: {event_id}\nevent: {name}\ndata: {body}\n\n"
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            pending = list(backlog)
+            current = event_bus.current_view(alert_id) or {}
+            if not pending and current.get('status') in TERMINAL_STATUSES:
+                yield "event: end\ndata: {}\n\n"
+                return
+            while True:
+                if pending:
+                    event = pending.pop(0)
+                else:
+                    try:
+                        event = sub.get(timeout=heartbeat)
+                    except queue.Empty:
+                        yield ": heartbeat\n\n"
+                        continue
+                yield format_event(*event)
+                if event[2].get('status') in TERMINAL_STATUSES:
+                    yield "event: end\ndata: {}\n\n"
+                    return
+        finally:
+            event_bus.unsubscribe(alert_id, sub)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @api_bp.route('/status/<alert_id>')
 def get_alert_status(alert_id):
     try:
         doc = alerts_collection.document(alert_id).get()
         if not doc.exists:
             return jsonify({'error': 'Alert not found'}), 404
-        return jsonify({'alert': doc.to_dict(), 'eta_minutes': doc.to_dict().get('eta_minutes', 0)})
+        data = doc.to_dict()
+        return _versioned_response(('status', alert_id), alert_version(data), data,
+                                   wrap=lambda fields: {'alert': fields, 'eta_minutes': data.get('eta_minutes', 0)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/alert/<alert_id>/symptoms', methods=['PATCH'])
+@login_required
+def update_alert_symptoms(alert_id):
+    """
+    Met à jour les symptômes ; le protocole spéculatif en cours est régénéré (appel LLM).
+    Réservé à l'auteur de l'alerte et aux administrateurs.
+    """
+    try:
+        data = request.get_json() or {}
+        symptomes = (data.get('symptomes') or '').strip()
+        if not symptomes:
+            return jsonify({'error': 'Missing field: symptomes'}), 400
+        doc_ref = alerts_collection.document(alert_id)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return jsonify({'error': 'Alert not found'}), 404
+        if session.get('role') != 'admin' and (doc.to_dict() or {}).get('username') != session.get('user'):
+            return jsonify({'error': 'Forbidden'}), 403
+        doc_ref.update(versioned({'patient.symptomes': symptomes}))
+        alert_index.apply(alert_id, {'patient.symptomes': symptomes})
+        dispatch_worker.invalidate_protocol(alert_id, symptomes)
+        return jsonify({'success': True, 'alert_id': alert_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/alert/<alert_id>/telemetry', methods=['POST'])
+@login_required
+def post_alert_telemetry(alert_id):
+    """
+    Position GPS réelle de l'ambulance : ETA incrémental (projection sur la route + sommes préfixes).
+    ORS n'est rappelé qu'en cas d'écart ; Firestore n'est écrit que si l'ETA change ou si la route change.
+    Réservé aux équipages et administrateurs (TELEMETRY_ROLES) : un patient ne peut pas déplacer l'ambulance.
+    """
+    if session.get('role') not in Config.TELEMETRY_ROLES:
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        data = request.get_json() or {}
+        try:
+            lat, lng = float(data['lat']), float(data['lng'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Missing or invalid lat/lng'}), 400
+
+        doc_ref = alerts_collection.document(alert_id)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return jsonify({'error': 'Alert not found'}), 404
+        alert = doc.to_dict()
+        if not eta_tracker.load(alert_id, alert.get('route_profile')):
+            return jsonify({'error': 'No route for this alert'}), 409
+
+        estimate = eta_tracker.update(alert_id, lat, lng)
+        updates = {}
+        if estimate['rerouted']:
+            profile = estimate.pop('route_profile')
+            route_field = 'route_blue' if profile.get('leg') == 'BLUE' else 'route_red'
+            coords = Trajectory.from_dict(profile).coords
+            updates.update({'route_profile': profile, route_field: dumps(coords)})
+        if estimate['rerouted'] or alert.get('trajectory') or abs((alert.get('eta_minutes') or 0) - estimate['eta_minutes']) >= Config.ETA_WRITE_DELTA_MIN:
+            ambulance = dict(alert.get('ambulance') or {}, current_lat=lat, current_lng=lng)
+            updates.update({'eta_minutes': estimate['eta_minutes'], 'eta_remaining_km': estimate['remaining_km'],
+                            'ambulance': ambulance, 'updated_at': datetime.utcnow().isoformat()})
+            if alert.get('trajectory'):
+                # Position réelle : la trajectoire simulée n'est plus pertinente
+                updates['trajectory'] = firestore.DELETE_FIELD
+        if updates:
+            doc_ref.update(versioned(updates))
+            alert_index.apply(alert_id, updates)
+        return jsonify(dict(estimate, success=True, written=bool(updates)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/dispatch/stats')
+@login_required
+def get_dispatch_stats():
+    return jsonify(dict(dispatch_worker.stats(), streams=event_bus.stats(), alert_index=alert_index.stats(),
+                        duplicates=dedup.stats(), admission=get_admission_controller().stats(),
+                        ors_cache=ORSService.cache_stats(), regional_catalog=regional_catalog.stats(),
+                        prepared_alerts=alert_preparer.stats(), llm_cache=get_llm_cache().stats()))
+
+def _index_filters():
+    """
+    Filtres communs : ?status=A,B, ?severity=1,2 ; toujours limités à l'utilisateur connecté
+    (?user= n'est pris en compte que pour un administrateur)
+    """
+    status = [s for s in request.args.get('status', '').split(',') if s]
+    try:
+        severity = [int(s) for s in request.args.get('severity', '').split(',') if s]
+    except ValueError:
+        severity = []
+    user = session['user']
+    if session.get('role') == 'admin':
+        user = request.args.get('user') or user
+    return {'user': user, 'status': status, 'severity': severity}
+
 @api_bp.route('/alerts/active')
+@login_required
 def get_active_alerts():
-    return jsonify({'alert': None}) 
+    """Alertes en cours, servies depuis la vue en mémoire ('alert' : la plus récente)"""
+    alerts = alert_index.active(limit=request.args.get('limit', 20, type=int), **_index_filters())
+    return jsonify({'alert': alerts[0] if alerts else None, 'alerts': alerts})
 
 @api_bp.route('/alerts/recent')
+@login_required
 def get_recent_alerts():
-    return jsonify({'alerts': []})
\ No newline at end of file
+    """Dernières alertes, servies depuis la vue en mémoire"""
+    alerts = alert_index.recent(limit=request.args.get('limit', 10, type=int), **_index_filters())
+    return jsonify({'alerts': alerts})
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from groq import Groq
 from app.config_settings import Config
+from app.services.llm_cache import groq_completion
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -37,17 +38,10 @@ def medibot_chat():
         Réponds de manière concise et professionnelle."""
         
         # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model=Config.GROQ_MODEL,
-            temperature=0.3,
-            max_tokens=200
-        )
-        
-        response = chat_completion.choices[0].message.content
+        response = groq_completion(client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ], temperature=0.3, max_tokens=200)
         
         return jsonify({
             'response': response,
@@ -5,7 +5,9 @@ import re
 from app.decorators import login_required
 from app.models.patient import PatientStore
 from app.services.infermedica_service import InfermedicaService
+from app.services.alert_index import get_alert_index
 from app.config_settings import Config
+from app.services.llm_cache import groq_completion
 
 chatbot_bp = Blueprint('chatbot', __name__)
 patient_store = PatientStore()
@@ -103,17 +105,12 @@ def extract_symptoms_with_groq(user_message):
     Symptômes courants à reconnaître: chest_pain, shortness_of_breath, headache, fever, nausea, dizziness, abdominal_pain, fatigue"""
     
     try:
-        response = groq_client.chat.completions.create(
-            model=Config.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Message du patient: {user_message}"}
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
-        
-        result_text = response.choices[0].message.content.strip()
+        content = groq_completion(groq_client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Message du patient: {user_message}"}
+        ], temperature=0.3, max_tokens=500)
+        
+        result_text = content.strip()
         
         # Try to parse JSON response
         try:
@@ -161,17 +158,13 @@ def generate_advice_with_groq(user_message, triage_result, patient):
     RÉPONSE EN FRANÇAIS, maximum 200 mots."""
     
     try:
-        response = groq_client.chat.completions.create(
-            model=Config.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "Génère une réponse appropriée basée sur ces informations médicales."}
-            ],
-            temperature=0.7,
-            max_tokens=400
-        )
-        
-        return response.choices[0].message.content.strip()
+        # Réponse empathique à température élevée : volontairement hors cache
+        content = groq_completion(groq_client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": "Génère une réponse appropriée basée sur ces informations médicales."}
+        ], temperature=0.7, max_tokens=400, bypass=True)
+        
+        return content.strip()
         
     except Exception as e:
         print(f"Groq advice generation error: {str(e)}")
@@ -192,17 +185,12 @@ def get_general_medical_advice(user_message):
     6. Réponds en français"""
     
     try:
-        response = groq_client.chat.completions.create(
-            model=Config.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.6,
-            max_tokens=300
-        )
-        
-        return response.choices[0].message.content.strip()
+        content = groq_completion(groq_client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ], temperature=0.6, max_tokens=300)
+        
+        return content.strip()
         
     except Exception as e:
         print(f"General advice error: {str(e)}")
@@ -231,11 +219,13 @@ def create_emergency_alert(patient, message, triage_result):
             'emergency_level': 5,  # Maximum priority
             'status': 'processing',
             'created_at': datetime.utcnow().isoformat(),
+            'version': 1,
             'source': 'medibot_triage',
             'triage_data': triage_result
         }
         
-        alerts_collection.add(alert_data)
+        _, doc_ref = alerts_collection.add(alert_data)
+        get_alert_index().apply(doc_ref.id, alert_data)
         print(f"Emergency alert created for {patient.nom_prenom}")
         
     except Exception as e:
@@ -5,8 +5,10 @@ from datetime import datetime
 from app.decorators import login_required
 from app.models.patient import PatientStore
 from app.services.infermedica_service import InfermedicaService
+from app.services.alert_index import get_alert_index
 from app.services.firebase_service import FirebaseService
 from app.config_settings import Config
+from app.services.llm_cache import groq_completion
 
 emergency_chat_bp = Blueprint('emergency_chat', __name__)
 patient_store = PatientStore()
@@ -126,17 +128,12 @@ def extract_emergency_symptoms(user_message):
     Si aucun symptôme clair: retourne []"""
     
     try:
-        response = groq_client.chat.completions.create(
-            model=Config.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"URGENCE: {user_message}"}
-            ],
-            temperature=0.1,
-            max_tokens=200
-        )
+        content = groq_completion(groq_client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"URGENCE: {user_message}"}
+        ], temperature=0.1, max_tokens=200)
         
-        result = response.choices[0].message.content.strip()
+        result = content.strip()
         
         # Parse JSON or create basic symptom
         try:
@@ -179,17 +176,12 @@ Your goal is to stabilize the patient until the ambulance arrives.
 RESPOND IN FRENCH. Maximum 150 words."""
     
     try:
-        response = groq_client.chat.completions.create(
-            model=Config.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Patient dit: '{user_message}'. Données médicales: {triage_result}"}
-            ],
-            temperature=0.3,
-            max_tokens=300
-        )
+        content = groq_completion(groq_client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Patient dit: '{user_message}'. Données médicales: {triage_result}"}
+        ], temperature=0.3, max_tokens=300)
         
-        return response.choices[0].message.content.strip()
+        return content.strip()
         
     except Exception as e:
         print(f"Emergency instruction error: {str(e)}")
@@ -217,6 +209,7 @@ def create_emergency_alert(patient, message, triage_data):
             'emergency_level': 5,  # Maximum priority
             'status': 'processing',
             'created_at': datetime.utcnow().isoformat(),
+            'version': 1,
             'source': 'medibot_emergency',
             'triage_data': triage_data,
             'alert_type': 'RED_ALERT'
@@ -224,6 +217,7 @@ def create_emergency_alert(patient, message, triage_data):
         
         # Add to Firestore
         doc_ref = alerts_collection.add(alert_data)
+        get_alert_index().apply(doc_ref[1].id, alert_data)
         print(f"🚨 RED ALERT created for {patient.nom_prenom} - ID: {doc_ref[1].id}")
         
         return True
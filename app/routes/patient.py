@@ -4,6 +4,7 @@ from app.models.patient import PatientStore
 from app.models.user import UserStore
 from app.services.firebase_service import FirebaseService
 from firebase_admin import firestore
+from app.services.serialization import decode_field
 
 patient_bp = Blueprint('patient', __name__)
 patient_store = PatientStore()
@@ -50,19 +51,11 @@ def profile():
         
         # Parse patient data if it's a JSON string
         if 'patient' in alert and isinstance(alert['patient'], str):
-            try:
-                import json
-                normalized_alert['patient'] = json.loads(alert['patient'])
-            except:
-                pass
+            normalized_alert['patient'] = decode_field(alert['patient']) or alert['patient']
         
-        # Parse dispatch_info if it's a JSON string
-        if 'dispatch_info' in alert and isinstance(alert['dispatch_info'], str):
-            try:
-                import json
-                normalized_alert['dispatch_result'] = json.loads(alert['dispatch_info'])
-            except:
-                pass
+        # dispatch_info : dict (format actuel) ou chaîne JSON (anciennes alertes)
+        if alert.get('dispatch_info'):
+            normalized_alert['dispatch_result'] = decode_field(alert['dispatch_info'])
         
         normalized_alerts.append(normalized_alert)
     
@@ -168,26 +161,18 @@ def alert_detail(alert_id):
     
     # Parse JSON strings like in profile route
     if 'patient' in alert and isinstance(alert['patient'], str):
-        try:
-            import json
-            alert['patient'] = json.loads(alert['patient'])
-        except:
-            pass
-    
-    if 'dispatch_info' in alert and isinstance(alert['dispatch_info'], str):
-        try:
-            import json
-            dispatch_result = json.loads(alert['dispatch_info'])
-            alert['dispatch_result'] = dispatch_result
-            
-            # Extract hospital data for template compatibility
-            if dispatch_result.get('hospital'):
-                hospital = dispatch_result['hospital']
-                alert['hospital_name'] = hospital.get('name', '')
-                alert['distance_km'] = hospital.get('distance_km', '')
-                alert['eta_minutes'] = hospital.get('eta_minutes', '')
-        except:
-            pass
+        alert['patient'] = decode_field(alert['patient']) or alert['patient']
+    
+    dispatch_result = decode_field(alert.get('dispatch_info'))
+    if isinstance(dispatch_result, dict):
+        alert['dispatch_result'] = dispatch_result
+        
+        # Extract hospital data for template compatibility
+        if dispatch_result.get('hospital'):
+            hospital = dispatch_result['hospital']
+            alert['hospital_name'] = hospital.get('name', '')
+            alert['distance_km'] = hospital.get('distance_km', '')
+            alert['eta_minutes'] = hospital.get('eta_minutes', '')
     
     # Also check for direct fields saved by EmergencyOrchestrator
     if not alert.get('hospital_name') and alert.get('selected_hospital'):
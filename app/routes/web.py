@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from app.services.location_service import LocationService
 from app.services.firebase_service import FirebaseService
+from app.services.alert_versions import versioned
+from app.services.alert_index import get_alert_index
 from app.decorators import login_required
 import uuid
 import json
@@ -48,10 +50,12 @@ def alert_form():
             'patient': form_data,
             'status': 'En attente',
             'username': session.get('user'),
-            'created_at': datetime.utcnow().isoformat()
+            'created_at': datetime.utcnow().isoformat(),
+            'version': 1
         }
         
         alerts_collection.document(alert_id).set(initial_data)
+        get_alert_index().apply(alert_id, initial_data)
         flash('Alerte créée avec succès!', 'success')
         
         try:
@@ -86,16 +90,18 @@ def alert_form():
             }
             
             # 7. Update Firebase
-            alerts_collection.document(alert_id).update(updates)
+            alerts_collection.document(alert_id).update(versioned(updates))
+            get_alert_index().apply(alert_id, updates)
             
         except Exception as e:
             print(f"Crew Error: {e}")
             # Update status to Error in Firebase
-            alerts_collection.document(alert_id).update({
+            alerts_collection.document(alert_id).update(versioned({
                 'status': 'Erreur',
                 'error': str(e),
                 'updated_at': datetime.utcnow().isoformat()
-            })
+            }))
+            get_alert_index().apply(alert_id, {'status': 'Erreur'})
             flash('Erreur lors du traitement de l\'alerte', 'error')
         
         return redirect(url_for('patient.profile'))
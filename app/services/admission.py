@@ -0,0 +1,221 @@
+import threading
+import time
+from contextlib import contextmanager
+from app.config_settings import Config
+
+# Voies par ordre de priorité : alertes rouges et suivi, puis chat de triage, puis le reste
+LANES = ('critical', 'triage', 'general', 'admin')
+
+BLUEPRINT_LANES = {
+    'api': 'critical',
+    'emergency_chat': 'triage',
+    'chat': 'general',
+    'chatbot': 'general',
+    'admin': 'admin',
+}
+
+# Exceptions au découpage par blueprint (None : hors contrôle d'admission)
+ENDPOINT_LANES = {
+    'web.alert_form': 'critical',
+    'web.tracking': 'critical',
+    'auth.login': 'critical',  # un patient doit pouvoir se connecter pour lancer l'alerte
+    'api.get_dispatch_stats': 'admin',
+    'api.prepare_alert': 'general',  # préchauffage spéculatif : délesté en premier
+    'api.stream_alert': None,  # flux SSE longue durée, borné par le bus d'événements
+    'static': None,
+}
+
+# Fonctionnalités coûteuses abandonnées à partir d'un niveau de pression
+SKIP_AT = {'specialist': 1}
+
+
+class LaneOverloaded(Exception):
+    """Requête refusée par le contrôle d'admission (voie saturée ou délestée)"""
+
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"Voie {lane} {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Lane:
+    def __init__(self, name, limit, queue_timeout, shed_at):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.shed_at = shed_at
+        self.slots = threading.BoundedSemaphore(limit)
+        self.in_flight = 0
+        self.admitted = 0
+        self.timed_out = 0
+        self.shed = 0
+
+
+class AdmissionController:
+    """
+    Contrôle d'admission par voies de priorité, commun à tous les blueprints :
+    - chaque voie a sa propre limite de requêtes simultanées et un délai d'attente maximal
+      (au-delà : 503 + Retry-After plutôt qu'un thread bloqué indéfiniment) ;
+    - les voies basses ne peuvent pas consommer les workers réservés aux alertes ;
+    - délestage adaptatif : quand la file de dispatch se remplit ou que la latence LLM
+      dérive, le niveau de pression monte ; les voies basses sont refusées d'emblée
+      (MediBot général d'abord, puis l'admin) et l'agent spécialiste LLM est sauté.
+    La latence LLM décroît sans nouvel échantillon (demi-vie llm_half_life) : le délestage
+    supprimant justement ces appels, la pression ne reste pas bloquée au niveau 1.
+    """
+
+    def __init__(self, lanes=None, queue_ratio=None, llm_threshold=None, queue_threshold=None,
+                 clock=time.monotonic, refresh=1.0, llm_half_life=None):
+        lanes = lanes or Config.ADMISSION_LANES
+        self.lanes = {name: _Lane(name, *lanes[name]) for name in lanes}
+        self.queue_ratio = queue_ratio or _dispatch_queue_ratio
+        self.llm_threshold = llm_threshold or Config.SHED_LLM_LATENCY_SECONDS
+        self.queue_threshold = queue_threshold or Config.SHED_QUEUE_RATIO
+        self.clock = clock
+        self.refresh = refresh
+        self.llm_half_life = llm_half_life or Config.SHED_LLM_HALF_LIFE
+        self._lock = threading.Lock()
+        self._llm_latency = 0.0
+        self._llm_at = None
+        self._level = 0
+        self._level_at = None
+
+    # --- VOIES ---
+    @staticmethod
+    def lane_for(endpoint, blueprint):
+        if endpoint in ENDPOINT_LANES:
+            return ENDPOINT_LANES[endpoint]
+        return BLUEPRINT_LANES.get(blueprint, 'general')
+
+    def admit(self, lane_name):
+        """Réserve une place dans la voie (attente bornée) ; lève LaneOverloaded sinon"""
+        lane = self.lanes[lane_name]
+        if lane.shed_at is not None and self.pressure() >= lane.shed_at:
+            with self._lock:
+                lane.shed += 1
+            raise LaneOverloaded(lane_name, 'délestée', Config.SHED_RETRY_AFTER)
+        if not lane.slots.acquire(timeout=lane.queue_timeout):
+            with self._lock:
+                lane.timed_out += 1
+            raise LaneOverloaded(lane_name, 'saturée', max(1, int(lane.queue_timeout)))
+        with self._lock:
+            lane.in_flight += 1
+            lane.admitted += 1
+
+    def release(self, lane_name):
+        lane = self.lanes[lane_name]
+        with self._lock:
+            lane.in_flight -= 1
+        lane.slots.release()
+
+    # --- PRESSION ---
+    def observe_llm(self, seconds):
+        """Latence d'un appel LLM (moyenne mobile exponentielle)"""
+        now = self.clock()
+        with self._lock:
+            latency = self._decayed_llm(now)
+            self._llm_latency = seconds if not latency else 0.8 * latency + 0.2 * seconds
+            self._llm_at = now
+
+    def _decayed_llm(self, now):
+        # Appelé sous self._lock : moyenne atténuée depuis le dernier échantillon
+        if self._llm_at is None:
+            return self._llm_latency
+        return self._llm_latency * 0.5 ** (max(now - self._llm_at, 0.0) / self.llm_half_life)
+
+    @contextmanager
+    def track_llm(self):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe_llm(time.monotonic() - started)
+
+    def pressure(self):
+        """0 : normal, 1 : dégradé (délestage des voies basses), 2 : critique"""
+        now = self.clock()
+        with self._lock:
+            if self._level_at is not None and now - self._level_at < self.refresh:
+                return self._level
+            llm_latency = self._decayed_llm(now)
+            llm_slow = llm_latency >= self.llm_threshold
+        try:
+            ratio = self.queue_ratio()
+        except Exception as e:
+            print(f"[Admission] Lecture de la file impossible: {e}")
+            ratio = 0.0
+        queue_high = ratio >= self.queue_threshold
+        level = 2 if ratio >= 0.9 or (queue_high and llm_slow) else 1 if (queue_high or llm_slow) else 0
+        with self._lock:
+            if level != self._level:
+                print(f"[Admission] Niveau de pression {self._level} -> {level} (file {ratio:.0%}, LLM {llm_latency:.1f}s)")
+            self._level, self._level_at = level, now
+        return level
+
+    def should_skip(self, feature):
+        threshold = SKIP_AT.get(feature)
+        return threshold is not None and self.pressure() >= threshold
+
+    def stats(self):
+        level = self.pressure()
+        with self._lock:
+            return {
+                'pressure': level,
+                'llm_latency_s': round(self._decayed_llm(self.clock()), 2),
+                'lanes': {name: {'limit': lane.limit, 'in_flight': lane.in_flight, 'admitted': lane.admitted,
+                                 'timed_out': lane.timed_out, 'shed': lane.shed}
+                          for name, lane in self.lanes.items()}
+            }
+
+
+def _dispatch_queue_ratio():
+    from app.services.dispatch_worker import get_dispatch_worker
+    worker = get_dispatch_worker()
+    if worker.queue is None:
+        return 0.0
+    return worker.queue.pending_count() / max(worker.max_queue, 1)
+
+
+def install_admission(app, controller=None):
+    """Branche le contrôle d'admission sur toutes les requêtes de l'application Flask"""
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def admit_request():
+        ctrl = controller or get_admission_controller()
+        lane = ctrl.lane_for(request.endpoint, request.blueprint)
+        if lane is None:
+            return None
+        try:
+            ctrl.admit(lane)
+        except LaneOverloaded as e:
+            response = jsonify({
+                'error': str(e),
+                'response': "Service temporairement limité pour prioriser les urgences. "
+                            "En cas d'urgence vitale, appelez le 15.",
+                'lane': e.lane,
+                'shed': e.reason == 'délestée'
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        g.admission = (ctrl, lane)
+
+    @app.teardown_request
+    def release_request(exc=None):
+        admission = g.pop('admission', None)
+        if admission:
+            admission[0].release(admission[1])
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+    return _controller
@@ -0,0 +1,116 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from app.config_settings import Config
+
+KM_PER_DEG_LAT = 110.574
+
+
+class _TTLIndex:
+    """Clé -> (alert_id, échéance) ; même TTL pour toutes les clés, purge par l'avant"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def purge(self, now):
+        while self._entries:
+            key, (_, expires) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def put(self, key, alert_id, now):
+        self._entries.pop(key, None)
+        self._entries[key] = (alert_id, now + self.ttl)
+
+    def drop(self, alert_id):
+        for key in [k for k, (a, _) in self._entries.items() if a == alert_id]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AlertDeduplicator:
+    """
+    Suppression des alertes en double avant tout travail (ORS, LLM, ambulance) :
+    - clé d'idempotence (en-tête Idempotency-Key) : même clé et même utilisateur -> même alerte,
+      pendant IDEMPOTENCY_TTL_SECONDS ;
+    - quasi-doublon : même utilisateur, même cellule de DUPLICATE_CELL_KM (ou cellule voisine),
+      dans les DUPLICATE_WINDOW_SECONDS -> l'alerte existante est renvoyée.
+    La réservation est atomique : deux requêtes simultanées ne peuvent pas créer deux alertes.
+    """
+
+    def __init__(self, key_ttl=None, window=None, cell_km=None, clock=time.monotonic):
+        self.keys = _TTLIndex(key_ttl if key_ttl is not None else Config.IDEMPOTENCY_TTL_SECONDS)
+        self.nearby = _TTLIndex(window if window is not None else Config.DUPLICATE_WINDOW_SECONDS)
+        self.cell_km = cell_km or Config.DUPLICATE_CELL_KM
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._suppressed = 0
+
+    def _cell(self, lat, lng):
+        step_lat = self.cell_km / KM_PER_DEG_LAT
+        step_lng = self.cell_km / (111.320 * max(math.cos(math.radians(lat)), 0.01))
+        return int(math.floor(lat / step_lat)), int(math.floor(lng / step_lng))
+
+    def _neighbours(self, user, lat, lng):
+        row, col = self._cell(lat, lng)
+        return [(user, row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+    def claim_key(self, alert_id, user, key):
+        """Réserve la clé d'idempotence ; renvoie l'alerte déjà associée à la clé, ou None"""
+        if not key:
+            return None
+        with self._lock:
+            now = self.clock()
+            self.keys.purge(now)
+            existing = self.keys.get((user, key))
+            if existing:
+                self._suppressed += 1
+                return existing
+            self.keys.put((user, key), alert_id, now)
+            return None
+
+    def claim_location(self, alert_id, user, lat, lng):
+        """Réserve la cellule de l'utilisateur ; renvoie l'alerte récente voisine, ou None"""
+        if not user or lat is None or lng is None:
+            return None
+        with self._lock:
+            now = self.clock()
+            self.nearby.purge(now)
+            for cell in self._neighbours(user, lat, lng):
+                existing = self.nearby.get(cell)
+                if existing and existing != alert_id:
+                    self._suppressed += 1
+                    return existing
+            self.nearby.put((user,) + self._cell(lat, lng), alert_id, now)
+            return None
+
+    def release(self, alert_id):
+        """La création a échoué : les réservations de cette alerte sont libérées"""
+        with self._lock:
+            self.keys.drop(alert_id)
+            self.nearby.drop(alert_id)
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self.keys), 'recent_locations': len(self.nearby), 'suppressed': self._suppressed}
+
+
+_dedup = None
+_dedup_lock = threading.Lock()
+
+
+def get_alert_deduplicator():
+    global _dedup
+    with _dedup_lock:
+        if _dedup is None:
+            _dedup = AlertDeduplicator()
+    return _dedup
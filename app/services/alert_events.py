@@ -0,0 +1,202 @@
+import queue
+import threading
+import uuid
+from collections import deque
+from app.config_settings import Config
+
+TERMINAL_STATUSES = ('RESOLVED', 'ERROR', 'REJECTED')
+
+
+def tracking_view(data):
+    """Champs d'une alerte utiles à la page de suivi (sans calcul dépendant de l'instant)"""
+    dist_pat_hosp = data.get('dist_pat_hosp', 0)
+    # Si jamais les données manquent (vieilles alertes), on met un fallback
+    if dist_pat_hosp == 0 and data.get('selected_hospital'):
+        dist_pat_hosp = data['selected_hospital'].get('distance_km', 0)
+    return {
+        'status': data.get('status', 'processing'),
+        'logs': data.get('logs', []),
+        'route_active': data.get('route_active'),
+        'route_red': data.get('route_red'),
+        'route_blue': data.get('route_blue'),
+        'dist_amb_pat': data.get('dist_amb_pat', 0),
+        'dist_pat_hosp': dist_pat_hosp,
+        'severity_level': data.get('emergency_level', 2),
+        'eta_minutes': data.get('eta_minutes'),
+        'selected_hospital': data.get('selected_hospital'),
+        'ambulance': data.get('ambulance'),
+        'trajectory': data.get('trajectory'),
+        'patient': data.get('patient'),
+        'location': data.get('location'),
+        'medical_protocol': data.get('medical_protocol'),
+        'version': data.get('version', 0)
+    }
+
+
+def diff_view(old, new):
+    """
+    Champs modifiés entre deux vues. Les logs ne font qu'augmenter : seules les nouvelles
+    lignes sont envoyées ('logs_append').
+    """
+    changed = {}
+    for key, value in new.items():
+        if old.get(key) == value:
+            continue
+        old_logs = old.get('logs') or []
+        if key == 'logs' and value[:len(old_logs)] == old_logs:
+            changed['logs_append'] = value[len(old_logs):]
+        else:
+            changed[key] = value
+    return changed
+
+
+def firestore_watch(alert_id, callback):
+    """Source par défaut : un listener Firestore sur le document de l'alerte"""
+    from app.services.firebase_service import FirebaseService
+    doc_ref = FirebaseService().get_collection('alerts').document(alert_id)
+
+    def on_snapshot(snapshots, changes, read_time):
+        for snapshot in snapshots:
+            if snapshot.exists:
+                callback(snapshot.to_dict())
+
+    watch = doc_ref.on_snapshot(on_snapshot)
+    return watch.unsubscribe
+
+
+class _Channel:
+    def __init__(self, history):
+        self.view = None
+        self.seq = 0
+        self.history = deque(maxlen=history)
+        self.subscribers = set()
+        self.unwatch = None
+
+
+class AlertEventBus:
+    """
+    Diffusion des changements d'alerte aux flux SSE du processus :
+    - une seule source par alerte (listener Firestore ou publication directe), partagée par
+      tous les abonnés, ouverte au premier abonnement et fermée au dernier ;
+    - chaque événement ne contient que les champs modifiés ;
+    - un historique court permet de reprendre après `Last-Event-ID` ; sinon un instantané complet est renvoyé.
+    Les identifiants d'événement sont préfixés par un jeton propre au processus : après un
+    redémarrage, un ancien Last-Event-ID déclenche simplement un nouvel instantané.
+    """
+
+    def __init__(self, watch=None, history=None):
+        self.watch = watch or firestore_watch
+        self.history = history or Config.SSE_HISTORY
+        self.token = uuid.uuid4().hex[:8]
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _event_id(self, seq):
+        return f"{self.token}:{seq}"
+
+    # --- SOURCE ---
+    def publish(self, alert_id, data):
+        """Nouvel état complet de l'alerte (thread-safe) ; diffuse le diff aux abonnés"""
+        view = tracking_view(data)
+        with self._lock:
+            channel = self._channels.get(alert_id)
+            if channel is None:
+                return None
+            if channel.view is None:
+                channel.view = view
+                channel.seq += 1
+                event = (self._event_id(channel.seq), 'snapshot', view)
+            else:
+                changed = diff_view(channel.view, view)
+                if not changed:
+                    return None
+                channel.view = view
+                channel.seq += 1
+                event = (self._event_id(channel.seq), 'update', changed)
+                channel.history.append(event)
+            subscribers = list(channel.subscribers)
+        for sub in subscribers:
+            sub.put(event)
+        return event
+
+    # --- ABONNÉS ---
+    def subscribe(self, alert_id, last_event_id=None):
+        """Renvoie (file d'événements, événements de reprise)"""
+        sub = queue.Queue()
+        with self._lock:
+            channel = self._channels.get(alert_id)
+            start_watch = channel is None
+            if start_watch:
+                channel = self._channels[alert_id] = _Channel(self.history)
+            channel.subscribers.add(sub)
+            backlog = self._backlog(channel, last_event_id)
+        if start_watch:
+            try:
+                unwatch = self.watch(alert_id, lambda data: self.publish(alert_id, data))
+            except Exception:
+                self.unsubscribe(alert_id, sub)
+                raise
+            with self._lock:
+                channel.unwatch = unwatch
+                orphaned = self._channels.get(alert_id) is not channel
+            if orphaned:
+                # Dernier abonné parti pendant l'ouverture du listener
+                unwatch()
+        return sub, backlog
+
+    @staticmethod
+    def _seq(event_id):
+        return int(event_id.partition(':')[2])
+
+    def _backlog(self, channel, last_event_id):
+        if channel.view is None:
+            return []
+        token, _, seq = (last_event_id or '').partition(':')
+        if token == self.token and seq.isdigit():
+            seq = int(seq)
+            if seq == channel.seq:
+                return []
+            # Reprise possible seulement si l'historique couvre tout ce qui a été manqué
+            if channel.history and self._seq(channel.history[0][0]) <= seq + 1 <= channel.seq:
+                return [e for e in channel.history if self._seq(e[0]) > seq]
+        return [(self._event_id(channel.seq), 'snapshot', channel.view)]
+
+    def unsubscribe(self, alert_id, sub):
+        unwatch = None
+        with self._lock:
+            channel = self._channels.get(alert_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(sub)
+            if not channel.subscribers:
+                del self._channels[alert_id]
+                unwatch = channel.unwatch
+        if unwatch:
+            try:
+                unwatch()
+            except Exception as e:
+                print(f"[SSE] Arrêt du listener {alert_id} impossible: {e}", flush=True)
+
+    def current_view(self, alert_id):
+        with self._lock:
+            channel = self._channels.get(alert_id)
+            return dict(channel.view) if channel and channel.view else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'subscribers': sum(len(c.subscribers) for c in self._channels.values())
+            }
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_alert_event_bus():
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = AlertEventBus()
+    return _bus
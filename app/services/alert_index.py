@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict
+from app.config_settings import Config
+from app.services.alert_events import TERMINAL_STATUSES
+from app.services.serialization import is_sentinel
+
+# Statuts finaux, y compris ceux de l'ancien formulaire (web.alert_form)
+CLOSED_STATUSES = TERMINAL_STATUSES + ('Terminé', 'Erreur')
+
+
+def alert_summary(alert_id, data, previous=None):
+    """
+    Résumé d'une alerte pour le tableau de bord (format attendu par dashboard.js).
+    - data : document complet ou mise à jour partielle ; les champs absents gardent leur valeur.
+    """
+    summary = dict(previous or {'id': alert_id})
+    patient = data.get('patient')
+    if isinstance(patient, dict):
+        summary.update({
+            'patient_name': patient.get('nom_prenom'),
+            'age': patient.get('age'),
+            'symptoms': patient.get('symptomes')
+        })
+    if data.get('patient.symptomes'):
+        summary['symptoms'] = data['patient.symptomes']
+    for field, key in (('status', 'status'), ('emergency_level', 'severity'), ('eta_minutes', 'eta'),
+                       ('username', 'username'), ('created_at', 'created_at'), ('updated_at', 'updated_at')):
+        if field in data and not is_sentinel(data[field]):
+            summary[key] = data[field]
+    try:
+        summary['severity'] = int(summary.get('severity', 2))
+    except (TypeError, ValueError):
+        summary['severity'] = 2
+    summary.setdefault('status', 'processing')
+    return summary
+
+
+class AlertIndex:
+    """
+    Vue matérialisée des alertes actives et récentes, tenue à jour en mémoire :
+    - alimentée par les écritures de l'orchestrateur et de l'API (même processus) et,
+      optionnellement, par un listener Firestore (ALERT_INDEX_LISTENER) pour les autres instances ;
+    - les alertes sont rangées par utilisateur à l'écriture : une lecture ne parcourt que
+      le compartiment demandé (borné par ALERT_INDEX_RECENT), jamais la collection ;
+    - au premier accès, une seule requête bornée (les N alertes les plus récentes) l'amorce.
+    """
+
+    def __init__(self, loader=None, recent=None):
+        self.loader = loader
+        self.recent_size = recent or Config.ALERT_INDEX_RECENT
+        self._alerts = {}
+        self._recent = OrderedDict()
+        self._active = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self._warmed = loader is None
+        self._warm_lock = threading.Lock()
+
+    # --- ALIMENTATION ---
+    def apply(self, alert_id, data):
+        """Applique un document (ou une mise à jour partielle) ; thread-safe"""
+        with self._lock:
+            previous = self._alerts.get(alert_id)
+            if previous is None and 'created_at' not in data and not isinstance(data.get('patient'), dict):
+                # Mise à jour partielle d'une alerte inconnue (créée ailleurs) : l'amorçage ou le listener la fourniront
+                return None
+            summary = alert_summary(alert_id, data, previous)
+            self._alerts[alert_id] = summary
+            buckets = [(self._recent, self._active)]
+            user = summary.get('username')
+            if user:
+                buckets.append(self._by_user.setdefault(user, (OrderedDict(), OrderedDict())))
+            for recent, active in buckets:
+                # Une nouvelle alerte passe en tête ; une mise à jour garde sa place
+                recent[alert_id] = summary
+                if summary['status'] in CLOSED_STATUSES:
+                    active.pop(alert_id, None)
+                else:
+                    active[alert_id] = summary
+            self._trim()
+            return summary
+
+    def _trim(self):
+        while len(self._recent) > self.recent_size:
+            old_id, old = self._recent.popitem(last=False)
+            user_buckets = self._by_user.get(old.get('username'))
+            if user_buckets:
+                user_buckets[0].pop(old_id, None)
+            if old_id in self._active:
+                # Sortie des récentes mais toujours active : reste indexée
+                continue
+            self._alerts.pop(old_id, None)
+            if user_buckets and not user_buckets[0] and not user_buckets[1]:
+                del self._by_user[old['username']]
+
+    def remove(self, alert_id):
+        with self._lock:
+            summary = self._alerts.pop(alert_id, None)
+            self._recent.pop(alert_id, None)
+            self._active.pop(alert_id, None)
+            if summary and summary.get('username') in self._by_user:
+                for bucket in self._by_user[summary['username']]:
+                    bucket.pop(alert_id, None)
+
+    def _ensure_warm(self):
+        if self._warmed:
+            return
+        with self._warm_lock:
+            if self._warmed:
+                return
+            try:
+                for alert_id, data in self.loader(self.recent_size):
+                    self.apply(alert_id, data)
+            except Exception as e:
+                print(f"[AlertIndex] Amorçage impossible: {e}", flush=True)
+            self._warmed = True
+
+    # --- LECTURE ---
+    def _select(self, which, user, status, severity, limit):
+        self._ensure_warm()
+        with self._lock:
+            if user:
+                recent, active = self._by_user.get(user, ({}, {}))
+            else:
+                recent, active = self._recent, self._active
+            bucket = active if which == 'active' else recent
+            out = []
+            for summary in reversed(bucket.values()):
+                if status and summary['status'] not in status:
+                    continue
+                if severity and summary['severity'] not in severity:
+                    continue
+                out.append(dict(summary))
+                if limit and len(out) >= limit:
+                    break
+            return out
+
+    def active(self, user=None, status=None, severity=None, limit=None):
+        """Alertes non terminées, la plus récente d'abord"""
+        return self._select('active', user, status, severity, limit)
+
+    def recent(self, user=None, status=None, severity=None, limit=10):
+        """Dernières alertes créées, la plus récente d'abord"""
+        return self._select('recent', user, status, severity, limit)
+
+    def stats(self):
+        with self._lock:
+            return {'indexed': len(self._alerts), 'active': len(self._active), 'users': len(self._by_user)}
+
+
+def firestore_recent(limit):
+    """Amorçage : les `limit` alertes les plus récentes (une requête bornée)"""
+    from firebase_admin import firestore
+    from app.services.firebase_service import FirebaseService
+    query = (FirebaseService().get_collection('alerts')
+             .order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit))
+    return [(doc.id, doc.to_dict()) for doc in reversed(list(query.stream()))]
+
+
+def firestore_listen(index):
+    """Listener Firestore sur les alertes des dernières ALERT_INDEX_LISTENER_HOURS heures (autres instances)"""
+    from datetime import datetime, timedelta
+    from app.services.firebase_service import FirebaseService
+    since = (datetime.utcnow() - timedelta(hours=Config.ALERT_INDEX_LISTENER_HOURS)).isoformat()
+
+    def on_snapshot(snapshots, changes, read_time):
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                index.remove(change.document.id)
+            else:
+                index.apply(change.document.id, change.document.to_dict())
+
+    query = FirebaseService().get_collection('alerts').where('created_at', '>=', since)
+    return query.on_snapshot(on_snapshot).unsubscribe
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_alert_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AlertIndex(loader=firestore_recent)
+            if Config.ALERT_INDEX_LISTENER:
+                try:
+                    firestore_listen(_index)
+                except Exception as e:
+                    print(f"[AlertIndex] Listener Firestore indisponible: {e}", flush=True)
+    return _index
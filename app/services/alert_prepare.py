@@ -0,0 +1,110 @@
+import threading
+import uuid
+from app.config_settings import Config
+from app.services.deadline import Deadline, LRUCache
+from app.services.trajectory import haversine_km
+
+
+class AlertPreparer:
+    """
+    Préchauffage du formulaire d'alerte (POST /api/alert/prepare, à l'ouverture puis au fix GPS) :
+    - la position est résolue (géocodage compris) ;
+    - le dispatch est planifié par le même moteur que POST /api/alert (hôpital, ambulance libre
+      la plus proche, itinéraires ORS), sans réserver l'ambulance ;
+    - le tout est rangé sous un jeton court (ALERT_PREPARE_TTL), lié à l'utilisateur.
+    POST /api/alert consomme le jeton (usage unique) si la position envoyée correspond : plus de
+    géocodage, et assign() reprend l'affectation préparée si elle tient encore (même hôpital avec
+    l'âge et les symptômes réels, même ambulance toujours libre), sans nouvel appel ORS.
+    """
+
+    def __init__(self, geolocation_service, dispatch_engine, ttl=None, max_tokens=None, max_drift_km=None):
+        self.geolocation_service = geolocation_service
+        self.dispatch_engine = dispatch_engine
+        self.ttl = ttl or Config.ALERT_PREPARE_TTL
+        self.max_drift_km = max_drift_km if max_drift_km is not None else Config.ALERT_PREPARE_MAX_DRIFT_KM
+        self.tokens = LRUCache(max_tokens or Config.ALERT_PREPARE_MAX_TOKENS, self.ttl)
+        self._lock = threading.Lock()
+        self._prepared = 0
+        self._used = 0
+        self._mismatched = 0
+        self._reused = 0
+        self._replanned = 0
+
+    def prepare(self, user, gps=None, address=None, ip=None, emergency_level=2, age=None, symptoms=None,
+                previous_token=None):
+        """Prépare le dispatch d'une alerte probable ; renvoie (jeton, entrée) ou (None, None)"""
+        if previous_token:
+            self.tokens.pop(previous_token)
+        deadline = Deadline(Config.ALERT_PREPARE_SECONDS)
+        manual = {'address': address, 'lat': None, 'lng': None} if address and not (gps and gps.get('lat')) else None
+        location = self.geolocation_service.merge_all_location_sources(gps, manual, ip, deadline=deadline)
+        if not location or not location.get('lat') or not location.get('lng'):
+            return None, None
+        lat, lng = float(location['lat']), float(location['lng'])
+
+        assignment = {}
+        try:
+            assignment = self.dispatch_engine.plan(lat, lng, int(emergency_level), age=age, symptoms=symptoms,
+                                                   deadline=deadline, reserve=False)
+        except Exception as e:
+            print(f"[Prepare] Préchauffage partiel: {e}")
+        entry = {
+            'user': user,
+            'location': location,
+            'address': _normalize(address),
+            'assignment': assignment,
+            'candidates': {key: assignment[key].get(field) for key, field in
+                           (('hospital', 'name'), ('ambulance', 'id')) if assignment.get(key)}
+        }
+        token = uuid.uuid4().hex
+        self.tokens.put(token, entry)
+        with self._lock:
+            self._prepared += 1
+        return token, entry
+
+    def consume(self, token, user, lat=None, lng=None, address=None):
+        """
+        Entrée préparée si le jeton est valide, appartient à l'utilisateur et que la position
+        envoyée correspond (moins de ALERT_PREPARE_MAX_DRIFT_KM, ou même adresse sans coordonnées).
+        """
+        if not token:
+            return None
+        entry = self.tokens.pop(token)
+        if not entry or entry['user'] != user:
+            return None
+        prepared = entry['location']
+        if lat is not None and lng is not None:
+            matches = haversine_km(lat, lng, float(prepared['lat']), float(prepared['lng'])) <= self.max_drift_km
+        else:
+            matches = bool(entry['address']) and entry['address'] == _normalize(address)
+        with self._lock:
+            if matches:
+                self._used += 1
+            else:
+                self._mismatched += 1
+        return entry if matches else None
+
+    def assign(self, entry, lat, lng, emergency_level=2, age=None, symptoms=None, deadline=None):
+        """Affectation de l'alerte : celle du jeton si elle est revalidée, sinon un plan complet"""
+        assignment = None
+        if entry:
+            assignment = self.dispatch_engine.revalidate(entry.get('assignment'), lat, lng, emergency_level,
+                                                         age=age, symptoms=symptoms)
+            with self._lock:
+                if assignment is None:
+                    self._replanned += 1
+                else:
+                    self._reused += 1
+        if assignment is None:
+            assignment = self.dispatch_engine.plan(lat, lng, emergency_level, age=age, symptoms=symptoms,
+                                                   deadline=deadline)
+        return assignment
+
+    def stats(self):
+        with self._lock:
+            return dict(self.tokens.stats(), prepared=self._prepared, used=self._used, mismatched=self._mismatched,
+                        reused=self._reused, replanned=self._replanned)
+
+
+def _normalize(address):
+    return ' '.join((address or '').lower().split())
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from firebase_admin import firestore
+from app.config_settings import Config
+from app.services.alert_events import diff_view
+from app.services.serialization import dumps_bytes
+
+VERSION_FIELD = 'version'
+
+
+def versioned(updates):
+    """Mise à jour Firestore d'une alerte + incrément atomique de sa version"""
+    return dict(updates, **{VERSION_FIELD: firestore.Increment(1)})
+
+
+def alert_version(data):
+    """Version courante d'une alerte (0 pour les alertes antérieures au versionnement)"""
+    try:
+        return int((data or {}).get(VERSION_FIELD) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def strong_etag(version, payload):
+    """ETag fort : version + empreinte du contenu servi (hors champs purement horaires)"""
+    body = dumps_bytes(payload, sort_keys=True)
+    return f"v{version}-{hashlib.sha1(body).hexdigest()[:16]}"
+
+
+class VersionedViews:
+    """
+    Dernières représentations servies par alerte, indexées par version :
+    un client qui envoie `?since=<version>` ne reçoit que les champs modifiés depuis
+    (et les nouvelles lignes de logs). Si la version n'est plus connue du processus
+    (redémarrage, autre instance, historique dépassé), la réponse complète est renvoyée.
+    """
+
+    def __init__(self, max_alerts=None, depth=None):
+        self.max_alerts = max_alerts or Config.ALERT_VERSION_CACHE_ALERTS
+        self.depth = depth or Config.ALERT_VERSION_CACHE_DEPTH
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def remember(self, key, version, view):
+        with self._lock:
+            versions = self._views.pop(key, None) or OrderedDict()
+            versions.pop(version, None)
+            versions[version] = view
+            while len(versions) > self.depth:
+                versions.popitem(last=False)
+            self._views[key] = versions
+            while len(self._views) > self.max_alerts:
+                self._views.popitem(last=False)
+
+    def get(self, key, version):
+        with self._lock:
+            versions = self._views.get(key)
+            return versions.get(version) if versions else None
+
+    def delta(self, key, since, view, always=()):
+        """
+        Champs modifiés depuis la version `since` (None si elle n'est plus en cache).
+        - always : champs recalculés à chaque requête (position, ETA), toujours renvoyés.
+        """
+        old = self.get(key, since)
+        with self._lock:
+            if old is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        changed = diff_view(old, view)
+        for field in always:
+            if view.get(field) is not None:
+                changed.setdefault(field, view[field])
+        return changed
+
+    def stats(self):
+        with self._lock:
+            return {'alerts': len(self._views), 'delta_hits': self._hits, 'delta_misses': self._misses}
+
+
+_views = None
+_views_lock = threading.Lock()
+
+
+def get_versioned_views():
+    global _views
+    with _views_lock:
+        if _views is None:
+            _views = VersionedViews()
+    return _views
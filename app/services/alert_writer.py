@@ -0,0 +1,155 @@
+import asyncio
+from collections import OrderedDict
+from firebase_admin import firestore
+from app.config_settings import Config
+from app.services.sim_clock import RealClock
+from app.services.firestore_io import run_firestore
+from app.services.alert_versions import versioned
+
+
+class CoalescingAlertWriter:
+    """
+    Tampon d'écriture par alerte pour l'orchestrateur :
+    - les mises à jour consécutives sont fusionnées (champs : la dernière valeur gagne,
+      logs : concaténés dans un seul ArrayUnion) ;
+    - un changement de statut (hors positions 'MOVING') déclenche une écriture immédiate ;
+    - le reste (positions de l'ambulance) est écrit au plus toutes les `flush_interval_ms` ;
+    - les écritures Firestore partent dans le pool Firestore, sans bloquer la boucle asyncio ;
+    - chaque écriture incrémente la version de l'alerte (ETag / deltas de l'API de suivi).
+    Les compteurs (mises à jour reçues / écritures réelles) sont conservés par mission.
+    """
+
+    POSITION_STATUSES = ('MOVING',)
+
+    def __init__(self, collection, clock=None, flush_interval_ms=None, keep_recent=200, on_write=None):
+        self.collection = collection
+        # Notifié après chaque écriture réussie : on_write(alert_id, champs écrits)
+        self.on_write = on_write
+        self.clock = clock or RealClock()
+        self.flush_interval = (flush_interval_ms if flush_interval_ms is not None else Config.ALERT_WRITE_FLUSH_MS) / 1000.0
+        self.keep_recent = keep_recent
+
+        self._buffers = {}
+        self._last_status = {}
+        self._timers = {}
+        self._pending = {}
+        self._tails = {}
+        self._counts = {}
+        self.recent = OrderedDict()
+
+    # --- TAMPON ---
+    def update(self, alert_id, status=None, logs=None, data=None, flush=False):
+        """
+        Ajoute une mise à jour au tampon de l'alerte (appelé depuis la boucle du worker).
+        - flush : écrit immédiatement, comme un changement de statut (ex. nouveau trajet).
+        """
+        buf = self._buffers.setdefault(alert_id, {'fields': {}, 'logs': []})
+        if data:
+            buf['fields'].update(data)
+        if status:
+            buf['fields']['status'] = status
+            buf['fields']['updated_at'] = self.clock.utcnow().isoformat()
+        if logs:
+            buf['logs'].extend(logs)
+        self._count(alert_id)['updates'] += 1
+
+        transition = bool(status) and status not in self.POSITION_STATUSES and status != self._last_status.get(alert_id)
+        if status:
+            self._last_status[alert_id] = status
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Hors boucle asyncio : écriture directe
+            self._write(alert_id, self._buffers.pop(alert_id))
+            return
+
+        if transition or flush:
+            # Le contenu est figé maintenant : les positions suivantes n'écrasent pas ce statut
+            self._enqueue_write(alert_id, self._buffers.pop(alert_id))
+        elif alert_id not in self._timers:
+            self._timers[alert_id] = self._spawn(alert_id, self._flush_later(alert_id))
+
+    def _count(self, alert_id):
+        return self._counts.setdefault(alert_id, {'updates': 0, 'writes': 0})
+
+    def _spawn(self, alert_id, coro):
+        task = asyncio.ensure_future(coro)
+        pending = self._pending.setdefault(alert_id, set())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        return task
+
+    async def _flush_later(self, alert_id):
+        await self.clock.sleep(self.flush_interval)
+        self._timers.pop(alert_id, None)
+        await self.flush(alert_id)
+
+    # --- ÉCRITURE ---
+    @staticmethod
+    def _payload(buf):
+        payload = dict(buf['fields'])
+        if buf['logs']:
+            payload['logs'] = firestore.ArrayUnion(buf['logs'])
+        return versioned(payload)
+
+    def _write(self, alert_id, buf):
+        try:
+            self.collection.document(alert_id).update(self._payload(buf))
+            self._count(alert_id)['writes'] += 1
+        except Exception as e:
+            print(f"[SYSTEM ERROR] Firestore Update: {e}")
+            return
+        if self.on_write:
+            self.on_write(alert_id, buf['fields'])
+
+    def _enqueue_write(self, alert_id, buf):
+        # Chaque écriture attend la précédente : l'ordre des mises à jour est conservé
+        task = self._spawn(alert_id, self._write_after(self._tails.get(alert_id), alert_id, buf))
+        self._tails[alert_id] = task
+        return task
+
+    async def _write_after(self, previous, alert_id, buf):
+        if previous:
+            await asyncio.gather(previous, return_exceptions=True)
+        await run_firestore(self._write, alert_id, buf)
+
+    async def flush(self, alert_id):
+        """Écrit immédiatement le contenu du tampon"""
+        buf = self._buffers.pop(alert_id, None)
+        if buf:
+            await self._enqueue_write(alert_id, buf)
+
+    async def close(self, alert_id):
+        """Fin de mission : vide le tampon et renvoie les compteurs de la mission"""
+        timer = self._timers.pop(alert_id, None)
+        if timer:
+            timer.cancel()
+        await self.flush(alert_id)
+        pending = [t for t in self._pending.pop(alert_id, ()) if t is not timer]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tails.pop(alert_id, None)
+        self._last_status.pop(alert_id, None)
+
+        counts = self._counts.pop(alert_id, {'updates': 0, 'writes': 0})
+        self.recent[alert_id] = counts
+        while len(self.recent) > self.keep_recent:
+            self.recent.popitem(last=False)
+        return counts
+
+    # --- MÉTRIQUES ---
+    def write_counts(self, alert_id):
+        return dict(self._counts.get(alert_id) or self.recent.get(alert_id) or {'updates': 0, 'writes': 0})
+
+    def stats(self):
+        done = list(self.recent.values())
+        updates = sum(c['updates'] for c in done)
+        writes = sum(c['writes'] for c in done)
+        return {
+            'missions': len(done),
+            'in_flight': len(self._counts),
+            'avg_updates': round(updates / len(done), 1) if done else None,
+            'avg_writes': round(writes / len(done), 1) if done else None,
+            'recent': dict(list(self.recent.items())[-20:])
+        }
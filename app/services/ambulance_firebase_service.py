@@ -1,4 +1,5 @@
 from app.services.firebase_service import FirebaseService
+from app.services.firestore_io import run_firestore
 from firebase_admin import firestore
 import json
 import os
@@ -51,7 +52,10 @@ class AmbulanceFirebaseService:
         - Niveau 3 (Critique) : Cherche Type A (SMUR) en priorité.
         - Niveau 1-2 : Prend tout ce qui est disponible.
         """
-        available = self.get_available_ambulances()
+        return self.filter_by_level(self.get_available_ambulances(), emergency_level)
+
+    def filter_by_level(self, available, emergency_level):
+        """Filtre de gravité appliqué à une liste d'ambulances libres déjà chargée"""
         if not available:
             return []
         
@@ -81,6 +85,10 @@ class AmbulanceFirebaseService:
         # Par défaut (ou si niveau faible), on retourne toutes les disponibles
         return available
     
+    async def get_available_by_level_async(self, emergency_level):
+        """Version asyncio de get_available_by_level (pool Firestore dédié)"""
+        return await run_firestore(self.get_available_by_level, emergency_level)
+
     def get_ambulance(self, ambulance_id):
         try:
             doc = self.collection.document(ambulance_id).get()
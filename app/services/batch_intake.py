@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.config_settings import Config
+
+
+class BatchPlanner:
+    """
+    Répartition d'un événement à nombreuses victimes (même lieu), sur le DispatchEngine des alertes :
+    - patients traités du plus grave au moins grave ;
+    - hôpital : classement du moteur avec l'âge et les symptômes du patient (pédiatrie, spécialités),
+      calculé une fois par profil (gravité, âge, symptômes), puis le premier établissement qui a
+      encore de la place (lits disponibles, plafonné à BATCH_MAX_PER_HOSPITAL patients par événement) ;
+    - ambulance : pick_ambulance du moteur, réservée dans le catalogue régional comme pour une alerte
+      seule (une alerte simultanée ne peut pas recevoir la même unité) ;
+    - un itinéraire ORS par position d'ambulance distincte et par hôpital retenu, pas par patient,
+      dans le budget de la requête (estimation marquée 'fallback' au-delà).
+    Les affectations passent par DispatchEngine.for_workflow avant d'être remises au workflow,
+    et release() rend les réservations des alertes qui ne l'atteignent pas.
+    """
+
+    def __init__(self, dispatch_engine, max_per_hospital=None, route_workers=4):
+        self.dispatch_engine = dispatch_engine
+        self.max_per_hospital = max_per_hospital or Config.BATCH_MAX_PER_HOSPITAL
+        self.route_workers = route_workers
+
+    def plan(self, lat, lng, patients, deadline=None):
+        """
+        patients : [{'emergency_level', 'age', 'symptomes', ...}] (dans l'ordre de la requête).
+        Renvoie une affectation par patient, dans le même ordre :
+        {'hospital', 'ambulance', 'routes': {'red', 'blue'}} (champs absents si rien n'est disponible).
+        """
+        rankings = {}
+        taken = {}
+        picked = set()
+        order = sorted(range(len(patients)), key=lambda i: -int(patients[i].get('emergency_level', 2)))
+
+        picks = [None] * len(patients)
+        for i in order:
+            patient = patients[i]
+            level = int(patient.get('emergency_level', 2))
+            profile = (level, str(patient.get('age')), patient.get('symptomes'))
+            if profile not in rankings:
+                rankings[profile] = self.dispatch_engine.rank_hospitals(
+                    lat, lng, level, patient.get('age'), patient.get('symptomes'))
+            hospital = self._pick_hospital(rankings[profile], taken)
+            ambulance = self.dispatch_engine.pick_ambulance(lat, lng, level, exclude=picked)
+            if ambulance:
+                picked.add(ambulance['id'])
+            picks[i] = (hospital, ambulance)
+
+        red, blue = self._routes(lat, lng, picks, deadline)
+        assignments = []
+        for hospital, ambulance in picks:
+            assignment = {}
+            if ambulance:
+                assignment['ambulance'] = ambulance
+            if hospital:
+                route_blue = blue[self._hospital_key(hospital)]
+                assignment['hospital'] = self.dispatch_engine.hospital_service.selection(
+                    hospital['hospital'], route_blue, round(hospital['distance'], 2))
+            if ambulance and hospital:
+                assignment['routes'] = {'red': red[self._ambulance_key(ambulance)], 'blue': route_blue}
+            assignments.append(assignment)
+        return assignments
+
+    def release(self, assignments):
+        """Réservations rendues pour les alertes de l'événement qui n'atteignent pas le workflow"""
+        for assignment in assignments:
+            self.dispatch_engine.release(assignment)
+
+    @staticmethod
+    def _hospital_key(ranked_hospital):
+        h = ranked_hospital['hospital']
+        return h.get('id') or h.get('name')
+
+    @staticmethod
+    def _ambulance_key(ambulance):
+        return (round(float(ambulance['current_lat']), 5), round(float(ambulance['current_lng']), 5))
+
+    def _pick_hospital(self, ranked, taken):
+        for entry in ranked:
+            key = self._hospital_key(entry)
+            beds = entry['hospital'].get('available_beds')
+            capacity = self.max_per_hospital if beds is None else min(int(beds), self.max_per_hospital)
+            if taken.get(key, 0) < capacity:
+                taken[key] = taken.get(key, 0) + 1
+                return entry
+        # Tous les hôpitaux éligibles sont pleins pour cet événement : le mieux classé quand même
+        return ranked[0] if ranked else None
+
+    def _routes(self, lat, lng, picks, deadline):
+        """Itinéraires distincts seulement, calculés en parallèle"""
+        ambulances = {self._ambulance_key(a): a for _, a in picks if a}
+        hospitals = {self._hospital_key(h): h['hospital'] for h, _ in picks if h}
+        jobs = {('red', key): ([float(a['current_lng']), float(a['current_lat'])], [lng, lat]) for key, a in ambulances.items()}
+        jobs.update({('blue', key): ([lng, lat], [h['lng'], h['lat']]) for key, h in hospitals.items()})
+        if not jobs:
+            return {}, {}
+        with ThreadPoolExecutor(max_workers=min(self.route_workers, len(jobs))) as pool:
+            futures = {job: pool.submit(self.dispatch_engine.route, *coords, deadline) for job, coords in jobs.items()}
+            routes = {job: future.result() for job, future in futures.items()}
+        red = {key: route for (leg, key), route in routes.items() if leg == 'red'}
+        blue = {key: route for (leg, key), route in routes.items() if leg == 'blue'}
+        return red, blue
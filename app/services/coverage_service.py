@@ -0,0 +1,340 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from math import radians, cos
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def _haversine_grid(lat, lng, lats, lngs):
+    """Distance vectorisée (km) entre un point et une grille de latitudes/longitudes"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class FleetCoverageEngine:
+    """
+    Moteur de couverture de la flotte :
+    - Grille vectorisée (numpy) portant la surface de demande historique des alertes.
+    - Chaque unité libre couvre les cellules atteignables en moins de N minutes.
+    - claim()/release() mettent à jour la couverture de façon incrémentale
+      (seule la fenêtre de l'unité concernée est recalculée).
+    - recommend_relocations() propose des repositionnements gloutons vers les bases candidates.
+    """
+
+    def __init__(self, demand_points, units, sites=None, minutes=10, cell_km=1.0,
+                 speed_kmh=60.0, road_factor=1.3):
+        self.minutes = float(minutes)
+        self.cell_km = float(cell_km)
+        self.speed_kmh = float(speed_kmh)
+        self.road_factor = float(road_factor)
+        self._lock = threading.Lock()
+
+        demand_points = [(float(lat), float(lng), float(w)) for lat, lng, w in demand_points]
+        units = [u for u in units if u.get('current_lat') is not None and u.get('current_lng') is not None]
+        sites = sites or []
+
+        self._build_grid(demand_points, units, sites)
+        self._build_demand(demand_points)
+
+        # cover_count[i, j] = nombre d'unités libres atteignant la cellule (i, j)
+        self.cover_count = np.zeros(self.demand.shape, dtype=np.int16)
+        self.units = {}
+        self.idle = set()
+        self.covered = 0.0
+
+        self.sites = {}
+        for site in sites:
+            self.sites[site['id']] = {
+                'id': site['id'], 'name': site.get('name', site['id']),
+                'lat': float(site['lat']), 'lng': float(site['lng']),
+                'footprint': self._footprint(float(site['lat']), float(site['lng']))
+            }
+
+        for unit in units:
+            self.add_unit(unit)
+
+    # --- CONSTRUCTION DE LA GRILLE ---
+    def _build_grid(self, demand_points, units, sites):
+        lats = [p[0] for p in demand_points] + [float(u['current_lat']) for u in units] + [float(s['lat']) for s in sites]
+        lngs = [p[1] for p in demand_points] + [float(u['current_lng']) for u in units] + [float(s['lng']) for s in sites]
+        if not lats:
+            # Grille par défaut centrée sur Casablanca
+            lats, lngs = [33.5731], [-7.5898]
+
+        reach_km = self.speed_kmh * self.minutes / 60.0 / self.road_factor
+        mid_lat = (min(lats) + max(lats)) / 2
+        pad_lat = reach_km / KM_PER_DEG_LAT
+        pad_lng = reach_km / (KM_PER_DEG_LAT * cos(radians(mid_lat)))
+
+        step_lat = self.cell_km / KM_PER_DEG_LAT
+        step_lng = self.cell_km / (KM_PER_DEG_LAT * cos(radians(mid_lat)))
+        self.lats = np.arange(min(lats) - pad_lat, max(lats) + pad_lat + step_lat, step_lat)
+        self.lngs = np.arange(min(lngs) - pad_lng, max(lngs) + pad_lng + step_lng, step_lng)
+        self.step_lat, self.step_lng = step_lat, step_lng
+
+    def _build_demand(self, demand_points):
+        """Histogramme 2D des alertes passées, normalisé (somme = 1)"""
+        demand = np.zeros((len(self.lats), len(self.lngs)), dtype=np.float64)
+        if demand_points:
+            pts = np.array(demand_points)
+            rows = np.clip(np.rint((pts[:, 0] - self.lats[0]) / self.step_lat).astype(int), 0, len(self.lats) - 1)
+            cols = np.clip(np.rint((pts[:, 1] - self.lngs[0]) / self.step_lng).astype(int), 0, len(self.lngs) - 1)
+            np.add.at(demand, (rows, cols), pts[:, 2])
+        total = demand.sum()
+        self.demand = demand / total if total > 0 else demand
+
+    def _footprint(self, lat, lng):
+        """Fenêtre (lignes, colonnes) et masque des cellules atteignables depuis (lat, lng)"""
+        reach_km = self.speed_kmh * self.minutes / 60.0 / self.road_factor
+        dlat = reach_km / KM_PER_DEG_LAT
+        dlng = reach_km / (KM_PER_DEG_LAT * cos(radians(lat)))
+        r0 = int(np.searchsorted(self.lats, lat - dlat))
+        r1 = int(np.searchsorted(self.lats, lat + dlat, side='right'))
+        c0 = int(np.searchsorted(self.lngs, lng - dlng))
+        c1 = int(np.searchsorted(self.lngs, lng + dlng, side='right'))
+        window = (slice(r0, r1), slice(c0, c1))
+
+        distance_km = _haversine_grid(lat, lng, self.lats[r0:r1][:, None], self.lngs[c0:c1][None, :])
+        travel_min = distance_km * self.road_factor / self.speed_kmh * 60.0
+        return window, travel_min <= self.minutes
+
+    # --- MISES À JOUR INCRÉMENTALES ---
+    def _gain(self, count, footprint):
+        """Demande nouvellement couverte si on ajoute l'empreinte"""
+        window, mask = footprint
+        return float(self.demand[window][mask & (count[window] == 0)].sum())
+
+    def _loss(self, count, footprint):
+        """Demande perdue si on retire l'empreinte (cellules couvertes par cette seule unité)"""
+        window, mask = footprint
+        return float(self.demand[window][mask & (count[window] == 1)].sum())
+
+    @staticmethod
+    def _apply(count, footprint, sign):
+        window, mask = footprint
+        count[window] += sign * mask.astype(np.int16)
+
+    def add_unit(self, unit):
+        """Enregistre une unité (libre si son statut est 'available')"""
+        with self._lock:
+            unit_id = unit['id']
+            if unit_id in self.idle:
+                self.covered -= self._loss(self.cover_count, self.units[unit_id]['footprint'])
+                self._apply(self.cover_count, self.units[unit_id]['footprint'], -1)
+                self.idle.discard(unit_id)
+
+            lat, lng = float(unit['current_lat']), float(unit['current_lng'])
+            self.units[unit_id] = {
+                'id': unit_id, 'name': unit.get('name', unit_id),
+                'lat': lat, 'lng': lng,
+                'footprint': self._footprint(lat, lng)
+            }
+            if unit.get('status', 'available') == 'available':
+                self._set_idle(unit_id)
+
+    def _set_idle(self, unit_id):
+        footprint = self.units[unit_id]['footprint']
+        self.covered += self._gain(self.cover_count, footprint)
+        self._apply(self.cover_count, footprint, +1)
+        self.idle.add(unit_id)
+
+    def claim(self, unit_id):
+        """L'unité part en mission : retrait de sa zone de couverture"""
+        with self._lock:
+            if unit_id not in self.idle:
+                return False
+            footprint = self.units[unit_id]['footprint']
+            self.covered -= self._loss(self.cover_count, footprint)
+            self._apply(self.cover_count, footprint, -1)
+            self.idle.discard(unit_id)
+            return True
+
+    def release(self, unit_id, lat=None, lng=None):
+        """L'unité redevient libre (éventuellement à une nouvelle position)"""
+        with self._lock:
+            if unit_id not in self.units or unit_id in self.idle:
+                return False
+            unit = self.units[unit_id]
+            if lat is not None and lng is not None:
+                unit['lat'], unit['lng'] = float(lat), float(lng)
+                unit['footprint'] = self._footprint(unit['lat'], unit['lng'])
+            self._set_idle(unit_id)
+            return True
+
+    def coverage(self):
+        """Part de la demande historique couverte par les unités libres (0 à 1)"""
+        return round(max(0.0, min(1.0, self.covered)), 4)
+
+    # --- RECOMMANDATIONS DE REPOSITIONNEMENT ---
+    def recommend_relocations(self, max_moves=3, min_gain=0.01):
+        """
+        Glouton (Maximal Covering) : à chaque itération on applique le déplacement
+        unité libre -> site candidat qui maximise le gain de couverture.
+        """
+        with self._lock:
+            count = self.cover_count.copy()
+            covered = self.covered
+            footprints = {uid: self.units[uid]['footprint'] for uid in self.idle}
+            moved = set()
+            moves = []
+
+            for _ in range(max_moves):
+                best = None
+                for unit_id, unit_fp in footprints.items():
+                    if unit_id in moved:
+                        continue
+                    # Évaluation sur la couverture sans l'unité
+                    self._apply(count, unit_fp, -1)
+                    loss = self._gain(count, unit_fp)
+                    for site in self.sites.values():
+                        delta = self._gain(count, site['footprint']) - loss
+                        if best is None or delta > best[0]:
+                            best = (delta, unit_id, site)
+                    self._apply(count, unit_fp, +1)
+
+                if best is None or best[0] < min_gain:
+                    break
+
+                delta, unit_id, site = best
+                self._apply(count, footprints[unit_id], -1)
+                self._apply(count, site['footprint'], +1)
+                footprints[unit_id] = site['footprint']
+                covered += delta
+                moved.add(unit_id)
+
+                unit = self.units[unit_id]
+                moves.append({
+                    'unit_id': unit_id,
+                    'unit_name': unit['name'],
+                    'from': {'lat': unit['lat'], 'lng': unit['lng']},
+                    'to': {'site_id': site['id'], 'name': site['name'], 'lat': site['lat'], 'lng': site['lng']},
+                    'coverage_gain': round(delta, 4),
+                    'coverage_after': round(max(0.0, min(1.0, covered)), 4)
+                })
+            return moves
+
+    def snapshot(self, max_moves=3):
+        """Vue complète pour l'API admin"""
+        with self._lock:
+            idle = sorted(self.idle)
+            busy = sorted(set(self.units) - self.idle)
+        return {
+            'minutes': self.minutes,
+            'coverage': self.coverage(),
+            'idle_units': idle,
+            'busy_units': busy,
+            'grid': {'rows': int(self.demand.shape[0]), 'cols': int(self.demand.shape[1]), 'cell_km': self.cell_km},
+            'recommendations': self.recommend_relocations(max_moves=max_moves)
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+# Départs / retours survenus pendant la construction, rejoués dès que le moteur est prêt
+_pending = deque(maxlen=10000)
+_pending_lock = threading.Lock()
+_warming = False
+
+
+def get_coverage_engine():
+    """Instance partagée, construite à la demande depuis Firestore / fichiers JSON (bloquant)"""
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            engine = _load_engine()
+            with _pending_lock:
+                while _pending:
+                    _apply_update(engine, *_pending.popleft())
+                _engine = engine
+    return _engine
+
+
+def warm_coverage_engine():
+    """Construit le moteur en arrière-plan (démarrage du worker de dispatch), une seule fois"""
+    global _warming
+    with _pending_lock:
+        if _engine is not None or _warming:
+            return
+        _warming = True
+
+    def build():
+        global _warming
+        try:
+            get_coverage_engine()
+        except Exception as e:
+            print(f"[Coverage] Construction du moteur impossible: {e}", flush=True)
+        finally:
+            with _pending_lock:
+                _warming = False
+
+    threading.Thread(target=build, name='coverage-warmup', daemon=True).start()
+
+
+def _apply_update(engine, ambulance, busy):
+    try:
+        if busy:
+            engine.claim(ambulance['id'])
+        else:
+            engine.release(ambulance['id'], ambulance.get('current_lat'), ambulance.get('current_lng'))
+    except Exception as e:
+        print(f"[Coverage] Mise à jour impossible: {e}")
+
+
+def update_unit(ambulance, busy):
+    """
+    Départ (busy) ou retour d'une unité, sans jamais bloquer l'appelant (boucle du dispatch) :
+    tant que le moteur n'est pas construit, la mise à jour est mise en attente.
+    """
+    with _pending_lock:
+        engine = _engine
+        if engine is None:
+            _pending.append((ambulance, busy))
+    if engine is None:
+        warm_coverage_engine()
+    else:
+        _apply_update(engine, ambulance, busy)
+
+
+def _load_engine():
+    from app.config_settings import Config
+    from app.services.ambulance_firebase_service import AmbulanceFirebaseService
+    from app.services.hospital_firebase_service import HospitalFirebaseService
+
+    ambulances = AmbulanceFirebaseService().get_all_ambulances()
+    hospitals = HospitalFirebaseService().get_all_hospitals()
+
+    demand = []
+    try:
+        from app.services.firebase_service import FirebaseService
+        # Historique borné : fenêtre de COVERAGE_HISTORY_DAYS jours, au plus COVERAGE_HISTORY_LIMIT alertes
+        since = (datetime.utcnow() - timedelta(days=Config.COVERAGE_HISTORY_DAYS)).isoformat()
+        query = (FirebaseService().get_collection('alerts').where('created_at', '>=', since)
+                 .order_by('created_at', direction='DESCENDING').limit(Config.COVERAGE_HISTORY_LIMIT))
+        for doc in query.select(['location']).stream():
+            loc = (doc.to_dict() or {}).get('location') or {}
+            if isinstance(loc, dict) and loc.get('lat') and loc.get('lng'):
+                demand.append((loc['lat'], loc['lng'], 1.0))
+    except Exception as e:
+        print(f"[Coverage] Historique alertes indisponible: {e}", flush=True)
+
+    if not demand:
+        # Pas d'historique : les établissements servent de proxy de la demande
+        demand = [(h['lat'], h['lng'], 1.0) for h in hospitals if h.get('lat') and h.get('lng')]
+
+    sites = [{'id': h.get('id', h['name']), 'name': h['name'], 'lat': h['lat'], 'lng': h['lng']}
+             for h in hospitals if h.get('lat') and h.get('lng')]
+
+    engine = FleetCoverageEngine(
+        demand, ambulances, sites,
+        minutes=Config.COVERAGE_MINUTES,
+        cell_km=Config.COVERAGE_CELL_KM
+    )
+    print(f"[Coverage] Grille {engine.demand.shape}, {len(demand)} points de demande, couverture {engine.coverage():.0%}", flush=True)
+    return engine
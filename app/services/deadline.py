@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Deadline:
+    """
+    Budget de temps d'une requête, transmis à chaque étape (géocodage, dispatch, ORS) :
+    chaque appel réseau ne consomme que ce qui reste, et une étape sans budget suffisant
+    passe directement à son repli local (cache, ville connue, distance à vol d'oiseau).
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap, floor=0.2):
+        """Délai réseau : le budget restant plafonné à `cap`, ou None s'il reste moins de `floor`"""
+        remaining = self.remaining()
+        if remaining < floor:
+            return None
+        return min(cap, remaining)
+
+
+def network_timeout(deadline, cap, floor=0.2):
+    """Délai d'un appel réseau ; sans deadline, le délai par défaut de l'étape"""
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap, floor)
+
+
+class LRUCache:
+    """Cache LRU borné, thread-safe, avec durée de vie (résultats réseau réutilisables)"""
+
+    def __init__(self, size, ttl, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Retire et renvoie l'entrée (usage unique), None si absente ou expirée"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry[1] <= self.clock():
+            return None
+        return entry[0]
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
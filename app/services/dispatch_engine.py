@@ -0,0 +1,204 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.config_settings import Config
+from app.services.trajectory import haversine_km
+
+# Les deux trajets (ambulance -> patient, patient -> hôpital) sont calculés en parallèle
+_route_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dispatch-ors')
+
+
+# --- SCORES HÔPITAL (plus petit = meilleur) ---
+def score_nearest(entry, emergency_level):
+    """Distance à vol d'oiseau seule"""
+    return entry['distance']
+
+
+def score_capacity(entry, emergency_level):
+    """Distance, pénalisée quand l'établissement n'a plus (ou presque plus) de lits libres"""
+    beds = entry['hospital'].get('available_beds')
+    if beds is None:
+        return entry['distance']
+    return entry['distance'] + Config.DISPATCH_FULL_PENALTY_KM / (1 + max(int(beds), 0))
+
+
+SCORERS = {
+    'nearest': score_nearest,
+    'capacity': score_capacity,
+}
+
+
+class DispatchEngine:
+    """
+    Moteur de dispatch unique d'une alerte :
+    - hôpital : établissements éligibles (âge, symptômes) classés par le score choisi
+      (DISPATCH_SCORING, ou une fonction (entrée, gravité) -> score) ;
+    - ambulance : la plus proche parmi les libres (filtre de gravité compris) ;
+    - itinéraires : un seul appel ORS par trajet, en parallèle, dans le budget de la requête.
+    plan() est calculé une fois à la création de l'alerte et remis tel quel au workflow
+    (phases hospital / ambulance / routes) : plus de second choix d'hôpital ni d'itinéraires recalculés.
+    catalog : RegionalCatalog du nœud ; la recherche se limite à la région de l'alerte,
+    étendue aux régions voisines si elle n'a ni hôpital ni ambulance utilisable.
+    """
+
+    def __init__(self, hospital_service, ambulance_service, ors_service, scoring=None, catalog=None):
+        self.hospital_service = hospital_service
+        self.ambulance_service = ambulance_service
+        self.ors_service = ors_service
+        self.catalog = catalog
+        scoring = scoring or Config.DISPATCH_SCORING
+        self.score = scoring if callable(scoring) else SCORERS[scoring]
+
+    def rank_hospitals(self, lat, lng, emergency_level=2, age=None, symptoms=None):
+        if self.catalog is None:
+            ranked = self.hospital_service.rank_hospitals(lat, lng, age, symptoms)
+        else:
+            ranked = self._regional(lat, lng, lambda regions: self.hospital_service.rank_hospitals(
+                lat, lng, age, symptoms, hospitals=self.catalog.hospitals(regions)))
+        return sorted(ranked, key=lambda entry: self.score(entry, emergency_level))
+
+    def _available(self, lat, lng, emergency_level):
+        if self.catalog is None:
+            return self.ambulance_service.get_available_by_level(emergency_level)
+        return self._regional(lat, lng, lambda regions: self.ambulance_service.filter_by_level(
+            self.catalog.ambulances(regions), emergency_level))
+
+    def _regional(self, lat, lng, search):
+        """Premier résultat non vide : région de l'alerte, puis région + voisines"""
+        found = []
+        for tier, regions in enumerate(self.catalog.search_order(lat, lng)):
+            found = search(regions)
+            if found:
+                if tier:
+                    self.catalog.note_cross_border()
+                break
+        return found
+
+    def pick_ambulance(self, lat, lng, emergency_level=2, reserve=True, exclude=()):
+        """
+        Ambulance libre la plus proche ; avec un catalogue, elle est réservée dans la foulée
+        (reserve=False : simple estimation, l'unité reste proposable aux autres alertes).
+        exclude : identifiants déjà retenus par l'appelant (intake groupé).
+        """
+        candidates = [a for a in self._available(lat, lng, emergency_level) or []
+                      if a.get('current_lat') is not None and a.get('current_lng') is not None
+                      and a.get('id') not in exclude]
+        candidates.sort(key=lambda a: haversine_km(lat, lng, float(a['current_lat']), float(a['current_lng'])))
+        if self.catalog is None or not reserve:
+            return candidates[0] if candidates else None
+        # Alertes simultanées : la suivante prend l'unité libre la plus proche non encore réservée
+        return next((a for a in candidates if self.catalog.reserve(a['id'])), None)
+
+    def release(self, assignment):
+        """Affectation abandonnée avant le workflow : libère la réservation de l'ambulance"""
+        ambulance = (assignment or {}).get('ambulance')
+        if ambulance and self.catalog is not None:
+            self.catalog.release(ambulance['id'])
+
+    def plan(self, lat, lng, emergency_level=2, age=None, symptoms=None, deadline=None, reserve=True):
+        """
+        Affectation complète : {'hospital', 'ambulance', 'routes': {'red', 'blue'}}
+        (champs absents si rien n'est disponible).
+        """
+        ranked = self.rank_hospitals(lat, lng, emergency_level, age, symptoms)
+        ambulance = self.pick_ambulance(lat, lng, emergency_level, reserve=reserve)
+        best = ranked[0] if ranked else None
+
+        legs = {}
+        if ambulance:
+            legs['red'] = ([float(ambulance['current_lng']), float(ambulance['current_lat'])], [lng, lat])
+        if best:
+            legs['blue'] = ([lng, lat], [best['hospital']['lng'], best['hospital']['lat']])
+        futures = {leg: _route_pool.submit(self.route, start, end, deadline) for leg, (start, end) in legs.items()}
+        routes = {leg: future.result() for leg, future in futures.items()}
+
+        assignment = {}
+        if ambulance:
+            assignment['ambulance'] = ambulance
+        if best:
+            assignment['hospital'] = self.hospital_service.selection(
+                best['hospital'], routes['blue'], round(best['distance'], 2))
+        if ambulance and best:
+            assignment['routes'] = routes
+        return assignment
+
+    def revalidate(self, assignment, lat, lng, emergency_level=2, age=None, symptoms=None):
+        """
+        Affectation préparée d'avance (formulaire préchauffé) réutilisée telle quelle si elle tient encore :
+        même premier hôpital avec l'âge et les symptômes réels, même ambulance la plus proche, toujours
+        libre et réservée ici. Renvoie None sinon : l'appelant replanifie en entier.
+        """
+        hospital, ambulance = (assignment or {}).get('hospital'), (assignment or {}).get('ambulance')
+        if not hospital or not ambulance or not assignment.get('routes'):
+            return None
+        ranked = self.rank_hospitals(lat, lng, emergency_level, age, symptoms)
+        if not ranked or self.hospital_service.selection(ranked[0]['hospital'], {}, 0)['id'] != hospital['id']:
+            return None
+        nearest = self.pick_ambulance(lat, lng, emergency_level, reserve=False)
+        if not nearest or nearest['id'] != ambulance['id']:
+            return None
+        if self.catalog is not None and not self.catalog.reserve(ambulance['id']):
+            return None
+        return assignment
+
+    def route(self, start, end, deadline=None):
+        """Itinéraire ORS dans le budget ; estimation à vol d'oiseau marquée 'fallback' sinon"""
+        try:
+            return self.ors_service.get_route(start, end, deadline=deadline)
+        except Exception as e:
+            print(f"[DispatchEngine] Erreur ORS: {e}")
+            distance = haversine_km(start[1], start[0], end[1], end[0])
+            return {'distance_km': round(distance, 2), 'duration_min': int(distance * 3), 'fallback': True}
+
+    @staticmethod
+    def is_estimated(assignment):
+        routes = assignment.get('routes')
+        return not routes or any(route.get('fallback') for route in routes.values())
+
+    @classmethod
+    def for_workflow(cls, assignment):
+        """
+        Affectation remise au workflow : les itinéraires estimés (budget épuisé, ORS indisponible)
+        sont retirés pour que la phase routes les recalcule, hôpital et ambulance restent imposés.
+        """
+        if not cls.is_estimated(assignment):
+            return assignment
+        return {key: value for key, value in assignment.items() if key != 'routes'}
+
+    @classmethod
+    def summary(cls, assignment, lat, lng, emergency_level):
+        """Résumé renvoyé au formulaire et stocké dans dispatch_info (format historique)"""
+        hospital = assignment.get('hospital')
+        if not hospital:
+            return None
+        routes = assignment.get('routes') or {}
+        red, blue = routes.get('red') or {}, routes.get('blue') or {}
+        ambulance = assignment.get('ambulance') or {}
+        dist_leg1 = red.get('distance_km', 0)
+        dist_leg2 = blue.get('distance_km', hospital.get('distance_km', 0))
+        leg1_min = red.get('duration_min', 5)
+        leg2_min = blue.get('duration_min', hospital.get('eta_minutes', 10))
+        amb_coords = [ambulance.get('current_lat', lat), ambulance.get('current_lng', lng)]
+        return {
+            'hospital': {
+                'id': hospital['id'],
+                'name': hospital['name'],
+                'locality': hospital.get('locality', ''),
+                'coordinates': hospital['coordinates']
+            },
+            'mission': {
+                'total_distance_km': round(dist_leg1 + dist_leg2, 2),
+                'total_eta_minutes': int(leg1_min + leg2_min),
+                'dist_leg1_km': round(dist_leg1, 2),  # Amb -> Pat
+                'dist_leg2_km': round(dist_leg2, 2),  # Pat -> Hosp
+                'ambulance_to_patient_min': leg1_min,
+                'patient_to_hospital_min': leg2_min,
+                'trajectory_geometry': blue.get('geometry', ''),
+                'emergency_level': emergency_level,
+                # Distances estimées (budget épuisé / ORS indisponible) : affinées par le workflow
+                'estimated': cls.is_estimated(assignment)
+            },
+            'route_coordinates': [
+                amb_coords,
+                [lat, lng],
+                [hospital['coordinates']['lat'], hospital['coordinates']['lng']]
+            ]
+        }
@@ -0,0 +1,218 @@
+import bisect
+import hashlib
+import threading
+import time
+from app.config_settings import Config
+from app.services.trajectory import haversine_km
+
+# Régions administratives : villes repères (lat, lng). Une position appartient à la région du repère
+# le plus proche ; un champ 'region' explicite sur un hôpital / une ambulance reste prioritaire.
+REGIONS = {
+    'Tanger-Tétouan-Al Hoceïma': [(35.7595, -5.8340), (35.5785, -5.3684), (35.2517, -3.9372)],
+    "L'Oriental": [(34.6814, -1.9086), (35.1681, -2.9335)],
+    'Fès-Meknès': [(34.0331, -5.0003), (33.8935, -5.5473), (34.2100, -4.0100)],
+    'Rabat-Salé-Kénitra': [(34.0209, -6.8416), (34.2610, -6.5802)],
+    'Béni Mellal-Khénifra': [(32.3373, -6.3498), (32.8811, -6.9063), (32.9350, -5.6680)],
+    'Casablanca-Settat': [(33.5731, -7.5898), (33.2316, -8.5007), (33.0010, -7.6166)],
+    'Marrakech-Safi': [(31.6295, -7.9811), (32.2994, -9.2372), (31.5085, -9.7595)],
+    'Drâa-Tafilalet': [(31.9314, -4.4246), (30.9189, -6.8934)],
+    'Souss-Massa': [(30.4278, -9.5981), (30.4703, -8.8770), (29.6974, -9.7316)],
+    'Guelmim-Oued Noun': [(28.9870, -10.0574)],
+    'Laâyoune-Sakia El Hamra': [(27.1253, -13.1625)],
+    'Dakhla-Oued Ed-Dahab': [(23.6848, -15.9570)],
+}
+
+
+def region_of(lat, lng):
+    """Région de dispatch d'une position (repère le plus proche)"""
+    lat, lng = float(lat), float(lng)
+    return min(REGIONS, key=lambda name: min(haversine_km(lat, lng, a, b) for a, b in REGIONS[name]))
+
+
+def region_of_record(record, lat_key='lat', lng_key='lng'):
+    """Région d'un hôpital / d'une ambulance : champ 'region' connu, sinon sa position"""
+    if record.get('region') in REGIONS:
+        return record['region']
+    lat, lng = record.get(lat_key), record.get(lng_key)
+    if lat is None or lng is None:
+        return None
+    return region_of(lat, lng)
+
+
+def _region_distance(a, b):
+    return min(haversine_km(p[0], p[1], q[0], q[1]) for p in REGIONS[a] for q in REGIONS[b])
+
+
+# Régions voisines, de la plus proche à la plus lointaine (repli transfrontalier)
+NEIGHBOURS = {name: sorted((other for other in REGIONS if other != name), key=lambda other: _region_distance(name, other))
+              for name in REGIONS}
+
+
+def neighbours(region, count=None):
+    count = Config.DISPATCH_REGION_NEIGHBOURS if count is None else count
+    return NEIGHBOURS.get(region, [])[:count]
+
+
+class HashRing:
+    """
+    Hachage cohérent des régions sur les nœuds de dispatch : ajouter ou retirer un nœud
+    ne déplace que les régions de ce nœud, les autres gardent leur catalogue chaud.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._keys = []
+        self._ring = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = self._hash(f"{node}#{i}")
+            self._ring[h] = node
+            bisect.insort(self._keys, h)
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            h = self._hash(f"{node}#{i}")
+            if self._ring.pop(h, None) is not None:
+                self._keys.remove(h)
+
+    def node_for(self, key):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[self._keys[index]]
+
+    def regions_for(self, node):
+        return [name for name in REGIONS if self.node_for(name) == node]
+
+
+def owned_regions(nodes=None, node_id=None):
+    """
+    Régions traitées par ce nœud (DISPATCH_NODES / DISPATCH_NODE_ID) ;
+    None : pas de partitionnement, le nœud prend toutes les régions.
+    """
+    nodes = Config.DISPATCH_NODES if nodes is None else nodes
+    node_id = node_id or Config.DISPATCH_NODE_ID
+    if not nodes or node_id not in nodes:
+        return None
+    return HashRing(nodes).regions_for(node_id)
+
+
+class RegionalCatalog:
+    """
+    Catalogue en mémoire du nœud, indexé par région :
+    - hôpitaux (relus toutes les DISPATCH_CATALOG_TTL secondes) ;
+    - ambulances libres (relues toutes les DISPATCH_FLEET_TTL secondes), moins celles déjà
+      réservées par une alerte de ce nœud.
+    Le moteur de dispatch ne parcourt que la région de l'alerte, puis ses voisines si elle
+    n'a rien d'utilisable (repli transfrontalier).
+
+    Le plan est calculé dans la requête POST /api/alert et non par le worker propriétaire de la
+    région : le formulaire doit afficher hôpital et délai dans ALERT_SLA_SECONDS, ce que ne permet
+    pas un aller-retour vers un worker d'un autre nœud. Chaque nœud HTTP garde donc le catalogue
+    de toutes les régions ; la propriété des régions (owned_regions) porte sur l'exécution des
+    workflows (workflow_queue.claim) : suivi, écritures et couverture de la mission.
+
+    Une ambulance retenue par plan() est réservée aussitôt (reserve) : deux alertes simultanées
+    ne peuvent pas se voir proposer la même unité. Le workflow la passe ensuite 'busy' dans
+    Firestore (les autres nœuds la retirent à leur prochaine relecture) ; la réservation tombe
+    quand la flotte relue ne la contient plus, ou au bout de DISPATCH_RESERVE_SECONDS.
+    """
+
+    def __init__(self, hospital_service, ambulance_service, ttl=None, fleet_ttl=None, reserve_ttl=None,
+                 clock=time.monotonic):
+        self.hospital_service = hospital_service
+        self.ambulance_service = ambulance_service
+        self.ttl = ttl or Config.DISPATCH_CATALOG_TTL
+        self.fleet_ttl = fleet_ttl or Config.DISPATCH_FLEET_TTL
+        self.reserve_ttl = reserve_ttl or Config.DISPATCH_RESERVE_SECONDS
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._hospitals = ({}, None)
+        self._fleet = ({}, None)
+        self._reserved = {}
+        self.cross_border = 0
+
+    @staticmethod
+    def _index(records, lat_key, lng_key):
+        index = {}
+        for record in records or []:
+            region = region_of_record(record, lat_key, lng_key)
+            if region:
+                index.setdefault(region, []).append(record)
+        return index
+
+    def _fresh(self, attr, ttl, load):
+        index, loaded_at = getattr(self, attr)
+        now = self.clock()
+        if loaded_at is not None and now - loaded_at < ttl:
+            return index
+        index = load()
+        with self._lock:
+            setattr(self, attr, (index, now))
+        return index
+
+    def hospitals(self, regions):
+        index = self._fresh('_hospitals', self.ttl,
+                            lambda: self._index(self.hospital_service.get_all_hospitals(), 'lat', 'lng'))
+        return [h for region in regions for h in index.get(region, [])]
+
+    def _load_fleet(self):
+        available = self.ambulance_service.get_available_ambulances() or []
+        ids = {a.get('id') for a in available}
+        with self._lock:
+            # Absentes de la flotte libre relue : déjà 'busy' dans Firestore, la réservation n'a plus lieu d'être
+            for ambulance_id in [i for i in self._reserved if i not in ids]:
+                del self._reserved[ambulance_id]
+        return self._index(available, 'current_lat', 'current_lng')
+
+    def ambulances(self, regions):
+        index = self._fresh('_fleet', self.fleet_ttl, self._load_fleet)
+        with self._lock:
+            self._expire_reservations()
+            reserved = set(self._reserved)
+        return [a for region in regions for a in index.get(region, []) if a.get('id') not in reserved]
+
+    def _expire_reservations(self):
+        # Appelé sous self._lock
+        now = self.clock()
+        for ambulance_id in [i for i, at in self._reserved.items() if now - at >= self.reserve_ttl]:
+            del self._reserved[ambulance_id]
+
+    def reserve(self, ambulance_id):
+        """Réserve une ambulance pour une alerte ; False si une autre alerte l'a déjà retenue"""
+        with self._lock:
+            self._expire_reservations()
+            if ambulance_id in self._reserved:
+                return False
+            self._reserved[ambulance_id] = self.clock()
+            return True
+
+    def release(self, ambulance_id):
+        """Alerte abandonnée avant le workflow (file pleine, erreur) : l'ambulance redevient proposable"""
+        with self._lock:
+            self._reserved.pop(ambulance_id, None)
+
+    def search_order(self, lat, lng):
+        """Régions à parcourir : celle de l'alerte, puis elle et ses voisines"""
+        region = region_of(lat, lng)
+        return [[region], [region] + neighbours(region)]
+
+    def note_cross_border(self):
+        with self._lock:
+            self.cross_border += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hospitals': {region: len(items) for region, items in self._hospitals[0].items()},
+                'ambulances': {region: len(items) for region, items in self._fleet[0].items()},
+                'reserved': len(self._reserved),
+                'cross_border': self.cross_border
+            }
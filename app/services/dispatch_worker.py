@@ -0,0 +1,256 @@
+import asyncio
+import threading
+from app.config_settings import Config
+from app.services.workflow_queue import get_workflow_queue, default_worker_id
+from app.services.firestore_io import get_firestore_io
+from app.services.dispatch_regions import owned_regions
+from app.services.sim_clock import VirtualClock, get_clock
+
+
+class DispatchQueueFull(Exception):
+    """Levée quand la file de dispatch est pleine (contrôle d'admission)"""
+
+
+class DispatchWorker:
+    """
+    Worker de dispatch persistant :
+    - Une seule boucle asyncio dans un thread dédié (chaque mission = une coroutine).
+    - File durable (WorkflowQueue) bornée, triée par emergency_level (le plus grave d'abord).
+    - Contrôle d'admission : submit() refuse quand la file est pleine.
+    - Un seul EmergencyOrchestrator (services + client LLM) réutilisé par toutes les missions.
+    - Les jobs sont réclamés avec un bail renouvelé périodiquement : plusieurs processus peuvent
+      vider la même file, et un job abandonné (crash, redémarrage) reprend à son dernier checkpoint.
+    - Partitionnement par région (DISPATCH_NODES) : le worker ne réclame que les jobs des régions
+      que le hachage cohérent lui attribue, et reprend ceux des autres après DISPATCH_REGION_STEAL_SECONDS.
+    - Horloge : celle de la configuration (CLOCK_MODE), partagée avec l'orchestrateur et dont la boucle
+      est construite par clock.new_event_loop(). Le mode virtuel est refusé : les baux de la file sont
+      en temps réel et la boucle virtuelle sauterait les attentes de polling (scripts/simulate_missions.py).
+    - Fin de mission (RESOLVED / ERROR, pas sur bail perdu) : les release_hooks reçoivent l'affectation
+      du job, p. ex. DispatchEngine.release pour libérer la réservation du catalogue régional.
+    """
+
+    def __init__(self, orchestrator_factory=None, queue=None, max_queue=None, max_concurrent=None,
+                 worker_id=None, lease_seconds=None, poll_interval=None, regions=None, steal_after=None, clock=None):
+        self.clock = clock or get_clock()
+        if isinstance(self.clock, VirtualClock):
+            raise ValueError("CLOCK_MODE=virtual est réservé à la simulation (scripts/simulate_missions.py), "
+                             "pas au worker de dispatch")
+        self.orchestrator_factory = orchestrator_factory or self._default_orchestrator
+        self.release_hooks = []
+        self.queue = queue
+        self.max_queue = max_queue or Config.DISPATCH_MAX_QUEUE
+        self.max_concurrent = max_concurrent or Config.DISPATCH_MAX_CONCURRENT
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or Config.WORKFLOW_LEASE_SECONDS
+        self.poll_interval = poll_interval or Config.WORKFLOW_POLL_INTERVAL
+        self.regions = regions if regions is not None else owned_regions()
+        self.steal_after = steal_after or Config.DISPATCH_REGION_STEAL_SECONDS
+
+        self.loop = None
+        self.orchestrator = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._resumed = 0
+
+    def _default_orchestrator(self):
+        from app.services.emergency_orchestrator import EmergencyOrchestrator
+        return EmergencyOrchestrator(clock=self.clock)
+
+    # --- CYCLE DE VIE ---
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            if self.queue is None:
+                self.queue = get_workflow_queue()
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name='dispatch-worker', daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = self.clock.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.loop.create_task(self._dispatcher())
+        self.loop.create_task(self._heartbeat())
+        self._ready.set()
+        print(f"[DispatchWorker] {self.worker_id} démarré (file max {self.max_queue}, missions simultanées max {self.max_concurrent})", flush=True)
+        if self.regions is not None:
+            print(f"[DispatchWorker] Régions: {', '.join(self.regions) or 'aucune (reprise uniquement)'}", flush=True)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Annulation propre : les jobs en cours gardent leur checkpoint et seront repris après expiration du bail
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def add_release_hook(self, hook):
+        """hook(assignment) appelé à la fin de chaque mission de ce processus (RESOLVED ou ERROR)"""
+        self.release_hooks.append(hook)
+
+    def _release(self, payload):
+        for hook in self.release_hooks:
+            try:
+                hook(payload.get('assignment'))
+            except Exception as e:
+                print(f"[DispatchWorker] Libération de l'affectation impossible: {e}", flush=True)
+
+        # --- ADMISSION ---
+    def submit(self, alert_id, emergency_level=2, region=None, **workflow_kwargs):
+        """
+        Enregistre une mission dans la file durable (thread-safe, appelable depuis Flask).
+        region : région de dispatch de l'alerte (nœud propriétaire). Lève DispatchQueueFull si la file est saturée.
+        """
+        self.start()
+        queued = self.queue.pending_count()
+        if queued >= self.max_queue:
+            with self._lock:
+                self._rejected += 1
+            raise DispatchQueueFull(f"File de dispatch pleine ({queued}/{self.max_queue})")
+
+        level = int(emergency_level)
+        payload = dict(workflow_kwargs, alert_id=alert_id, emergency_level=level)
+        self.queue.enqueue(alert_id, payload, priority=level, region=region)
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        return queued + 1
+
+    def is_saturated(self):
+        self.start()
+        return self.queue.pending_count() >= self.max_queue
+
+    def invalidate_protocol(self, alert_id, symptomes):
+        """Relaie une modification de symptômes à la mission si elle tourne dans ce processus"""
+        if self.orchestrator is None or self.loop is None:
+            return False
+        self.loop.call_soon_threadsafe(self.orchestrator.invalidate_protocol, alert_id, symptomes)
+        return True
+
+    def stats(self):
+        queued = self.queue.pending_count() if self.queue else 0
+        protocols = getattr(self.orchestrator, 'protocols', None)
+        writer = getattr(self.orchestrator, 'writer', None)
+        with self._lock:
+            return {
+                'worker_id': self.worker_id,
+                'queued': queued,
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'resumed': self._resumed,
+                'max_queue': self.max_queue,
+                'max_concurrent': self.max_concurrent,
+                'regions': self.regions,
+                'speculative_protocols': protocols.metrics() if protocols else None,
+                'alert_writes': writer.stats() if writer else None,
+                'firestore_io': get_firestore_io().stats()
+            }
+
+    # --- EXÉCUTION ---
+    async def _dispatcher(self):
+        while True:
+            await self._slots.acquire()
+            job = await self._next_job()
+            with self._lock:
+                self._running += 1
+                if job.get('phase'):
+                    self._resumed += 1
+            task = self.loop.create_task(self._run_job(job))
+            self._active[job['id']] = task
+
+    async def _next_job(self):
+        """Réclame le prochain job ; attend un submit() local ou le prochain tour de polling"""
+        while True:
+            self._wakeup.clear()
+            jobs = await self.loop.run_in_executor(None, self.queue.claim, self.worker_id, self.lease_seconds, 1,
+                                                   self.regions, self.steal_after)
+            if jobs:
+                return jobs[0]
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            job_ids = list(self._active)
+            if not job_ids:
+                continue
+            renewed = await self.loop.run_in_executor(None, self.queue.heartbeat, self.worker_id, job_ids, self.lease_seconds)
+            for job_id in set(job_ids) - set(renewed):
+                # Bail perdu : un autre worker a repris la mission
+                print(f"[DispatchWorker] Bail perdu pour {job_id}, arrêt local de la mission", flush=True)
+                task = self._active.get(job_id)
+                if task:
+                    task.cancel()
+
+    async def _run_job(self, job):
+        job_id = job['id']
+        payload = job['payload']
+
+        async def checkpoint(phase, state):
+            ok = await self.loop.run_in_executor(None, self.queue.checkpoint, job_id, self.worker_id, phase, state)
+            if not ok:
+                raise asyncio.CancelledError(f"Bail perdu pour {job_id}")
+
+        try:
+            if self.orchestrator is None:
+                self.orchestrator = self.orchestrator_factory()
+            resume = f" (reprise après {job['phase']})" if job.get('phase') else ""
+            print(f"\n[ORCHESTRATOR] Starting workflow for alert {job_id}{resume}", flush=True)
+            status = await self.orchestrator.run_workflow(
+                **payload, checkpoint=checkpoint, resume_state=job.get('state') or {}
+            )
+            if status == 'ERROR':
+                raise RuntimeError(f"Workflow terminé en erreur pour {job_id}")
+            self._release(payload)
+            await self.loop.run_in_executor(None, self.queue.complete, job_id, self.worker_id)
+            print(f"[ORCHESTRATOR] Workflow completed for alert {job_id}", flush=True)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            print(f"[ERROR] Workflow failed: {e}", flush=True)
+            self._release(payload)
+            await self.loop.run_in_executor(None, self.queue.fail, job_id, self.worker_id, e)
+            with self._lock:
+                self._failed += 1
+        finally:
+            self._active.pop(job_id, None)
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_dispatch_worker():
+    """Worker partagé par le processus, démarré à la première utilisation"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = DispatchWorker()
+            # Moteur de couverture construit au démarrage, hors de la boucle du dispatch
+            from app.services.coverage_service import warm_coverage_engine
+            warm_coverage_engine()
+    return _worker.start()
@@ -1,7 +1,6 @@
 import asyncio
 import json
 from datetime import datetime
-from firebase_admin import firestore
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from app.config_settings import Config
@@ -9,33 +8,68 @@ from app.services.firebase_service import FirebaseService
 from app.services.hospital_firebase_service import HospitalFirebaseService
 from app.services.ambulance_firebase_service import AmbulanceFirebaseService
 from app.services.ors_service import ORSService
+from app.services.workflow_dag import WorkflowDAG, Phase
+from app.services.protocol_speculation import SpeculativeProtocolManager
+from app.services.sim_clock import get_clock
+from app.services.alert_writer import CoalescingAlertWriter
+from app.services.trajectory import Trajectory
+from app.services.eta_service import route_profile
+from app.services.firestore_io import run_firestore
+from app.services.alert_index import get_alert_index
+from app.services.serialization import dumps
+from app.services.admission import get_admission_controller
+from app.services.llm_cache import cached_ainvoke
 
 class EmergencyOrchestrator:
     """
     Orchestrateur Hybride :
     - Logique Rapide (Python) : Géolocalisation, Choix Hôpital, Trajets, Triage initial.
     - Logique IA (Llama-3) : Uniquement pour l'Agent Spécialiste (Protocoles de soins).
+    Les services et l'horloge peuvent être injectés (simulation, tests de charge).
     """
     
-    def __init__(self):
+    def __init__(self, clock=None, alerts_collection=None, hospital_service=None,
+                 ambulance_service=None, ors_service=None, llm=None):
+        # Horloge : pauses de simulation et horodatages (réelle, accélérée ou virtuelle)
+        self.clock = clock or get_clock()
+
         # Services Standards
-        self.firebase = FirebaseService()
-        self.hospital_service = HospitalFirebaseService()
-        self.ambulance_service = AmbulanceFirebaseService()
-        self.ors_service = ORSService()
-        self.alerts_collection = self.firebase.get_collection('alerts')
+        self.hospital_service = hospital_service or HospitalFirebaseService()
+        self.ambulance_service = ambulance_service or AmbulanceFirebaseService()
+        self.ors_service = ors_service or ORSService()
+        on_write = None
+        if alerts_collection is None:
+            self.firebase = FirebaseService()
+            alerts_collection = self.firebase.get_collection('alerts')
+            # Vue des alertes actives / récentes du tableau de bord
+            on_write = get_alert_index().apply
+        self.alerts_collection = alerts_collection
+        # Écritures d'alerte fusionnées (statuts immédiats, positions regroupées)
+        self.writer = CoalescingAlertWriter(self.alerts_collection, clock=self.clock, on_write=on_write)
         
         # --- INITIALISATION IA (Pour l'Agent Spécialiste uniquement) ---
+        self.llm = llm
+        if self.llm is None:
+            self.llm = self._connect_llm()
+
+        # Écritures de statut d'ambulance en cours (références gardées jusqu'à leur fin)
+        self._fleet_writes = set()
+
+        # Protocoles générés dès le triage, remis à la prise en charge
+        self.protocols = SpeculativeProtocolManager(self.run_specialist_agent, cache=self.cache_protocol, clock=self.clock)
+
+    def _connect_llm(self):
         try:
-            self.llm = ChatGroq(
+            llm = ChatGroq(
                 api_key=Config.GROQ_API_KEY,
                 model_name="llama-3.3-70b-versatile",
                 temperature=0.3
             )
             print("✅ [IA] Llama-3.3 connectée pour l'Agent Spécialiste.")
+            return llm
         except Exception as e:
             print(f"⚠️ [IA] Erreur connexion Groq: {e}")
-            self.llm = None
+            return None
 
     def log_agent(self, agent_role, action, content):
         """Logs colorés dans le terminal"""
@@ -55,20 +89,29 @@ class EmergencyOrchestrator:
         print(f"{c}   └─ ACTION: {action}{end}")
         print(f"{c}   └─ OUTPUT: {content}{end}\n")
 
-    def update_status(self, alert_id, status, logs_list, data=None):
-        """Mise à jour Firestore"""
-        update_data = {
-            'status': status,
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        if logs_list and len(logs_list) > 0:
-            update_data['logs'] = firestore.ArrayUnion(logs_list)
-        if data:
-            update_data.update(data)
-        try:
-            self.alerts_collection.document(alert_id).update(update_data)
-        except Exception as e:
-            print(f"[SYSTEM ERROR] Firestore Update: {e}")
+    def update_coverage(self, ambulance, busy):
+        """
+        Départ (busy) / retour d'une ambulance : couverture de la flotte (sans bloquer) et statut
+        Firestore, qui la retire des ambulances libres proposées aux autres alertes et nœuds.
+        """
+        from app.services.coverage_service import update_unit
+        update_unit(ambulance, busy)
+        task = asyncio.get_running_loop().create_task(run_firestore(
+            self.ambulance_service.update_ambulance_status, ambulance['id'], 'busy' if busy else 'available'))
+        self._fleet_writes.add(task)
+        task.add_done_callback(self._fleet_writes.discard)
+
+    def update_status(self, alert_id, status, logs_list, data=None, flush=False):
+        """Mise à jour Firestore (via le tampon d'écriture de l'alerte)"""
+        self.writer.update(alert_id, status, logs_list, data, flush=flush)
+
+    async def cache_protocol(self, alert_id, entry):
+        """Stocke le protocole spéculatif sur l'alerte dès qu'il est prêt"""
+        self.writer.update(alert_id, data={'speculative_protocol': entry})
+
+    def invalidate_protocol(self, alert_id, symptomes):
+        """Symptômes modifiés : le protocole spéculatif est régénéré"""
+        return self.protocols.invalidate(alert_id, symptomes)
 
     # --- TÂCHE SPÉCIFIQUE DE L'AGENT SPÉCIALISTE (VIA LLAMA) ---
     async def run_specialist_agent(self, symptomes, age, ccmu):
@@ -78,6 +121,11 @@ class EmergencyOrchestrator:
         """
         if not self.llm:
             return None
+        admission = get_admission_controller()
+        if admission.should_skip('specialist'):
+            # Délestage : le protocole LLM est facultatif, la mission continue sans lui
+            print("⚠️ [IA] Agent Spécialiste sauté (système sous pression)")
+            return None
 
         print("\n🧠 [IA] Agent Spécialiste : Analyse des protocoles en cours...")
 
@@ -101,11 +149,12 @@ class EmergencyOrchestrator:
         )
         
         try:
-            chain = prompt | self.llm
-            response = await chain.ainvoke({"age": age, "symptomes": symptomes, "ccmu": ccmu})
+            # Même patient type (âge, symptômes, CCMU) : protocole servi par le cache LLM
+            messages = prompt.format_messages(age=age, symptomes=symptomes, ccmu=ccmu)
+            content = await cached_ainvoke(self.llm, messages)
             
             # Nettoyage du JSON (retrait des balises Markdown éventuelles)
-            content = response.content.strip()
+            content = content.strip()
             if "```json" in content:
                 content = content.split("```json")[1].split("```")[0].strip()
             elif "```" in content:
@@ -117,67 +166,107 @@ class EmergencyOrchestrator:
             return None
 
     async def simulate_driving(self, alert_id, route_coords, ambulance):
-        """Simulation physique du déplacement"""
+        """
+        Simulation physique du déplacement : un seul trajet paramétré par le temps est publié
+        au départ (les clients interpolent la position), puis la position finale à l'arrivée.
+        """
         print(f"🚑 [SIMULATION] Route de {len(route_coords)} points.")
-        steps = route_coords[::3] 
-        for point in steps:
-            ambulance['current_lat'] = point[0] 
-            ambulance['current_lng'] = point[1]
-            self.update_status(alert_id, 'MOVING', [], {'ambulance': ambulance})
-            await asyncio.sleep(0.6)
+        # Même rythme que l'ancienne simulation point par point (1 point sur 3, 0.6 s chacun)
+        duration_s = len(route_coords[::3]) * 0.6
+        trajectory = Trajectory(route_coords, self.clock.timestamp(), duration_s)
+        self.update_status(alert_id, None, [], {'trajectory': trajectory.to_dict(), 'ambulance': ambulance}, flush=True)
+        await self.clock.sleep(duration_s)
+        end_lat, end_lng = trajectory.position_at(trajectory.end_ts)
+        ambulance['current_lat'] = end_lat
+        ambulance['current_lng'] = end_lng
+        return trajectory
 
-    # --- WORKFLOW PRINCIPAL ---
-    async def run_workflow(self, alert_id, patient_lat, patient_lng, emergency_level, symptomes="Non spécifié", age="Inconnu"):
-        try:
-            print("\n" + "="*60)
-            print(f"🚀 DÉMARRAGE WORKFLOW (ID: {alert_id})")
-            print("="*60 + "\n")
+    # --- GRAPHE DES PHASES ---
+    def build_workflow(self, alert_id, patient_lat, patient_lng, emergency_level, symptomes, age):
+        """
+        Workflow exprimé en graphe de dépendances :
+        normalize -> triage -> {hospital, ambulance, speculate} (en parallèle)
+        hospital + ambulance -> routes -> dispatch -> to_patient -> pickup
+        pickup + speculate -> protocol -> to_hospital -> resolve
+        Le protocole LLM tourne en arrière-plan depuis le triage et n'est attendu qu'à la prise en charge.
+        """
 
+        async def normalize(r):
             # --- PHASE 1 : AGENT PATIENT (Algo) ---
             self.log_agent("Emetteur d'Alerte", "Normalisation", f"Signal reçu. Symptômes: {symptomes}")
-            await asyncio.sleep(1)
+            return {'symptomes': symptomes, 'age': age}
 
+        async def triage(r):
             # --- PHASE 2 : AGENT RÉGULATEUR (Algo Rapide pour Triage) ---
             ccmu_score = 3 if emergency_level >= 2 else 1
             vecteur = "SMUR (UMH)" if ccmu_score >= 3 else "Ambulance Standard"
             self.log_agent("Medical Regulation AI", "Triage Initial", f"Score CCMU {ccmu_score}. Vecteur: {vecteur}.")
-            await asyncio.sleep(1)
+            return {'ccmu_score': ccmu_score, 'vecteur': vecteur}
 
+        async def hospital(r):
             # --- PHASE 3 : AGENT COORDINATEUR (Algo Géographique) ---
-            hospital = self.hospital_service.find_nearest_hospital(patient_lat, patient_lng)
-            self.log_agent("Operational Regulation Chief", "Orchestration", f"Hôpital {hospital['name']} verrouillé.")
-            await asyncio.sleep(1)
+            selected = await self.hospital_service.find_nearest_hospital_async(patient_lat, patient_lng)
+            self.log_agent("Operational Regulation Chief", "Orchestration", f"Hôpital {selected['name']} verrouillé.")
+            return selected
+
+        async def ambulance(r):
+            ambulances = await self.ambulance_service.get_available_by_level_async(emergency_level)
+            return ambulances[0] if ambulances else {'id': 'SMUR-01', 'current_lat': 33.24, 'current_lng': -8.50}
 
+        async def speculate(r):
+            # APPEL À L'IA : lancé en arrière-plan dès que le triage est connu
+            return self.protocols.start(alert_id, symptomes, age, r['triage']['ccmu_score'])
+
+        async def routes(r):
             # --- PHASE 4 : LOGISTIQUE & ROUTING (ORS) ---
-            ambulances = self.ambulance_service.get_available_by_level(emergency_level)
-            ambulance = ambulances[0] if ambulances else {'id': 'SMUR-01', 'current_lat': 33.24, 'current_lng': -8.50}
-            
-            # Calculs Itinéraires
-            amb_coords = [ambulance.get('current_lng'), ambulance.get('current_lat')]
+            amb = r['ambulance']
+            amb_coords = [amb.get('current_lng'), amb.get('current_lat')]
             pat_coords = [patient_lng, patient_lat]
-            hosp_coords = [hospital['coordinates']['lng'], hospital['coordinates']['lat']]
-            
-            route_red = self.ors_service.get_route(amb_coords, pat_coords)
-            route_blue = self.ors_service.get_route(pat_coords, hosp_coords)
-            
+            hosp_coords = [r['hospital']['coordinates']['lng'], r['hospital']['coordinates']['lat']]
+            route_red, route_blue = await asyncio.gather(
+                asyncio.to_thread(self.ors_service.get_route, amb_coords, pat_coords),
+                asyncio.to_thread(self.ors_service.get_route, pat_coords, hosp_coords)
+            )
+            return {'red': route_red, 'blue': route_blue}
+
+        async def dispatch(r):
+            route_red = r['routes']['red']
+            self.update_coverage(r['ambulance'], busy=True)
             self.update_status(alert_id, 'DISPATCHED', 
                 ["Ambulance en route vers le patient."],
                 {
-                    'ambulance': ambulance, 'selected_hospital': hospital,
-                    'route_red': json.dumps(route_red.get('coordinates', [])),
-                    'route_active': 'RED', 'eta_minutes': route_red.get('duration_min', 5)
+                    'ambulance': r['ambulance'], 'selected_hospital': r['hospital'],
+                    'route_red': dumps(route_red.get('coordinates', [])),
+                    'route_profile': route_profile(route_red, [patient_lat, patient_lng], 'RED'),
+                    'route_active': 'RED', 'eta_minutes': route_red.get('duration_min', 5),
+                    # Affine les distances estimées à la création de l'alerte (budget SLA)
+                    'dist_amb_pat': route_red.get('distance_km', 0),
+                    'dist_pat_hosp': r['routes']['blue'].get('distance_km', 0)
                 })
+            return True
 
+        async def to_patient(r):
             # --- PHASE 5 : MOUVEMENT VERS PATIENT ---
-            path_to_patient = route_red.get('coordinates', [])
-            if path_to_patient: await self.simulate_driving(alert_id, path_to_patient, ambulance)
+            path_to_patient = r['routes']['red'].get('coordinates', [])
+            if path_to_patient: await self.simulate_driving(alert_id, path_to_patient, r['ambulance'])
+            return True
 
+        async def pickup(r):
             # --- ARRIVÉE & INTERVENTION DE L'AGENT SPÉCIALISTE (LLAMA) ---
-            self.update_status(alert_id, 'PATIENT_PICKUP', ["Arrivée sur site. Activation Agent Spécialiste..."])
-            
-            # APPEL À L'IA ICI SEULEMENT
-            protocol_data = await self.run_specialist_agent(symptomes, age, ccmu_score)
-            
+            self.update_status(alert_id, 'PATIENT_PICKUP', ["Arrivée sur site. Activation Agent Spécialiste..."],
+                {'ambulance': r['ambulance']})
+            return True
+
+        async def protocol(r):
+            # Symptômes à jour (ils ont pu être modifiés pendant le trajet) + éventuel cache sur l'alerte
+            doc = await run_firestore(self.alerts_collection.document(alert_id).get)
+            current = (doc.to_dict() or {}) if doc.exists else {}
+            current_symptomes = (current.get('patient') or {}).get('symptomes') or symptomes
+            protocol_data = await self.protocols.deliver(
+                alert_id, current_symptomes, age, r['triage']['ccmu_score'],
+                cached=current.get('speculative_protocol'),
+                timeout=Config.PHASE_TIMEOUTS.get('specialist')
+            )
             if protocol_data:
                 # Formatage pour les logs
                 diag = protocol_data.get('diagnostic_suspecte', 'Non déterminé')
@@ -199,16 +288,25 @@ class EmergencyOrchestrator:
                     {'medical_protocol': protocol_data}
                 )
             
-            await asyncio.sleep(4) # Temps pour lire le protocole
+            await self.clock.sleep(4) # Temps pour lire le protocole
+            return True
 
+        async def to_hospital(r):
             # --- PHASE 6 : TRANSPORT VERS HÔPITAL ---
+            route_blue = r['routes']['blue']
+            hosp = r['hospital']['coordinates']
             self.update_status(alert_id, 'EN_ROUTE_TO_HOSPITAL', ["Départ vers l'hôpital."],
-                {'route_blue': json.dumps(route_blue.get('coordinates', [])), 'route_active': 'BLUE'})
+                {'route_blue': dumps(route_blue.get('coordinates', [])), 'route_active': 'BLUE',
+                 'route_profile': route_profile(route_blue, [hosp['lat'], hosp['lng']], 'BLUE'),
+                 'eta_minutes': route_blue.get('duration_min', 5)})
             
             path_to_hospital = route_blue.get('coordinates', [])
-            if path_to_hospital: await self.simulate_driving(alert_id, path_to_hospital, ambulance)
+            if path_to_hospital: await self.simulate_driving(alert_id, path_to_hospital, r['ambulance'])
+            return True
 
+        async def resolve(r):
             # --- EXTRACTION ET SAUVEGARDE DES DONNÉES FINALES ---
+            route_red, route_blue = r['routes']['red'], r['routes']['blue']
             # Calculer les données finales pour l'UI
             total_distance = route_red.get('distance_km', 0) + route_blue.get('distance_km', 0)
             total_eta = route_red.get('duration_min', 0) + route_blue.get('duration_min', 0)
@@ -221,17 +319,84 @@ class EmergencyOrchestrator:
             
             # Données finales à sauvegarder
             final_data = {
-                'hospital_name': hospital['name'],
+                'ambulance': r['ambulance'],
+                'hospital_name': r['hospital']['name'],
                 'distance_km': total_distance,
                 'eta_minutes': total_eta,
-                'arrival_time': datetime.utcnow().isoformat(),
-                'medical_team': medical_team
+                'arrival_time': self.clock.utcnow().isoformat(),
+                'medical_team': medical_team,
+                'phase_timings': dict(dag.timings),
+                # + 1 : cette écriture finale (le passage à RESOLVED vide le tampon en une fois)
+                'firestore_writes': self.writer.write_counts(alert_id)['writes'] + 1
             }
             
             # --- FIN ---
             self.update_status(alert_id, 'RESOLVED', ["Patient admis. Mission terminée."], final_data)
+            return True
+
+        timeouts = Config.PHASE_TIMEOUTS
+        dag = WorkflowDAG([
+            Phase('normalize', normalize),
+            Phase('triage', triage, ['normalize']),
+            Phase('hospital', hospital, ['triage'], timeout=timeouts.get('hospital')),
+            Phase('ambulance', ambulance, ['triage'], timeout=timeouts.get('ambulance')),
+            Phase('speculate', speculate, ['triage']),
+            Phase('routes', routes, ['hospital', 'ambulance'], timeout=timeouts.get('routes')),
+            Phase('dispatch', dispatch, ['routes']),
+            Phase('to_patient', to_patient, ['dispatch']),
+            Phase('pickup', pickup, ['to_patient']),
+            Phase('protocol', protocol, ['pickup', 'speculate']),
+            Phase('to_hospital', to_hospital, ['protocol']),
+            Phase('resolve', resolve, ['to_hospital']),
+        ], clock=self.clock)
+        return dag
+
+    # --- WORKFLOW PRINCIPAL ---
+    async def run_workflow(self, alert_id, patient_lat, patient_lng, emergency_level, symptomes="Non spécifié", age="Inconnu",
+                           checkpoint=None, resume_state=None, assignment=None):
+        """
+        Exécute la mission complète et renvoie le statut final ('RESOLVED' ou 'ERROR').
+        - checkpoint(phase, state) : coroutine appelée après chaque phase terminée (file durable).
+        - resume_state : dernier état sauvegardé ; les phases déjà terminées ne sont pas rejouées.
+        - assignment : résultats imposés pour hospital / ambulance / routes (DispatchEngine, intake groupé).
+        """
+        completed = dict(assignment or {})
+        completed.update((resume_state or {}).get('results', {}))
+        dag = self.build_workflow(alert_id, patient_lat, patient_lng, emergency_level, symptomes, age)
+
+        async def on_phase_done(name, results):
+            completed.update(results)
+            if checkpoint:
+                await checkpoint(name, {'results': results})
+
+        status = None
+        try:
+            print("\n" + "="*60)
+            resumed = (resume_state or {}).get('results')
+            print(f"🚀 DÉMARRAGE WORKFLOW (ID: {alert_id})" + (f" - reprise ({len(resumed)} phases déjà faites)" if resumed else ""))
+            print("="*60 + "\n")
+
+            if 'dispatch' in completed:
+                # Reprise après dispatch : l'ambulance est toujours engagée
+                self.update_coverage(completed['ambulance'], busy=True)
+
+            await dag.run(completed, on_phase_done=on_phase_done)
+
+            print(f"⏱️ Durées par phase (s): {dag.timings}")
             print("✅ MISSION TERMINÉE")
+            status = 'RESOLVED'
+            return status
 
         except Exception as e:
             print(f"❌ ERROR: {e}")
-            self.update_status(alert_id, 'ERROR', [f"Erreur: {str(e)}"])
\ No newline at end of file
+            self.update_status(alert_id, 'ERROR', [f"Erreur: {str(e)}"], {'phase_timings': dag.timings})
+            status = 'ERROR'
+            return status
+        finally:
+            # Bail perdu (CancelledError) : un autre worker a repris la mission, l'ambulance reste engagée
+            if status and completed.get('ambulance'):
+                self.update_coverage(completed['ambulance'], busy=False)
+            # Mission arrêtée avant la remise du protocole : plus d'écriture tardive sur l'alerte close
+            self.protocols.discard(alert_id)
+            counts = await self.writer.close(alert_id)
+            print(f"📝 Écritures Firestore: {counts['writes']} pour {counts['updates']} mises à jour")
\ No newline at end of file
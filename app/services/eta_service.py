@@ -0,0 +1,114 @@
+import threading
+from app.config_settings import Config
+from app.services.ors_service import ORSService
+from app.services.trajectory import Trajectory, augment_route
+
+
+def route_profile(route, destination, leg):
+    """
+    Profil de route stocké sur l'alerte ('route_profile') : polyline + tableaux cumulés
+    (distance, durée ORS réelle), destination [lat, lng] et branche ('RED' / 'BLUE').
+    """
+    coords = route.get('coordinates') or []
+    if not coords:
+        return None
+    if 'cum_km' not in route or 'cum_s' not in route:
+        augment_route(route)
+    profile = Trajectory(coords, 0, (route.get('duration_min') or 0) * 60,
+                         cum_km=route['cum_km'], cum_s=route['cum_s']).to_dict()
+    profile.update({'destination': list(destination), 'leg': leg})
+    return profile
+
+
+class EtaTracker:
+    """
+    ETA incrémental par alerte :
+    - chaque position (simulation ou télémétrie) est projetée sur le segment le plus proche
+      de la route, en partant du dernier segment connu ;
+    - le temps restant est lu dans les sommes préfixes de la route (aucun appel ORS) ;
+    - ORS n'est rappelé que si le véhicule s'écarte de plus de `deviation_km` de la route.
+    """
+
+    def __init__(self, ors_service=None, deviation_km=None):
+        self._ors = ors_service
+        self.deviation_km = deviation_km if deviation_km is not None else Config.ETA_REROUTE_DEVIATION_KM
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ors_service(self):
+        if self._ors is None:
+            self._ors = ORSService()
+        return self._ors
+
+    def load(self, alert_id, profile):
+        """Charge (ou recharge si la route a changé) le profil stocké sur l'alerte"""
+        if not profile:
+            return None
+        key = (profile.get('leg'), profile.get('polyline'))
+        with self._lock:
+            state = self._routes.get(alert_id)
+            if state and state['key'] == key:
+                return state
+        try:
+            route = Trajectory.from_dict(profile)
+        except (KeyError, ValueError, IndexError, TypeError):
+            return None
+        state = {'key': key, 'route': route, 'hint': None, 'profile': profile,
+                 'destination': profile.get('destination'), 'leg': profile.get('leg')}
+        with self._lock:
+            self._routes[alert_id] = state
+        return state
+
+    def update(self, alert_id, lat, lng, reroute=True):
+        """
+        Recalcule l'ETA depuis une position. Renvoie None si aucune route n'est chargée, sinon
+        {'eta_minutes', 'remaining_km', 'deviation_km', 'rerouted', 'route_profile' (si reroutage)}.
+        """
+        with self._lock:
+            state = self._routes.get(alert_id)
+        if not state:
+            return None
+        route = state['route']
+        remaining_km, remaining_s, off, segment = route.remaining_from(lat, lng, state['hint'])
+        if off > self.deviation_km and state['hint'] is not None:
+            # Hors de la fenêtre habituelle : recherche sur toute la route avant de conclure à un écart
+            remaining_km, remaining_s, off, segment = route.remaining_from(lat, lng)
+
+        rerouted, new_profile = False, None
+        if off > self.deviation_km and reroute and state['destination']:
+            dest_lat, dest_lng = state['destination']
+            new_route = self.ors_service.get_route([lng, lat], [dest_lng, dest_lat])
+            new_profile = route_profile(new_route, state['destination'], state['leg'])
+            if new_profile:
+                print(f"[ETA] Écart de {off:.2f} km pour {alert_id}, nouvel itinéraire ORS", flush=True)
+                state = self.load(alert_id, new_profile)
+                remaining_km, remaining_s, off, segment = state['route'].remaining_from(lat, lng)
+                rerouted = True
+
+        state['hint'] = segment
+        result = {
+            'eta_minutes': round(remaining_s / 60, 1),
+            'remaining_km': round(remaining_km, 2),
+            'deviation_km': round(off, 3),
+            'rerouted': rerouted
+        }
+        if rerouted:
+            result['route_profile'] = new_profile
+        return result
+
+    def forget(self, alert_id):
+        with self._lock:
+            self._routes.pop(alert_id, None)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_eta_tracker():
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = EtaTracker()
+    return _tracker
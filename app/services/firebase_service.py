@@ -25,6 +25,8 @@ class FirebaseService:
         """Delete an alert document from Firestore"""
         try:
             self.db.collection('alerts').document(alert_id).delete()
+            from app.services.alert_index import get_alert_index
+            get_alert_index().remove(alert_id)
             return True
         except Exception as e:
             print(f"Error deleting alert {alert_id}: {e}")
@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config_settings import Config
+
+
+class FirestoreIO:
+    """
+    Accès Firestore non bloquant pour le code asyncio :
+    le client firestore.client() est synchrone, chaque appel part donc dans un pool de threads
+    dédié et borné (FIRESTORE_IO_WORKERS). La boucle du worker n'attend jamais un RPC et les
+    missions ne se disputent pas le pool par défaut d'asyncio (utilisé par ORS, SQLite...).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or Config.FIRESTORE_IO_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='firestore-io')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak = 0
+        self._completed = 0
+
+    def _call(self, func, args, kwargs):
+        with self._lock:
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    async def run(self, func, *args, **kwargs):
+        """Exécute un appel Firestore synchrone sans bloquer la boucle courante"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, func, args, kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'in_flight': self._in_flight,
+                'peak': self._peak,
+                'completed': self._completed
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_io = None
+_io_lock = threading.Lock()
+
+
+def get_firestore_io():
+    global _io
+    with _io_lock:
+        if _io is None:
+            _io = FirestoreIO()
+    return _io
+
+
+async def run_firestore(func, *args, **kwargs):
+    """Raccourci : get_firestore_io().run(func, *args, **kwargs)"""
+    return await get_firestore_io().run(func, *args, **kwargs)
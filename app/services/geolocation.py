@@ -1,11 +1,14 @@
 import requests
 import re
 from app.config_settings import Config
+from app.services.deadline import LRUCache, network_timeout
 
 class GeolocationService:
     def __init__(self):
         self.abstract_api_key = Config.ABSTRACT_API_KEY
         self.photon_url = "https://photon.komoot.io/api/"
+        # Adresses déjà géocodées : une adresse connue ne coûte aucun appel réseau
+        self.cache = LRUCache(Config.GEOCODE_CACHE_SIZE, Config.GEOCODE_CACHE_TTL)
         
         self.nominatim_url_search = "https://nominatim.openstreetmap.org/search"
         self.nominatim_headers = {
@@ -28,35 +31,111 @@ class GeolocationService:
         # ... (Code IP inchangé) ...
         return None
     
-    def geocode_address(self, address):
-        """Geocode: Photon (Priorité) -> Nominatim (Smart Split) -> Fallback"""
+    def geocode_address(self, address, deadline=None):
+        """
+        Geocode: Cache -> Photon (Priorité) -> Nominatim (Smart Split) -> Fallback.
+        deadline : chaque appel ne consomme que le budget restant ; épuisé -> fallback ville.
+        """
         if not address: return None
         
         address_clean = address.strip()
+        cache_key = address_clean.lower()
+        cached = self.cache.get(cache_key)
+        if cached:
+            return dict(cached)
         print(f"[Geocode] Attempting: '{address_clean}'", flush=True)
 
         # 1. ESSAI PHOTON (Augmentation du Timeout à 10s)
-        try:
-            params = {'q': address_clean, 'limit': 1}
-            # CORRECTION : Timeout passé de 3 à 10 secondes pour votre connexion
-            resp = requests.get(self.photon_url, params=params, timeout=10)
-            
-            if resp.status_code == 200:
-                features = resp.json().get('features', [])
-                if features:
-                    coords = features[0]['geometry']['coordinates']
-                    props = features[0]['properties']
-                    print(f"[Geocode] SUCCESS (Photon): {props.get('name')}", flush=True)
-                    return {
-                        'lat': float(coords[1]),
-                        'lng': float(coords[0]),
-                        'address': f"{props.get('name', '')}, {props.get('city', '')}",
-                        'source': 'photon_api'
-                    }
-        except Exception as e:
-            print(f"[Geocode] Photon API error: {e}", flush=True)
+        timeout = network_timeout(deadline, 10)
+        if timeout is not None:
+            try:
+                params = {'q': address_clean, 'limit': 1}
+                # CORRECTION : Timeout passé de 3 à 10 secondes pour votre connexion
+                resp = requests.get(self.photon_url, params=params, timeout=timeout)
+                result = self._photon_result(resp)
+                if result:
+                    self.cache.put(cache_key, result)
+                    return result
+            except Exception as e:
+                print(f"[Geocode] Photon API error: {e}", flush=True)
 
         # 2. ESSAI NOMINATIM (Avec stratégies multiples)
+        for query in self._nominatim_queries(address_clean):
+            timeout = network_timeout(deadline, 5)
+            if timeout is None:
+                print("[Geocode] Budget de temps épuisé : fallback ville", flush=True)
+                break
+            try:
+                print(f"[Geocode] Nominatim trying: '{query}'...", flush=True)
+                params = {'q': query, 'format': 'json', 'limit': 1}
+                resp = requests.get(self.nominatim_url_search, params=params, headers=self.nominatim_headers, timeout=timeout)
+                result = self._nominatim_result(resp, query)
+                if result:
+                    self.cache.put(cache_key, result)
+                    return result
+            except Exception: pass
+
+        # 3. FALLBACK VILLE
+        return self._city_fallback(address_clean)
+
+    async def geocode_address_async(self, address, client=None):
+        """Même stratégie que geocode_address, en HTTP asynchrone (mode ASGI) : aucun thread bloqué"""
+        if not address: return None
+
+        import httpx
+        address_clean = address.strip()
+        cache_key = address_clean.lower()
+        cached = self.cache.get(cache_key)
+        if cached:
+            return dict(cached)
+        print(f"[Geocode] Attempting (async): '{address_clean}'", flush=True)
+        own_client = client is None
+        client = client or httpx.AsyncClient()
+        try:
+            try:
+                resp = await client.get(self.photon_url, params={'q': address_clean, 'limit': 1}, timeout=10)
+                result = self._photon_result(resp)
+                if result:
+                    self.cache.put(cache_key, result)
+                    return result
+            except Exception as e:
+                print(f"[Geocode] Photon API error: {e}", flush=True)
+
+            for query in self._nominatim_queries(address_clean):
+                try:
+                    print(f"[Geocode] Nominatim trying: '{query}'...", flush=True)
+                    params = {'q': query, 'format': 'json', 'limit': 1}
+                    resp = await client.get(self.nominatim_url_search, params=params, headers=self.nominatim_headers, timeout=5)
+                    result = self._nominatim_result(resp, query)
+                    if result:
+                        self.cache.put(cache_key, result)
+                        return result
+                except Exception: pass
+        finally:
+            if own_client:
+                await client.aclose()
+
+        return self._city_fallback(address_clean)
+
+    @staticmethod
+    def _photon_result(resp):
+        if resp.status_code != 200:
+            return None
+        features = resp.json().get('features', [])
+        if not features:
+            return None
+        coords = features[0]['geometry']['coordinates']
+        props = features[0]['properties']
+        print(f"[Geocode] SUCCESS (Photon): {props.get('name')}", flush=True)
+        return {
+            'lat': float(coords[1]),
+            'lng': float(coords[0]),
+            'address': f"{props.get('name', '')}, {props.get('city', '')}",
+            'source': 'photon_api'
+        }
+
+    @staticmethod
+    def _nominatim_queries(address_clean):
         queries = [address_clean]
         
         # Stratégie A : Enlever le numéro au début (ex: "r318 Av..." -> "Av...")
@@ -71,36 +150,37 @@ class GeolocationService:
             if simple_part not in queries:
                 queries.append(simple_part)
 
-        for query in queries:
-            try:
-                # On ignore les requêtes trop courtes pour éviter les faux positifs
-                if len(query) < 4: continue 
-                
-                print(f"[Geocode] Nominatim trying: '{query}'...", flush=True)
-                params = {'q': query, 'format': 'json', 'limit': 1}
-                resp = requests.get(self.nominatim_url_search, params=params, headers=self.nominatim_headers, timeout=5)
-                results = resp.json()
-                if results:
-                    r = results[0]
-                    print(f"[Geocode] SUCCESS (Nominatim via '{query}')", flush=True)
-                    return {
-                        'lat': float(r['lat']), 'lng': float(r['lon']), 
-                        'address': r.get('display_name'), 'source': 'nominatim'
-                    }
-            except Exception: pass
+        # On ignore les requêtes trop courtes pour éviter les faux positifs
+        return [q for q in queries if len(q) >= 4]
 
-        # 3. FALLBACK VILLE
+    @staticmethod
+    def _nominatim_result(resp, query):
+        results = resp.json()
+        if not results:
+            return None
+        r = results[0]
+        print(f"[Geocode] SUCCESS (Nominatim via '{query}')", flush=True)
+        return {
+            'lat': float(r['lat']), 'lng': float(r['lon']), 
+            'address': r.get('display_name'), 'source': 'nominatim'
+        }
+
+    def _city_fallback(self, address_clean):
         for city, coords in self.morocco_locations.items():
             if city in address_clean.lower():
                 return {'lat': coords['lat'], 'lng': coords['lng'], 'address': city, 'source': 'fallback'}
         
         return None
 
-    def merge_all_location_sources(self, gps=None, manual=None, ip=None):
+    def merge_all_location_sources(self, gps=None, manual=None, ip=None, deadline=None):
         if manual and (manual.get('address') or (manual.get('lat') and manual.get('lng'))):
             if manual.get('address') and not manual.get('lat'):
-                geocoded = self.geocode_address(manual['address'])
+                geocoded = self.geocode_address(manual['address'], deadline=deadline)
                 if geocoded: return geocoded
+                # Budget trop court pour un appel réseau (géocodage sauté) : la position GPS / IP plutôt qu'un échec
+                if deadline is not None and network_timeout(deadline, 1) is None:
+                    if gps and gps.get('lat'): return gps
+                    if ip and ip.get('lat'): return ip
             
             return {
                 'lat': float(manual.get('lat') or 0),
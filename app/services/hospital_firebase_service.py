@@ -1,5 +1,7 @@
 from app.services.firebase_service import FirebaseService
+from app.services.firestore_io import run_firestore
 from math import radians, sin, cos, sqrt, atan2
+import asyncio
 import json
 import os
 
@@ -45,17 +47,15 @@ class HospitalFirebaseService:
             print(f"[HospitalFirebaseService] Fallback JSON error: {e}", flush=True)
             return []
 
-    def find_nearest_hospital(self, patient_lat, patient_lon, patient_age=None, symptoms=None, **kwargs):
+    def rank_hospitals(self, patient_lat, patient_lon, patient_age=None, symptoms=None, hospitals=None):
         """
-        Trouve l'établissement le plus pertinent selon :
-        - La distance
-        - L'âge du patient (Filtre Pédiatrie)
-        - Les symptômes (Recherche Spécialiste)
-        - Le type d'établissement (Exclusion dentistes/cabinets)
+        Établissements éligibles triés du plus proche au plus loin : [{'hospital', 'distance'}].
+        - hospitals : liste déjà chargée (évite une relecture, ex. intake groupé)
         """
-        hospitals = self.get_all_hospitals()
+        if hospitals is None:
+            hospitals = self.get_all_hospitals()
         if not hospitals:
-            return None
+            return []
         
         print(f"[HospitalService] Recherche - Age: {patient_age}, Symptômes: {symptoms}", flush=True)
 
@@ -148,7 +148,7 @@ class HospitalFirebaseService:
         candidates = eligible_hospitals if eligible_hospitals else [h for h in hospitals if not any(b in h.get('name','').lower() for b in keywords_exclude)]
         
         if not candidates:
-            return None
+            return []
 
         # --- 4. CALCUL DE DISTANCE ---
         hospitals_with_distance = []
@@ -164,41 +164,71 @@ class HospitalFirebaseService:
         
         # Tri du plus proche au plus loin
         hospitals_with_distance.sort(key=lambda x: x['distance'])
-        
-        nearest_obj = hospitals_with_distance[0]['hospital']
-        dist_vol_oiseau = round(hospitals_with_distance[0]['distance'], 2)
-        
-        # --- 5. CALCUL ITINÉRAIRE RÉEL (ORS) ---
-        route_data = {}
+        return hospitals_with_distance
+
+    def find_nearest_hospital(self, patient_lat, patient_lon, patient_age=None, symptoms=None, **kwargs):
+        """
+        Trouve l'établissement le plus pertinent selon :
+        - La distance
+        - L'âge du patient (Filtre Pédiatrie)
+        - Les symptômes (Recherche Spécialiste)
+        - Le type d'établissement (Exclusion dentistes/cabinets)
+        """
+        ranked = self.rank_hospitals(patient_lat, patient_lon, patient_age, symptoms)
+        if not ranked:
+            return None
+
+        nearest_obj = ranked[0]['hospital']
+        dist_vol_oiseau = round(ranked[0]['distance'], 2)
+        route_data = self.route_to(nearest_obj, patient_lat, patient_lon, dist_vol_oiseau)
+        return self.selection(nearest_obj, route_data, dist_vol_oiseau)
+
+    @staticmethod
+    def route_to(hospital, patient_lat, patient_lon, dist_vol_oiseau):
+        """Itinéraire réel (ORS) patient -> établissement, estimation à vol d'oiseau en secours"""
         try:
             # Import différé pour éviter les cycles
             from app.services.ors_service import ORSService
-            ors = ORSService()
-            route_data = ors.get_route(
+            return ORSService().get_route(
                 start_coords=[patient_lon, patient_lat],
-                end_coords=[nearest_obj['lng'], nearest_obj['lat']]
+                end_coords=[hospital['lng'], hospital['lat']]
             )
         except Exception as e:
             print(f"[HospitalService] Erreur ORS: {e}", flush=True)
             # Fallback simple
-            route_data = {
+            return {
                 'distance_km': dist_vol_oiseau,
                 'duration_min': int(dist_vol_oiseau * 2), # Estimation grossière (30km/h)
                 'geometry': ''
             }
-        
-        # Construction de la réponse finale
+
+    @staticmethod
+    def selection(hospital, route_data, distance_km):
+        """Hôpital retenu, au format attendu par l'orchestrateur et la page de suivi"""
         return {
-            'id': nearest_obj.get('id', nearest_obj.get('name')).replace(' ', '_'),
-            'name': nearest_obj['name'],
+            'id': hospital.get('id', hospital.get('name')).replace(' ', '_'),
+            'name': hospital['name'],
             'service': 'Urgences', # Standardisé pour l'affichage
-            'distance_km': route_data.get('distance_km', dist_vol_oiseau),
+            'distance_km': route_data.get('distance_km', distance_km),
             'eta_minutes': route_data.get('duration_min', 15),
-            'coordinates': {'lat': nearest_obj['lat'], 'lng': nearest_obj['lng']},
-            'locality': nearest_obj.get('locality', ''),
+            'coordinates': {'lat': hospital['lat'], 'lng': hospital['lng']},
+            'locality': hospital.get('locality', ''),
             'route_geometry': route_data.get('geometry', '')
         }
     
+    async def find_nearest_hospital_async(self, patient_lat, patient_lon, patient_age=None, symptoms=None, **kwargs):
+        """
+        Version asyncio : la lecture Firestore passe par le pool Firestore, l'appel ORS par
+        asyncio.to_thread pour qu'un routage lent n'occupe pas ce pool.
+        """
+        ranked = await run_firestore(self.rank_hospitals, patient_lat, patient_lon, patient_age, symptoms)
+        if not ranked:
+            return None
+        nearest_obj = ranked[0]['hospital']
+        dist_vol_oiseau = round(ranked[0]['distance'], 2)
+        route_data = await asyncio.to_thread(self.route_to, nearest_obj, patient_lat, patient_lon, dist_vol_oiseau)
+        return self.selection(nearest_obj, route_data, dist_vol_oiseau)
+
     def add_hospital(self, hospital_data):
         """Ajoute un nouvel hôpital"""
         return self.collection.add(hospital_data)
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from app.config_settings import Config
+from app.services.deadline import LRUCache
+from app.services.serialization import dumps, loads
+
+
+def normalize_messages(messages):
+    """
+    Messages d'un appel LLM sous forme canonique [{'role', 'content'}] :
+    chaîne seule (prompt LangChain), messages LangChain ou dicts Groq ; espaces compactés.
+    """
+    if isinstance(messages, str):
+        messages = [{'role': 'user', 'content': messages}]
+    normalized = []
+    for message in messages:
+        if isinstance(message, dict):
+            role, content = message.get('role'), message.get('content')
+        else:
+            role, content = getattr(message, 'type', 'user'), getattr(message, 'content', message)
+        normalized.append({'role': role, 'content': ' '.join(str(content).split())})
+    return normalized
+
+
+def cache_key(model, temperature, messages, max_tokens=None):
+    payload = {'model': model, 'temperature': temperature, 'max_tokens': max_tokens,
+               'messages': normalize_messages(messages)}
+    return hashlib.sha256(dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _estimate_tokens(messages, content):
+    text = ''.join(m['content'] for m in normalize_messages(messages)) + (content or '')
+    return (len(text) + 3) // 4
+
+
+class _DiskTier:
+    """Second niveau optionnel (LLM_CACHE_PATH) : fichier SQLite partagé entre processus et redémarrages"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                                     (key, time.time())).fetchone()
+        return loads(row[0]) if row else None
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, dumps(value), time.time() + ttl))
+
+
+class LLMResponseCache:
+    """
+    Cache des réponses LLM à correspondance exacte, commun à tous les appels Groq
+    (crew, agent spécialiste, MediBot, chat d'urgence) :
+    - clé : modèle, température, max_tokens et messages normalisés ;
+    - mémoire LRU bornée avec durée de vie, puis disque en option ;
+    - bypass=True pour les appels dont la réponse doit varier (horodatages, identifiants, ton libre).
+    Seuls les vrais appels passent par le suivi de latence LLM du contrôle d'admission.
+    """
+
+    def __init__(self, size=None, ttl=None, path=None, enabled=None, clock=time.monotonic):
+        self.ttl = ttl or Config.LLM_CACHE_TTL
+        self.enabled = Config.LLM_CACHE_ENABLED if enabled is None else enabled
+        self.memory = LRUCache(size or Config.LLM_CACHE_SIZE, self.ttl, clock)
+        path = Config.LLM_CACHE_PATH if path is None else path
+        self.disk = _DiskTier(path) if path else None
+        self._lock = threading.Lock()
+        self._disk_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._saved_tokens = 0
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None and self.disk:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.put(key, entry)
+                with self._lock:
+                    self._disk_hits += 1
+        if entry is not None:
+            with self._lock:
+                self._saved_tokens += entry.get('tokens') or 0
+        return entry
+
+    def put(self, key, content, tokens):
+        entry = {'content': content, 'tokens': tokens}
+        self.memory.put(key, entry)
+        if self.disk:
+            try:
+                self.disk.put(key, entry, self.ttl)
+            except sqlite3.Error as e:
+                print(f"[LLMCache] Écriture disque impossible: {e}")
+
+    def _lookup(self, model, temperature, messages, max_tokens, bypass):
+        if bypass or not self.enabled:
+            with self._lock:
+                self._bypassed += 1
+            return None, None
+        key = cache_key(model, temperature, messages, max_tokens)
+        entry = self.get(key)
+        if entry is None:
+            with self._lock:
+                self._misses += 1
+        return key, entry
+
+    def _store(self, key, messages, content, tokens):
+        if key is not None and content:
+            self.put(key, content, tokens or _estimate_tokens(messages, content))
+
+    def cached_call(self, model, temperature, messages, call, max_tokens=None, bypass=False):
+        """call() -> (texte, tokens consommés ou None) ; renvoie le texte, depuis le cache si possible"""
+        key, entry = self._lookup(model, temperature, messages, max_tokens, bypass)
+        if entry is not None:
+            return entry['content']
+        with _admission().track_llm():
+            content, tokens = call()
+        self._store(key, messages, content, tokens)
+        return content
+
+    async def acached_call(self, model, temperature, messages, call, max_tokens=None, bypass=False):
+        """Version asyncio : call() est une coroutine"""
+        key, entry = self._lookup(model, temperature, messages, max_tokens, bypass)
+        if entry is not None:
+            return entry['content']
+        with _admission().track_llm():
+            content, tokens = await call()
+        self._store(key, messages, content, tokens)
+        return content
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            hits = memory['hits'] + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'size': memory['size'],
+                'hits': hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'bypassed': self._bypassed,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'saved_tokens': self._saved_tokens
+            }
+
+
+def _admission():
+    from app.services.admission import get_admission_controller
+    return get_admission_controller()
+
+
+def _usage_tokens(response):
+    """Tokens consommés d'après la réponse (SDK Groq ou message LangChain), None si absents"""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        return getattr(usage, 'total_tokens', None)
+    metadata = getattr(response, 'usage_metadata', None) or {}
+    return metadata.get('total_tokens')
+
+
+def groq_completion(client, messages, temperature, max_tokens=None, model=None, bypass=False):
+    """client.chat.completions.create du SDK Groq via le cache partagé ; renvoie le texte de la réponse"""
+    model = model or Config.GROQ_MODEL
+
+    def call():
+        response = client.chat.completions.create(model=model, messages=messages,
+                                                  temperature=temperature, max_tokens=max_tokens)
+        return response.choices[0].message.content, _usage_tokens(response)
+
+    return get_llm_cache().cached_call(model, temperature, messages, call, max_tokens=max_tokens, bypass=bypass)
+
+
+async def cached_ainvoke(llm, messages, bypass=False):
+    """llm.ainvoke (LangChain) via le cache partagé ; renvoie le texte de la réponse"""
+    model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None)
+    temperature = getattr(llm, 'temperature', None)
+
+    async def call():
+        response = await llm.ainvoke(messages)
+        return response.content, _usage_tokens(response)
+
+    return await get_llm_cache().acached_call(model, temperature, messages, call, bypass=bypass)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+    return _cache
@@ -2,6 +2,20 @@ import requests
 import json
 # Importation de votre configuration pour lire le .env
 from app.config_settings import Config 
+from app.services.trajectory import augment_route, haversine_km
+from app.services.deadline import LRUCache, network_timeout
+
+# Itinéraires partagés par toutes les instances (dispatch, orchestrateur, ETA) : ~10 m de précision
+_route_cache = LRUCache(Config.ORS_CACHE_SIZE, Config.ORS_CACHE_TTL)
+
+# Repli à vol d'oiseau : détour routier moyen et vitesse urbaine d'une ambulance
+ROAD_FACTOR = 1.3
+FALLBACK_SPEED_KMH = 40
+
+
+def _route_key(start_coords, end_coords):
+    return tuple(round(float(c), 4) for c in (*start_coords, *end_coords))
+
 
 class ORSService:
     def __init__(self):
@@ -11,15 +25,26 @@ class ORSService:
         
         self.base_url = "https://api.openrouteservice.org/v2/directions/driving-car"
 
-    def get_route(self, start_coords, end_coords):
+    def get_route(self, start_coords, end_coords, deadline=None):
         """
-        Calcule un itinéraire routier précis en utilisant la clé du .env
+        Calcule un itinéraire routier précis en utilisant la clé du .env.
+        deadline : budget restant de la requête ; s'il est épuisé, repli à vol d'oiseau immédiat.
         """
+        key = _route_key(start_coords, end_coords)
+        cached = _route_cache.get(key)
+        if cached:
+            return dict(cached)
+
         # Vérification de sécurité
         if not self.api_key:
             print("[ORS] ERREUR CRITIQUE : Clé API introuvable dans Config.ORS_API_KEY")
             return self._fallback_route(start_coords, end_coords)
 
+        timeout = network_timeout(deadline, Config.ORS_TIMEOUT_SECONDS)
+        if timeout is None:
+            print("[ORS] Budget de temps épuisé : estimation à vol d'oiseau")
+            return self._fallback_route(start_coords, end_coords)
+
         headers = {
             'Authorization': self.api_key,
             'Content-Type': 'application/json; charset=utf-8'
@@ -34,7 +59,7 @@ class ORSService:
         
         try:
             # Appel API via requests (plus stable que la librairie officielle)
-            response = requests.post(f"{self.base_url}/geojson", json=body, headers=headers)
+            response = requests.post(f"{self.base_url}/geojson", json=body, headers=headers, timeout=timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -47,11 +72,14 @@ class ORSService:
                 # Conversion pour Leaflet [Lat, Lon]
                 path_leaflet = [[coord[1], coord[0]] for coord in geometry]
                 
-                return {
+                # + tableaux cumulés distance / durée (ETA incrémental sans rappeler ORS)
+                route = augment_route({
                     'coordinates': path_leaflet, 
                     'distance_km': round(props['distance'] / 1000, 2),
                     'duration_min': round(props['duration'] / 60, 0)
-                }
+                })
+                _route_cache.put(key, route)
+                return dict(route)
             else:
                 print(f"[ORS Error] API a répondu : {response.status_code} - {response.text}")
                 return self._fallback_route(start_coords, end_coords)
@@ -61,10 +89,16 @@ class ORSService:
             return self._fallback_route(start_coords, end_coords)
 
     def _fallback_route(self, start, end):
-        """Mode secours : Ligne droite si l'API échoue"""
+        """Mode secours : Ligne droite si l'API échoue (distance et durée estimées, non mises en cache)"""
         print("[ORS] Utilisation du mode secours (Ligne droite)")
-        return {
+        distance = haversine_km(float(start[1]), float(start[0]), float(end[1]), float(end[0])) * ROAD_FACTOR
+        return augment_route({
             'coordinates': [[start[1], start[0]], [end[1], end[0]]],
-            'distance_km': 0,
-            'duration_min': 5
-        }
\ No newline at end of file
+            'distance_km': round(distance, 2),
+            'duration_min': max(1, round(distance / FALLBACK_SPEED_KMH * 60)),
+            'fallback': True
+        })
+
+    @staticmethod
+    def cache_stats():
+        return _route_cache.stats()
\ No newline at end of file
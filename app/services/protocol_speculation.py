@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+from app.services.sim_clock import RealClock
+
+
+def protocol_fingerprint(symptomes, age, ccmu):
+    """Empreinte des entrées du protocole : si elle change, le résultat spéculatif est périmé"""
+    normalized = " ".join(str(symptomes or '').lower().split())
+    raw = f"{normalized}|{age}|{ccmu}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class SpeculativeProtocolManager:
+    """
+    Génération spéculative des protocoles (Clinical Protocols Engine) :
+    - start() lance l'appel LLM en tâche de fond dès que le triage est connu.
+    - Le résultat est mis en cache sur l'alerte ('speculative_protocol') dès qu'il arrive.
+    - deliver() le remet au moment de la prise en charge ; si les symptômes ont changé
+      entre-temps, le résultat est invalidé et régénéré.
+    - discard() abandonne la génération d'une mission terminée sans l'avoir remise.
+    - Les métriques indiquent combien de protocoles étaient prêts à temps.
+    À utiliser depuis la boucle asyncio du worker de dispatch.
+    """
+
+    def __init__(self, generate, cache=None, clock=None):
+        self.clock = clock or RealClock()
+        self.generate = generate  # coroutine (symptomes, age, ccmu) -> dict | None
+        self.cache = cache  # coroutine (alert_id, entry) pour stocker le résultat sur l'alerte
+        self._entries = {}
+        self._metrics = {
+            'started': 0,
+            'ready_in_time': 0,
+            'waited': 0,
+            'invalidated': 0,
+            'cache_hits': 0,
+            'failed': 0,
+            'total_wait_s': 0.0
+        }
+
+    def start(self, alert_id, symptomes, age, ccmu):
+        """Démarre la génération en arrière-plan"""
+        self._metrics['started'] += 1
+        return self._launch(alert_id, symptomes, age, ccmu)
+
+    def _launch(self, alert_id, symptomes, age, ccmu):
+        self._cancel(alert_id)
+        fingerprint = protocol_fingerprint(symptomes, age, ccmu)
+        task = asyncio.ensure_future(self._generate(alert_id, fingerprint, symptomes, age, ccmu))
+        self._entries[alert_id] = {
+            'task': task,
+            'fingerprint': fingerprint,
+            'inputs': (symptomes, age, ccmu),
+            'started': self.clock.now()
+        }
+        return fingerprint
+
+    async def _generate(self, alert_id, fingerprint, symptomes, age, ccmu):
+        result = await self.generate(symptomes, age, ccmu)
+        if result and self.cache:
+            try:
+                await self.cache(alert_id, {
+                    'fingerprint': fingerprint,
+                    'protocol': result,
+                    'generated_at': self.clock.utcnow().isoformat()
+                })
+            except Exception as e:
+                print(f"[Speculation] Cache alerte impossible: {e}", flush=True)
+        return result
+
+    def _cancel(self, alert_id):
+        entry = self._entries.pop(alert_id, None)
+        if entry and not entry['task'].done():
+            entry['task'].cancel()
+        return entry
+
+    def discard(self, alert_id):
+        """Fin de mission (erreur, bail perdu) : la génération en cours est annulée et oubliée"""
+        return self._cancel(alert_id) is not None
+
+    def invalidate(self, alert_id, symptomes=None):
+        """Les symptômes ont changé : on jette le résultat et on relance avec les nouvelles entrées"""
+        entry = self._cancel(alert_id)
+        if not entry:
+            return False
+        self._metrics['invalidated'] += 1
+        _, age, ccmu = entry['inputs']
+        if symptomes is not None:
+            self._launch(alert_id, symptomes, age, ccmu)
+        return True
+
+    async def deliver(self, alert_id, symptomes, age, ccmu, cached=None, timeout=None):
+        """
+        Remet le protocole à la prise en charge.
+        - cached : résultat déjà stocké sur l'alerte (ex. après reprise du workflow).
+        """
+        fingerprint = protocol_fingerprint(symptomes, age, ccmu)
+        entry = self._entries.get(alert_id)
+
+        if entry and entry['fingerprint'] != fingerprint:
+            self.invalidate(alert_id, symptomes)
+            entry = self._entries.get(alert_id)
+
+        if not entry:
+            if cached and cached.get('fingerprint') == fingerprint:
+                self._metrics['cache_hits'] += 1
+                self._metrics['ready_in_time'] += 1
+                return cached.get('protocol')
+            self.start(alert_id, symptomes, age, ccmu)
+            entry = self._entries[alert_id]
+
+        task = entry['task']
+        if task.done():
+            self._metrics['ready_in_time'] += 1
+        else:
+            self._metrics['waited'] += 1
+
+        waited_from = self.clock.now()
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except Exception as e:
+            print(f"[Speculation] Protocole indisponible pour {alert_id}: {e}", flush=True)
+            self._metrics['failed'] += 1
+            return None
+        finally:
+            self._metrics['total_wait_s'] += self.clock.now() - waited_from
+            self._cancel(alert_id)
+
+    def metrics(self):
+        m = dict(self._metrics)
+        delivered = m['ready_in_time'] + m['waited']
+        m['ready_ratio'] = round(m['ready_in_time'] / delivered, 3) if delivered else None
+        m['total_wait_s'] = round(m['total_wait_s'], 3)
+        m['in_flight'] = len(self._entries)
+        return m
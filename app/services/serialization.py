@@ -0,0 +1,135 @@
+"""
+Sérialisation JSON centralisée :
+- encodeur rapide (orjson) avec repli sur la bibliothèque standard s'il n'est pas installé ;
+- convertisseurs typés (datetimes, ensembles, Decimal, valeurs calculées par Firestore) au lieu
+  des allers-retours json.loads(json.dumps(..., default=str)) ;
+- lecture tolérante des champs stockés autrefois sous forme de chaîne JSON (dispatch_info, patient).
+"""
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+_NATIVE = (str, int, float, bool, type(None))
+
+
+def is_sentinel(value):
+    # DELETE_FIELD, Increment, SERVER_TIMESTAMP... : valeurs calculées par Firestore, pas des données
+    return type(value).__module__.startswith('google.cloud.firestore')
+
+
+def _scalar(value):
+    """Valeur non native -> équivalent JSON (datetimes en ISO 8601, le reste en texte)"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if is_sentinel(value):
+        return None
+    return str(value)
+
+
+def to_plain(value):
+    """
+    Copie JSON-compatible d'une structure Python (ce que produisait
+    json.loads(json.dumps(value, default=str))), sans passer par une chaîne.
+    """
+    if isinstance(value, _NATIVE):
+        return value
+    if isinstance(value, dict):
+        return {k if isinstance(k, str) else str(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_plain(v) for v in value]
+    return _scalar(value)
+
+
+def to_firestore(value, _in_array=False):
+    """
+    Comme to_plain, pour un document Firestore : un tableau imbriqué dans un tableau
+    (interdit par Firestore, ex. route_coordinates) est stocké en chaîne JSON, comme route_red.
+    """
+    if isinstance(value, _NATIVE) or is_sentinel(value):
+        return value
+    if isinstance(value, dict):
+        return {k if isinstance(k, str) else str(k): to_firestore(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if _in_array:
+            return dumps(to_plain(value))
+        return [to_firestore(v, True) for v in value]
+    return _scalar(value)
+
+
+def _default(value):
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return _scalar(value)
+
+
+if orjson:
+    def dumps_bytes(value, sort_keys=False, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(value, default=_default, option=option)
+
+    def dumps(value, sort_keys=False, indent=False):
+        return dumps_bytes(value, sort_keys, indent).decode('utf-8')
+
+    loads = orjson.loads
+else:
+    def dumps(value, sort_keys=False, indent=False):
+        return json.dumps(value, default=_default, sort_keys=sort_keys, ensure_ascii=False,
+                          indent=2 if indent else None, separators=None if indent else (',', ':'))
+
+    def dumps_bytes(value, sort_keys=False, indent=False):
+        return dumps(value, sort_keys, indent).encode('utf-8')
+
+    loads = json.loads
+
+
+def decode_field(value):
+    """Champ structuré d'une alerte : dict (format actuel) ou chaîne JSON (anciens documents)"""
+    if isinstance(value, (str, bytes)):
+        try:
+            return loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify / request.get_json via l'encodeur rapide. Le format de sortie de Flask est
+    conservé : clés triées, dates au format HTTP.
+    """
+
+    @staticmethod
+    def _flask_default(value):
+        if isinstance(value, datetime.date):
+            return http_date(value)
+        return _default(value)
+
+    def dumps(self, obj, **kwargs):
+        if orjson:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=self._flask_default, option=option).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
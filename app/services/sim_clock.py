@@ -0,0 +1,170 @@
+import asyncio
+import selectors
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from app.config_settings import Config
+
+
+class Clock(ABC):
+    """
+    Horloge du workflow : toutes les pauses et tous les horodatages de l'orchestrateur passent par elle.
+    - now() : secondes monotones (mesure des durées).
+    - utcnow() : date courante (horodatages Firestore).
+    - timestamp() : même instant en secondes epoch (trajets partagés avec les clients).
+    - sleep(s) : pause asynchrone.
+    - new_event_loop() : boucle asyncio adaptée à l'horloge.
+    """
+
+    @abstractmethod
+    def now(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def utcnow(self):
+        raise NotImplementedError
+
+    def timestamp(self):
+        return self.utcnow().replace(tzinfo=timezone.utc).timestamp()
+
+    @abstractmethod
+    async def sleep(self, seconds):
+        raise NotImplementedError
+
+    def new_event_loop(self):
+        return asyncio.new_event_loop()
+
+    def run(self, coro):
+        """Exécute une coroutine jusqu'au bout sur une boucle dédiée à cette horloge"""
+        loop = self.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+class RealClock(Clock):
+    """Temps réel (production)"""
+
+    def now(self):
+        return time.monotonic()
+
+    def utcnow(self):
+        return datetime.utcnow()
+
+    def timestamp(self):
+        return time.time()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class AcceleratedClock(Clock):
+    """Temps réel accéléré ×factor : une pause de 6 s dure 6/factor s, les horodatages avancent factor fois plus vite"""
+
+    def __init__(self, factor=10.0):
+        if factor <= 0:
+            raise ValueError("Le facteur d'accélération doit être > 0")
+        self.factor = float(factor)
+        self._t0 = time.monotonic()
+        self._epoch = datetime.utcnow()
+
+    def now(self):
+        return self._t0 + (time.monotonic() - self._t0) * self.factor
+
+    def utcnow(self):
+        return self._epoch + timedelta(seconds=(time.monotonic() - self._t0) * self.factor)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds / self.factor)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Sélecteur de la boucle virtuelle : au lieu de bloquer jusqu'au prochain timer,
+    il fait avancer l'horloge virtuelle directement jusqu'à celui-ci.
+    Tant qu'un appel en thread (run_in_executor / to_thread) est en cours, il attend
+    réellement sa fin pour ne pas faire expirer les délais à tort.
+    """
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.executor_pending = 0
+
+    def select(self, timeout=None):
+        if timeout is not None and timeout <= 0:
+            return super().select(0)
+        if self.executor_pending:
+            return super().select(None)
+        events = super().select(0)
+        if events:
+            return events
+        if timeout is None:
+            return super().select(None)
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Boucle asyncio à événements discrets : loop.time() est le temps virtuel de l'horloge"""
+
+    def __init__(self, clock):
+        self._virtual_selector = _VirtualSelector(clock)
+        self._virtual_clock = clock
+        super().__init__(selector=self._virtual_selector)
+
+    def time(self):
+        return self._virtual_clock.now()
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._virtual_selector.executor_pending += 1
+
+        def _done(_):
+            self._virtual_selector.executor_pending -= 1
+        future.add_done_callback(_done)
+        return future
+
+
+class VirtualClock(Clock):
+    """
+    Temps entièrement virtuel (simulation à événements discrets) : les pauses ne coûtent
+    aucun temps réel, seules les transitions d'état sont exécutées.
+    À utiliser avec sa propre boucle (new_event_loop() / run()).
+    """
+
+    def __init__(self, start=None):
+        self._now = 0.0
+        self._epoch = start or datetime(2025, 1, 1)
+
+    def now(self):
+        return self._now
+
+    def utcnow(self):
+        return self._epoch + timedelta(seconds=self._now)
+
+    def advance(self, seconds):
+        self._now += max(0.0, seconds)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def new_event_loop(self):
+        return VirtualEventLoop(self)
+
+
+def get_clock(mode=None, factor=None):
+    """
+    Horloge selon la configuration (CLOCK_MODE : 'real' | 'accelerated' | 'virtual').
+    Le mode virtuel n'a de sens que sur la boucle de l'horloge (voir scripts/simulate_missions.py).
+    """
+    mode = mode or Config.CLOCK_MODE
+    if mode == 'real':
+        return RealClock()
+    if mode == 'accelerated':
+        return AcceleratedClock(factor or Config.CLOCK_SPEEDUP)
+    if mode == 'virtual':
+        return VirtualClock()
+    raise ValueError(f"Mode d'horloge inconnu: {mode}")
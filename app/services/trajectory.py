@@ -0,0 +1,198 @@
+import math
+from bisect import bisect_right
+
+
+def encode_polyline(coords, precision=5):
+    """Encode [[lat, lng], ...] au format polyline (Google Encoded Polyline Algorithm)"""
+    factor = 10 ** precision
+    out, prev_lat, prev_lng = [], 0, 0
+    for lat, lng in coords:
+        ilat, ilng = int(round(lat * factor)), int(round(lng * factor))
+        for delta in (ilat - prev_lat, ilng - prev_lng):
+            value = ~(delta << 1) if delta < 0 else (delta << 1)
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lng = ilat, ilng
+    return ''.join(out)
+
+
+def decode_polyline(encoded, precision=5):
+    """Décode une polyline en [[lat, lng], ...]"""
+    factor = 10 ** precision
+    coords, index, lat, lng = [], 0, 0, 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift, result = 0, 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append([lat / factor, lng / factor])
+    return coords
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    r = 6371.0
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def augment_route(route):
+    """Ajoute à une route ORS ses tableaux cumulés (cum_km, cum_s) pour les calculs d'ETA"""
+    coords = route.get('coordinates') or []
+    if coords:
+        profile = Trajectory(coords, 0, (route.get('duration_min') or 0) * 60)
+        route['cum_km'] = [round(d, 4) for d in profile.cum_km]
+        route['cum_s'] = [round(t, 1) for t in profile.cum_s]
+    return route
+
+
+def _local_xy(lat, lng, lat0):
+    # Projection équirectangulaire locale (km), suffisante à l'échelle d'un trajet urbain
+    return lng * 111.320 * math.cos(math.radians(lat0)), lat * 110.574
+
+
+class Trajectory:
+    """
+    Trajet paramétré par le temps : la route, l'heure de départ et les tableaux cumulés
+    (distance en km, temps en s) à chaque point suffisent à connaître la position à
+    n'importe quel instant (recherche dichotomique, O(log n)).
+    Le temps est réparti proportionnellement à la distance sur la durée totale.
+    """
+
+    def __init__(self, coords, start_ts, duration_s, cum_km=None, cum_s=None):
+        if not coords:
+            raise ValueError("Trajet vide")
+        self.coords = [[float(lat), float(lng)] for lat, lng in coords]
+        self.start_ts = float(start_ts)
+        self.duration_s = max(0.0, float(duration_s))
+        self.cum_km = list(cum_km) if cum_km is not None else self._cumulative_km(self.coords)
+        self.cum_s = list(cum_s) if cum_s is not None else self._cumulative_s(self.cum_km, self.duration_s)
+
+    @staticmethod
+    def _cumulative_km(coords):
+        cum = [0.0]
+        for (lat1, lng1), (lat2, lng2) in zip(coords, coords[1:]):
+            cum.append(cum[-1] + haversine_km(lat1, lng1, lat2, lng2))
+        return cum
+
+    @staticmethod
+    def _cumulative_s(cum_km, duration_s):
+        total = cum_km[-1]
+        n = len(cum_km) - 1
+        if total <= 0:
+            return [duration_s * i / n if n else 0.0 for i in range(len(cum_km))]
+        return [duration_s * d / total for d in cum_km]
+
+    @property
+    def distance_km(self):
+        return self.cum_km[-1]
+
+    @property
+    def end_ts(self):
+        return self.start_ts + self.duration_s
+
+    def locate(self, ts):
+        """(index du segment, fraction parcourue dans ce segment) à l'instant ts"""
+        elapsed = min(max(ts - self.start_ts, 0.0), self.duration_s)
+        i = bisect_right(self.cum_s, elapsed) - 1
+        i = min(max(i, 0), len(self.coords) - 1)
+        if i >= len(self.coords) - 1:
+            return len(self.coords) - 1, 0.0
+        span = self.cum_s[i + 1] - self.cum_s[i]
+        return i, ((elapsed - self.cum_s[i]) / span) if span > 0 else 0.0
+
+    def position_at(self, ts):
+        i, frac = self.locate(ts)
+        if i >= len(self.coords) - 1:
+            return tuple(self.coords[-1])
+        (lat1, lng1), (lat2, lng2) = self.coords[i], self.coords[i + 1]
+        return lat1 + (lat2 - lat1) * frac, lng1 + (lng2 - lng1) * frac
+
+    def distance_at(self, ts):
+        """Distance déjà parcourue (km) à l'instant ts"""
+        i, frac = self.locate(ts)
+        if i >= len(self.coords) - 1:
+            return self.cum_km[-1]
+        return self.cum_km[i] + (self.cum_km[i + 1] - self.cum_km[i]) * frac
+
+    def remaining_at(self, ts):
+        """(distance restante en km, temps restant en s) à l'instant ts"""
+        elapsed = min(max(ts - self.start_ts, 0.0), self.duration_s)
+        return self.distance_km - self.distance_at(ts), self.duration_s - elapsed
+
+    def snap(self, lat, lng, hint=None, window=50):
+        """
+        Projette un point sur la route : (index du segment, fraction, écart en km).
+        - hint : dernier segment connu ; seule une fenêtre autour de lui est examinée.
+        """
+        n = len(self.coords)
+        if n == 1:
+            return 0, 0.0, haversine_km(lat, lng, *self.coords[0])
+        first, last = 0, n - 1
+        if hint is not None:
+            first, last = max(0, hint - 2), min(n - 1, hint + window)
+        px, py = _local_xy(lat, lng, lat)
+        best = (0, 0.0, float('inf'))
+        for i in range(first, max(first + 1, last)):
+            ax, ay = _local_xy(*self.coords[i], lat)
+            bx, by = _local_xy(*self.coords[i + 1], lat)
+            dx, dy = bx - ax, by - ay
+            seg2 = dx * dx + dy * dy
+            frac = 0.0 if seg2 == 0 else min(max(((px - ax) * dx + (py - ay) * dy) / seg2, 0.0), 1.0)
+            off = math.hypot(px - (ax + dx * frac), py - (ay + dy * frac))
+            if off < best[2]:
+                best = (i, frac, off)
+        return best
+
+    def remaining_from(self, lat, lng, hint=None):
+        """
+        ETA incrémental depuis une position : projection sur le segment le plus proche puis
+        lecture des sommes préfixes. Renvoie (km restants, s restantes, écart en km, segment).
+        """
+        i, frac, off = self.snap(lat, lng, hint)
+        if i >= len(self.coords) - 1:
+            return 0.0, 0.0, off, i
+        done_km = self.cum_km[i] + (self.cum_km[i + 1] - self.cum_km[i]) * frac
+        done_s = self.cum_s[i] + (self.cum_s[i + 1] - self.cum_s[i]) * frac
+        return self.distance_km - done_km, self.cum_s[-1] - done_s, off, i
+
+    def to_dict(self):
+        return {
+            'polyline': encode_polyline(self.coords),
+            'start_ts': round(self.start_ts, 3),
+            'duration_s': round(self.duration_s, 3),
+            'distance_km': round(self.distance_km, 3),
+            'cum_km': [round(d, 4) for d in self.cum_km],
+            'cum_s': [round(s, 3) for s in self.cum_s]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        coords = decode_polyline(data['polyline'])
+        cum_km, cum_s = data.get('cum_km'), data.get('cum_s')
+        if cum_km is None or cum_s is None or len(cum_km) != len(coords) or len(cum_s) != len(coords):
+            cum_km = cum_s = None
+        return cls(coords, data['start_ts'], data['duration_s'], cum_km=cum_km, cum_s=cum_s)
+
+
+def ambulance_position(alert_data, ts):
+    """Position interpolée de l'ambulance à l'instant ts (None si l'alerte n'a pas de trajet)"""
+    trajectory = (alert_data or {}).get('trajectory')
+    if not trajectory:
+        return None
+    try:
+        return Trajectory.from_dict(trajectory).position_at(ts)
+    except (KeyError, ValueError, IndexError, TypeError):
+        return None
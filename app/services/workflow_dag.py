@@ -0,0 +1,129 @@
+import asyncio
+from app.services.sim_clock import RealClock
+
+
+class PhaseTimeout(Exception):
+    """Levée quand une phase dépasse son délai"""
+
+
+class Phase:
+    """
+    Étape du workflow.
+    - func(results) : coroutine recevant les résultats des phases déjà terminées.
+    - requires : noms des phases dont elle dépend.
+    - timeout : délai maximal en secondes (None = illimité).
+    - optional : un échec / timeout donne un résultat None au lieu d'interrompre le workflow.
+    """
+
+    def __init__(self, name, func, requires=(), timeout=None, optional=False):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.timeout = timeout
+        self.optional = optional
+
+
+class WorkflowDAG:
+    """
+    Exécuteur de graphe de dépendances : chaque phase démarre dès que toutes ses
+    dépendances sont terminées, les phases indépendantes tournent en parallèle.
+    Les durées de chaque phase sont enregistrées dans `timings` (mesurées avec `clock`).
+    """
+
+    def __init__(self, phases, clock=None):
+        self.clock = clock or RealClock()
+        self.phases = {p.name: p for p in phases}
+        for phase in phases:
+            for dep in phase.requires:
+                if dep not in self.phases:
+                    raise ValueError(f"Phase '{phase.name}' dépend d'une phase inconnue: '{dep}'")
+        self._check_acyclic()
+        self.timings = {}
+
+    def _check_acyclic(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle détecté sur la phase '{name}'")
+            visiting.add(name)
+            for dep in self.phases[name].requires:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.phases:
+            visit(name)
+
+    def critical_path(self):
+        """Chaîne de dépendances la plus longue d'après `timings` : (phases, durée en secondes)"""
+        longest = {}
+
+        def visit(name):
+            if name not in longest:
+                before = max((visit(dep) for dep in self.phases[name].requires),
+                             key=lambda path: path[1], default=([], 0.0))
+                longest[name] = (before[0] + [name], before[1] + self.timings.get(name, 0.0))
+            return longest[name]
+
+        if not self.phases:
+            return [], 0.0
+        names, duration = max((visit(name) for name in self.phases), key=lambda path: (path[1], len(path[0])))
+        return names, round(duration, 3)
+
+    async def _run_phase(self, phase, results):
+        started = self.clock.now()
+        try:
+            coro = phase.func(results)
+            if phase.timeout is not None:
+                try:
+                    return await asyncio.wait_for(coro, timeout=phase.timeout)
+                except asyncio.TimeoutError:
+                    raise PhaseTimeout(f"Phase '{phase.name}' > {phase.timeout}s")
+            return await coro
+        except Exception as e:
+            if not phase.optional:
+                raise
+            print(f"[DAG] Phase optionnelle '{phase.name}' ignorée: {e}", flush=True)
+            return None
+        finally:
+            self.timings[phase.name] = round(self.clock.now() - started, 3)
+
+    async def run(self, results=None, on_phase_done=None):
+        """
+        Exécute le graphe et renvoie le dict {phase: résultat}.
+        - results : résultats déjà connus (reprise) ; ces phases ne sont pas rejouées.
+        - on_phase_done(name, results) : coroutine appelée après chaque phase (checkpoint).
+        """
+        results = dict(results or {})
+        running = {}
+
+        def ready():
+            return [p for name, p in self.phases.items()
+                    if name not in results and name not in running.values()
+                    and all(dep in results for dep in p.requires)]
+
+        try:
+            while len(results) < len(self.phases):
+                for phase in ready():
+                    task = asyncio.ensure_future(self._run_phase(phase, results))
+                    running[task] = phase.name
+
+                if not running:
+                    missing = set(self.phases) - set(results)
+                    raise RuntimeError(f"Phases bloquées: {sorted(missing)}")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    results[name] = task.result()
+                    if on_phase_done:
+                        await on_phase_done(name, results)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return results
@@ -0,0 +1,218 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from app.config_settings import Config
+from app.services.serialization import dumps, loads
+
+
+class WorkflowQueue(ABC):
+    """
+    Interface de la file durable des workflows.
+    Chaque job = un workflow d'alerte : entrée (payload), phase courante et état de checkpoint.
+    Les workers réclament les jobs avec un bail (lease) ; un bail expiré rend le job à nouveau disponible,
+    jusqu'à WORKFLOW_MAX_ATTEMPTS réservations : au-delà (job qui fait tomber chaque worker), il passe 'failed'.
+    """
+
+    @abstractmethod
+    def enqueue(self, job_id, payload, priority=0, region=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id, lease_seconds, limit=1, regions=None, steal_after=None):
+        """
+        Réserve jusqu'à `limit` jobs (en attente ou bail expiré), par priorité décroissante.
+        regions : régions du worker (None = toutes) ; les jobs sans région restent pour tous, ceux des
+        autres régions sont repris après `steal_after` secondes d'attente (nœud absent ou saturé).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, worker_id, job_ids, lease_seconds):
+        """Prolonge le bail des jobs encore détenus par ce worker ; renvoie ceux effectivement renouvelés"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def checkpoint(self, job_id, worker_id, phase, state):
+        """Enregistre la dernière phase terminée ; False si le bail a été perdu"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, job_id, worker_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail(self, job_id, worker_id, error):
+        raise NotImplementedError
+
+    @abstractmethod
+    def pending_count(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id):
+        raise NotImplementedError
+
+
+class SQLiteWorkflowQueue(WorkflowQueue):
+    """Implémentation locale (fichier SQLite partagé entre processus, mode WAL)"""
+
+    def __init__(self, path=None, max_attempts=None):
+        self.path = path or Config.WORKFLOW_QUEUE_PATH
+        self.max_attempts = max_attempts or Config.WORKFLOW_MAX_ATTEMPTS
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_jobs (
+                    id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    phase TEXT,
+                    state TEXT,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    region TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(workflow_jobs)")}
+            if 'region' not in columns:
+                # Fichier créé avant le partitionnement par région
+                self._conn.execute("ALTER TABLE workflow_jobs ADD COLUMN region TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_workflow_jobs_claim ON workflow_jobs (status, priority DESC, created_at)"
+            )
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job['payload'] = loads(job['payload'])
+        job['state'] = loads(job['state']) if job['state'] else {}
+        return job
+
+    def enqueue(self, job_id, payload, priority=0, region=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR IGNORE INTO workflow_jobs (id, payload, priority, region, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (job_id, dumps(payload), int(priority), region, now, now)
+            )
+
+    def claim(self, worker_id, lease_seconds, limit=1, regions=None, steal_after=None):
+        now = time.time()
+        where, params = "(status = 'pending' OR (status = 'running' AND lease_until < ?))", [now]
+        if regions is not None:
+            where += f" AND (region IS NULL OR region IN ({','.join('?' * len(regions)) or 'NULL'})"
+            params += list(regions)
+            if steal_after is not None:
+                where += " OR created_at < ?"
+                params.append(now - steal_after)
+            where += ")"
+        with self._lock:
+            # BEGIN IMMEDIATE : verrou d'écriture exclusif entre processus pendant la réservation
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Bail expiré après la dernière tentative autorisée : le job ne sera plus relancé
+                abandoned = self._conn.execute(
+                    """UPDATE workflow_jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ?
+                       WHERE status = 'running' AND lease_until < ? AND attempts >= ?""",
+                    (f"Abandonné après {self.max_attempts} tentatives (bail expiré)", now, now, self.max_attempts)
+                ).rowcount
+                rows = self._conn.execute(
+                    f"""SELECT * FROM workflow_jobs WHERE {where}
+                        ORDER BY priority DESC, created_at ASC LIMIT ?""",
+                    (*params, int(limit))
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        """UPDATE workflow_jobs SET status = 'running', worker_id = ?, lease_until = ?,
+                           attempts = attempts + 1, updated_at = ? WHERE id = ?""",
+                        (worker_id, now + lease_seconds, now, row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if abandoned:
+            print(f"[WorkflowQueue] {abandoned} job(s) abandonné(s) après {self.max_attempts} tentatives", flush=True)
+        jobs = [self._row_to_job(row) for row in rows]
+        for job in jobs:
+            job.update(status='running', worker_id=worker_id, lease_until=now + lease_seconds,
+                       attempts=job['attempts'] + 1)
+        return jobs
+
+    def heartbeat(self, worker_id, job_ids, lease_seconds):
+        now = time.time()
+        renewed = []
+        with self._lock:
+            for job_id in job_ids:
+                cur = self._conn.execute(
+                    "UPDATE workflow_jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                    (now + lease_seconds, now, job_id, worker_id)
+                )
+                if cur.rowcount:
+                    renewed.append(job_id)
+        return renewed
+
+    def checkpoint(self, job_id, worker_id, phase, state):
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE workflow_jobs SET phase = ?, state = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (phase, dumps(state), time.time(), job_id, worker_id)
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id, worker_id):
+        return self._finish(job_id, worker_id, 'done', None)
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, 'failed', str(error))
+
+    def _finish(self, job_id, worker_id, status, error):
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE workflow_jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ? AND worker_id = ?",
+                (status, error, time.time(), job_id, worker_id)
+            )
+        return cur.rowcount == 1
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workflow_jobs WHERE status = 'pending'").fetchone()[0]
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM workflow_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+
+# Backends disponibles (ex. en production : une implémentation Firestore ou Redis enregistrée ici)
+QUEUE_BACKENDS = {
+    'sqlite': SQLiteWorkflowQueue,
+}
+
+
+def register_queue_backend(name, factory):
+    QUEUE_BACKENDS[name] = factory
+
+
+def get_workflow_queue():
+    backend = Config.WORKFLOW_QUEUE_BACKEND
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Backend de file inconnu: {backend}")
+    return QUEUE_BACKENDS[backend]()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
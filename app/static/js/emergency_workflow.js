@@ -44,28 +44,78 @@ class EmergencyWorkflowManager {
         return (R * c).toFixed(2); 
     }
 
+    // --- Flux SSE (instantané puis champs modifiés) ; polling seulement en secours ---
+    startStream() {
+        if (!window.EventSource) return this.startPolling();
+        this.state = {};
+        this.streamErrors = 0;
+        this.eventSource = new EventSource(`/api/alert/${this.alertId}/stream`);
+
+        this.eventSource.addEventListener('snapshot', (e) => {
+            this.streamErrors = 0;
+            this.state = JSON.parse(e.data);
+            this.handleStatusUpdate(this.state);
+        });
+        this.eventSource.addEventListener('update', (e) => {
+            this.streamErrors = 0;
+            const changes = JSON.parse(e.data);
+            if (changes.logs_append) {
+                this.state.logs = (this.state.logs || []).concat(changes.logs_append);
+                delete changes.logs_append;
+            }
+            Object.assign(this.state, changes);
+            this.handleStatusUpdate(this.state);
+        });
+        this.eventSource.addEventListener('end', () => this.stopPolling());
+        this.eventSource.onerror = () => {
+            // EventSource se reconnecte seul (avec Last-Event-ID) ; après plusieurs échecs, on repasse au polling
+            if (++this.streamErrors >= 3) {
+                console.warn("⚠️ Flux SSE indisponible, retour au polling");
+                this.eventSource.close();
+                this.eventSource = null;
+                this.startPolling();
+            }
+        };
+    }
+
     startPolling() {
         this.pollingInterval = setInterval(() => this.fetchStatus(), 1000);
         this.fetchStatus();
     }
 
     stopPolling() {
+        if (this.eventSource) { this.eventSource.close(); this.eventSource = null; }
         if (this.pollingInterval) clearInterval(this.pollingInterval);
         if (this.animationFrame) cancelAnimationFrame(this.animationFrame);
     }
 
     async fetchStatus() {
         try {
-            const response = await fetch(`/api/alert/${this.alertId}/data`);
+            // Requête conditionnelle : 304 si rien n'a changé, sinon seulement les champs modifiés
+            const headers = this.etag ? { 'If-None-Match': this.etag } : {};
+            const since = this.version !== undefined ? `?since=${this.version}` : '';
+            const response = await fetch(`/api/alert/${this.alertId}/data${since}`, { headers, cache: 'no-store' });
+            if (response.status === 304) return;
             const data = await response.json();
-            
+
             if (data.error) {
                 this.stopPolling();
                 return;
             }
-            this.handleStatusUpdate(data);
+            this.etag = response.headers.get('ETag');
+            this.version = data.version;
+            if (data.delta) {
+                if (data.logs_append) {
+                    this.state.logs = (this.state.logs || []).concat(data.logs_append);
+                    delete data.logs_append;
+                }
+                Object.assign(this.state, data);
+            } else {
+                this.state = data;
+            }
+            this.handleStatusUpdate(this.state);
 
-            if (data.status === 'RESOLVED') this.stopPolling();
+            if (this.state.status === 'RESOLVED') this.stopPolling();
         } catch (error) {
             console.error("❌ Erreur API:", error);
         }
@@ -86,11 +136,88 @@ class EmergencyWorkflowManager {
             this.currentRouteColor = '#3b82f6';
         }
 
-        if (ambulance) {
+        if (data.trajectory) {
+            this.followTrajectory(data.trajectory, data.server_time);
+        } else if (ambulance) {
             this.updateAmbulanceSmooth(ambulance);
         }
     }
 
+    // --- Trajet paramétré par le temps : la position est interpolée localement ---
+    decodePolyline(encoded, precision = 5) {
+        const factor = Math.pow(10, precision);
+        const coords = [];
+        let index = 0, lat = 0, lng = 0;
+        while (index < encoded.length) {
+            const deltas = [];
+            for (let k = 0; k < 2; k++) {
+                let shift = 0, result = 0, b;
+                do {
+                    b = encoded.charCodeAt(index++) - 63;
+                    result |= (b & 0x1f) << shift;
+                    shift += 5;
+                } while (b >= 0x20);
+                deltas.push((result & 1) ? ~(result >> 1) : (result >> 1));
+            }
+            lat += deltas[0];
+            lng += deltas[1];
+            coords.push([lat / factor, lng / factor]);
+        }
+        return coords;
+    }
+
+    positionAt(traj, ts) {
+        const coords = traj.coords, cum = traj.cum_s;
+        const elapsed = Math.min(Math.max(ts - traj.start_ts, 0), traj.duration_s);
+        // Recherche dichotomique du segment en cours (O(log n))
+        let lo = 0, hi = cum.length - 1;
+        while (lo < hi) {
+            const mid = (lo + hi + 1) >> 1;
+            if (cum[mid] <= elapsed) lo = mid; else hi = mid - 1;
+        }
+        if (lo >= coords.length - 1) return coords[coords.length - 1];
+        const span = cum[lo + 1] - cum[lo];
+        const f = span > 0 ? (elapsed - cum[lo]) / span : 0;
+        return [
+            coords[lo][0] + (coords[lo + 1][0] - coords[lo][0]) * f,
+            coords[lo][1] + (coords[lo + 1][1] - coords[lo][1]) * f
+        ];
+    }
+
+    followTrajectory(rawTrajectory, serverTime) {
+        // Décalage horloge serveur / navigateur
+        if (serverTime) this.clockOffset = serverTime - Date.now() / 1000;
+        if (this.trajectory && this.trajectory.start_ts === rawTrajectory.start_ts) return;
+
+        const coords = this.decodePolyline(rawTrajectory.polyline || '')
+            .map(p => (p[0] < 0 && p[1] > 0) ? [p[1], p[0]] : p);
+        if (coords.length === 0) return;
+        let cum_s = rawTrajectory.cum_s;
+        if (!cum_s || cum_s.length !== coords.length) {
+            cum_s = coords.map((_, i) => coords.length > 1 ? rawTrajectory.duration_s * i / (coords.length - 1) : 0);
+        }
+        this.trajectory = { ...rawTrajectory, coords, cum_s };
+
+        const icon = this.createAmbulanceIcon(this.currentRouteColor);
+        const now = Date.now() / 1000 + (this.clockOffset || 0);
+        if (!this.ambulanceMarker) {
+            this.ambulanceMarker = L.marker(this.positionAt(this.trajectory, now), {
+                icon: icon, zIndexOffset: 1000
+            }).addTo(this.map).bindPopup("<b><i class=\"fas fa-ambulance mr-1\"></i> Ambulance SMUR</b>");
+        } else {
+            this.ambulanceMarker.setIcon(icon);
+        }
+
+        if (this.animationFrame) cancelAnimationFrame(this.animationFrame);
+        const play = () => {
+            const traj = this.trajectory;
+            const ts = Date.now() / 1000 + (this.clockOffset || 0);
+            this.ambulanceMarker.setLatLng(this.positionAt(traj, ts));
+            this.animationFrame = (ts < traj.start_ts + traj.duration_s) ? requestAnimationFrame(play) : null;
+        };
+        this.animationFrame = requestAnimationFrame(play);
+    }
+
     updateAmbulanceSmooth(amb) {
         let lat = parseFloat(amb.current_lat), lng = parseFloat(amb.current_lng);
         if (lat < 0 && lng > 0) { let t = lat; lat = lng; lng = t; }
@@ -288,7 +415,7 @@ document.addEventListener('DOMContentLoaded', () => {
             clearInterval(t);
             console.log("✅ Map Prête. Init Manager avec PatientPos:", patientPos);
             window.workflowManager = new EmergencyWorkflowManager(alertId, window.map, patientPos);
-            window.workflowManager.startPolling();
+            window.workflowManager.startStream();
         }
     }, 200);
 });
\ No newline at end of file
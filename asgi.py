@@ -0,0 +1,9 @@
+from dotenv import load_dotenv
+
+# Load environment variables from config directory
+load_dotenv('config/.env')
+
+from app.asgi import create_asgi_app
+
+# uvicorn asgi:app   (ou SERVER_MODE=asgi python run.py) ; un seul worker : état local au processus
+app = create_asgi_app()
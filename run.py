@@ -12,5 +12,15 @@ app = create_app()
 
 if __name__ == '__main__':
     import sys
+    from app.config_settings import Config
     sys.stdout.flush()
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
+    if Config.SERVER_MODE == 'asgi':
+        # Mode asynchrone : uvicorn + app/asgi.py (voir asgi.py)
+        import uvicorn
+        if Config.ASGI_WORKERS > 1:
+            # Dédoublonnage, jetons /alert/prepare, index et flux d'alertes sont locaux au processus
+            print(f"⚠️ ASGI_WORKERS={Config.ASGI_WORKERS} : doublons et jetons de préparation "
+                  "ne sont détectés que dans le worker qui les a reçus")
+        uvicorn.run('asgi:app', host='0.0.0.0', port=5000, workers=Config.ASGI_WORKERS)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Microbenchmark of the alert creation serialization path.
+Run: python scripts/bench_serialization.py --iterations 20000
+
+Compares the former json.loads(json.dumps(..., default=str)) round trips of
+api.create_alert (patient, location, dispatch stored as a JSON string, then
+re-parsed for the response) with the serialization module (typed converters,
+dict stored as is, fast encoder for the response body).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import serialization
+
+
+def sample_alert():
+    patient = {
+        'nom_prenom': 'Fatima Zahra', 'age': 67, 'sexe': 'F', 'emergency_level': 3,
+        'symptomes': 'Douleur thoracique intense, essoufflement, sueurs froides',
+        'localisation': 'Avenue Mohammed V, El Jadida', 'gps_coords': [33.2541, -8.5060],
+        'antecedents': ['hypertension', 'diabète de type 2'], 'submitted_at': datetime.utcnow(),
+    }
+    location = {'lat': 33.2541, 'lng': -8.5060, 'source': 'gps', 'accuracy': 12.5,
+                'display_name': 'Avenue Mohammed V, El Jadida, Maroc'}
+    dispatch = {
+        'hospital': {'id': 'CHU_El_Jadida', 'name': 'CHU El Jadida', 'locality': 'El Jadida',
+                     'coordinates': {'lat': 33.2316, 'lng': -8.5007}},
+        'mission': {'total_distance_km': 7.42, 'total_eta_minutes': 14, 'dist_leg1_km': 3.1,
+                    'dist_leg2_km': 4.32, 'ambulance_to_patient_min': 6, 'patient_to_hospital_min': 8,
+                    'trajectory_geometry': 'a' * 600, 'emergency_level': 3},
+        'route_coordinates': [[33.26, -8.49], [33.2541, -8.5060], [33.2316, -8.5007]],
+    }
+    return patient, location, dispatch
+
+
+def legacy(patient, location, dispatch):
+    document = {
+        'patient': json.loads(json.dumps(patient, default=str)),
+        'location': json.loads(json.dumps(location, default=str)),
+        'dispatch_info': json.dumps(dispatch, default=str),
+    }
+    body = json.dumps({'success': True, 'dispatch': json.loads(json.dumps(dispatch, default=str))})
+    return document, body
+
+
+def current(patient, location, dispatch):
+    document = {
+        'patient': serialization.to_firestore(patient),
+        'location': serialization.to_firestore(location),
+        'dispatch_info': serialization.to_firestore(dispatch),
+    }
+    body = serialization.dumps({'success': True, 'dispatch': dispatch})
+    return document, body
+
+
+def bench(fn, args, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    sample = sample_alert()
+    before = bench(legacy, sample, args.iterations)
+    after = bench(current, sample, args.iterations)
+    print(f"Encodeur: {serialization.BACKEND} | {args.iterations} itérations")
+    print(f"Allers-retours json (avant): {before:.1f} µs par alerte")
+    print(f"Module serialization (après): {after:.1f} µs par alerte | x{before / after if after else 0:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Prompt context size of the crew_simple agents, legacy vs projected.
+Run: python scripts/crew_context_report.py
+     python scripts/crew_context_report.py --live   (real Groq calls, needs GROQ_API_KEY)
+
+Offline, the prompts of one representative run (ORS route with its geometry and
+cumulative arrays, typical agent outputs) are rendered twice: the former context
+(json.dumps(indent=2) of every previous result) and the context projector (declared
+fields, no geometry, compact JSON, token budget). With --live the crew runs once per
+mode and the per-agent latencies and wall-clock times are compared.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.crew.context_projector import ContextProjector
+
+
+def sample_run(points):
+    coords = [[33.5731 + i * 0.0002, -7.5898 + i * 0.0001] for i in range(points)]
+    route = {'coordinates': coords, 'distance_km': 7.42, 'duration_min': 14.0,
+             'cum_km': [round(i * 0.037, 4) for i in range(points)], 'cum_s': [round(i * 4.2, 1) for i in range(points)],
+             'geometry': 'ezyfE~a`mA' * (points // 4)}
+    hospital = {'id': 'CHU_Ibn_Rochd', 'name': 'CHU Ibn Rochd', 'service': 'Urgences', 'distance_km': 7.42,
+                'eta_minutes': 14, 'coordinates': {'lat': 33.58, 'lng': -7.62}, 'locality': 'Casablanca',
+                'route_geometry': route['geometry']}
+    alert = {'alert_id': 'b6f1', 'timestamp': '2025-03-01T10:00:00',
+             'patient_data': {'nom': 'Test Patient', 'age': 45, 'sexe': 'M',
+                              'symptomes_bruts': 'Douleur thoracique intense', 'conscience': 'CONSCIENT'},
+             'localisation': {'adresse_detectee': 'Bd Anfa, Casablanca', 'source': 'GPS',
+                              'coordonnees': {'lat': 33.5731, 'lng': -7.5898}, 'precision_estimee_metres': 15}}
+    medical = {'triage_medical': {'score_ccmu': 4, 'niveau_gravite': 'CRITIQUE', 'urgence_vitale_suspectee': True,
+                                  'type_vecteur_requis': 'SMUR', 'specialite_requise': 'CARDIOLOGIE',
+                                  'hypotheses_diagnostiques': ['SCA ST+', 'Dissection aortique'],
+                                  'risque_evolution': 'INSTABLE'}}
+    coordinator = {'decision_operationnelle': {'statut': 'ASSIGNED', 'ambulance_assignee': {'id': 'AMB-001', 'type': 'SMUR'},
+                                               'hopital_cible': {'id': hospital['id'], 'nom': hospital['name']}},
+                   'selected_hospital': hospital}
+    ambulance = {'logistique': {'temps_total_mission_min': 22,
+                                'segment_aller': {'eta_patient_minutes': 8, 'distance_km': 3.1},
+                                'segment_retour': {'eta_hopital_minutes': 14, 'distance_km': 7.42},
+                                'itineraire': {'polyline_encodee': route['geometry'], 'points_passage': ['33.57,-7.58'] * 20},
+                                'heure_arrivee_estimee_hopital': '2025-03-01T10:22:00'},
+                 'route_data': route}
+    hospital_prep = {'accueil_hopital': {'statut_lit': 'RESERVED', 'numero_lit': 'DECH-2',
+                                         'equipe_mobilisee': ['Urgentiste', 'Cardiologue'],
+                                         'instructions_acces': 'Porte Urgences A'}}
+    specialist = {'support_clinique': {'protocole_transport': 'ECG 12 dérivations, voie veineuse, aspirine 250 mg',
+                                       'checklist_accueil': ['Salle de cathétérisme'], 'medicaments_a_preparer': ['Héparine']}}
+    return {
+        'analyse_medicale_d_urgence': {'alert': alert},
+        'triage_patients_et_selection_ambulance': {'medical': medical, 'nearest_hospital': hospital},
+        'valider_la_demande_du_coordonnateur': {'route': route, 'coordinator': coordinator},
+        'recevoir_les_patients': {'medical': medical, 'ambulance': ambulance},
+        'traitement_du_specialiste': {'medical': medical},
+        'consolider_dossier_pour_ui': {'alert': alert, 'medical': medical, 'coordinator': coordinator,
+                                       'ambulance': ambulance, 'hospital': hospital_prep, 'specialist': specialist},
+    }
+
+
+def offline(points):
+    projector = ContextProjector(enabled=True, compare=True)
+    usage = projector.begin()
+    for task, sources in sample_run(points).items():
+        projector.render(task, sources)
+    report = projector.report(usage)
+    print(f"Itinéraire de {points} points | budget {projector.default_budget} tokens par agent\n")
+    print(f"{'Tâche':42} {'avant':>8} {'après':>8}")
+    for task, usage in report['tasks'].items():
+        flag = ' (tronqué)' if usage['truncated'] else ''
+        print(f"{task:42} {usage['legacy_tokens']:>8} {usage['tokens']:>8}{flag}")
+    print(f"{'Total':42} {report['legacy_tokens']:>8} {report['tokens']:>8}  (-{report['reduction']:.0%})")
+
+
+def live():
+    from app.crew.crew_simple import MediAlertCrew
+    inputs = {'nom_prenom': 'Test Patient', 'age': 45, 'sexe': 'M',
+              'symptomes': 'Douleur thoracique intense, difficulté à respirer', 'localisation': 'Casablanca, Maroc'}
+    runs = {}
+    for enabled in (False, True):
+        crew = MediAlertCrew()
+        crew.projector.enabled = enabled
+        runs[enabled] = crew.execute_emergency_response(inputs).get('latency', {})
+    print(f"\n{'Agent':20} {'avant (s)':>10} {'après (s)':>10}")
+    for agent in runs[True].get('agents', {}):
+        print(f"{agent:20} {runs[False].get('agents', {}).get(agent, 0):>10} {runs[True]['agents'][agent]:>10}")
+    for key, label in (('wall_s', 'Durée réelle'), ('sum_s', 'Somme des agents')):
+        print(f"{label:20} {runs[False].get(key, 0):>10} {runs[True].get(key, 0):>10}")
+    before, after = runs[False].get('context', {}), runs[True].get('context', {})
+    print(f"{'Tokens de contexte':20} {before.get('tokens', 0):>10} {after.get('tokens', 0):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=400, help="points de l'itinéraire ORS de l'exemple")
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+    if args.live:
+        live()
+    else:
+        offline(args.points)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Concurrent load test against a running server (WSGI or ASGI mode).
+Run: python run.py                      # mode WSGI (serveur de développement Flask)
+     SERVER_MODE=asgi python run.py     # mode ASGI (uvicorn, app/asgi.py)
+     python scripts/load_test.py --url http://localhost:5000/api/geocode --method POST \\
+         --json '{"address": "El Jadida"}' --concurrency 200 --requests 2000
+
+Run the same command against both modes and compare throughput and p95/p99 latencies
+at equal concurrency. Authenticated routes need a session cookie:
+--header 'Cookie: session=...'.
+
+     python scripts/load_test.py --inprocess [--streams 300 --io-ms 200]
+
+--inprocess needs no server nor credentials: a synthetic Flask app (POST /api/alert waits
+--io-ms like the ORS / Firestore calls, SSE trackers stay open) is driven through app/asgi.py
+with --streams trackers open, in three layouts: a single WSGI thread pool, the former ASGI
+prefix routing (trackers on the I/O pool) and the current routing (trackers on their own pool).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_load(url, method, body, headers, concurrency, total, timeout, transport=None):
+    latencies, statuses = [], Counter()
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport) as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    # wait_for : le transport ASGI en mémoire ignore les délais httpx
+                    response = await asyncio.wait_for(client.request(method, url, json=body, headers=headers), timeout)
+                    statuses[response.status_code] += 1
+                except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses
+
+
+def synthetic_app(io_seconds, release):
+    from flask import Flask, Response
+
+    app = Flask(__name__)
+
+    @app.route('/api/alert', methods=['POST'])
+    def create_alert():
+        time.sleep(io_seconds)  # géocodage, dispatch, écritures Firestore
+        return {'success': True}
+
+    @app.route('/api/alert/<alert_id>/stream')
+    def stream_alert(alert_id):
+        def generate():
+            yield 'retry: 3000\n\n'
+            release.wait()  # tracker ouvert en attente d'événements
+        return Response(generate(), mimetype='text/event-stream')
+
+    return app
+
+
+LAYOUTS = {
+    'WSGI (un seul pool)': {'io_routes': [], 'stream_routes': []},
+    'ASGI préfixe /api/alert': {'io_routes': ['/api/alert(/.*)?'], 'stream_routes': []},
+    'ASGI actuel': {},
+}
+
+
+async def run_layout(app, args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://local', timeout=None) as client:
+        streams = [asyncio.ensure_future(client.get(f'/api/alert/a{i}/stream')) for i in range(args.streams)]
+        await asyncio.sleep(0.5)
+        started = time.perf_counter()
+        latencies, statuses = await run_load('http://local/api/alert', 'POST', {'patient': 'test'}, {},
+                                             args.concurrency, args.requests, args.timeout, transport)
+        wall = time.perf_counter() - started
+        for task in streams:
+            task.cancel()
+    return latencies, statuses, wall
+
+
+def inprocess(args):
+    from app.asgi import AsgiApp
+    print(f"{args.streams} trackers SSE ouverts | {args.requests} POST /api/alert (concurrence {args.concurrency},"
+          f" {args.io_ms:.0f} ms d'E/S chacune)\n")
+    print(f"{'Disposition':26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'échecs':>8}")
+    for name, routes in LAYOUTS.items():
+        release = threading.Event()
+        app = AsgiApp(synthetic_app(args.io_ms / 1000, release), **routes)
+        latencies, statuses, wall = asyncio.run(run_layout(app, args))
+        release.set()
+        for pool in (app.io_pool, app.wsgi_pool, app.stream_pool):
+            pool.shutdown(wait=False)
+        failures = sum(n for status, n in statuses.items() if status != 200)
+        print(f"{name:26} {len(latencies) / wall if wall else 0:>8.1f} {percentile(latencies, 50) * 1000:>8.0f}"
+              f" {percentile(latencies, 95) * 1000:>8.0f} {failures:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000/api/geocode')
+    parser.add_argument('--method', default='POST')
+    parser.add_argument('--json', default='{"address": "El Jadida"}')
+    parser.add_argument('--header', action='append', default=[], help="'Nom: valeur' (répétable)")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--inprocess', action='store_true', help='comparaison des dispositions ASGI sans serveur')
+    parser.add_argument('--streams', type=int, default=300)
+    parser.add_argument('--io-ms', type=float, default=200)
+    args = parser.parse_args()
+    if args.inprocess:
+        return inprocess(args)
+
+    body = json.loads(args.json) if args.json and args.method.upper() != 'GET' else None
+    headers = dict(h.split(':', 1) for h in args.header)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+
+    started = time.perf_counter()
+    latencies, statuses = asyncio.run(run_load(
+        args.url, args.method.upper(), body, headers, args.concurrency, args.requests, args.timeout))
+    wall = time.perf_counter() - started
+
+    errors = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 500)
+    print(f"Requêtes: {len(latencies)} {args.method.upper()} {args.url} (concurrence {args.concurrency})")
+    print(f"Débit: {len(latencies) / wall if wall else 0:.1f} req/s sur {wall:.2f} s")
+    print(f"Latence p50: {percentile(latencies, 50) * 1000:.0f} ms | p95: {percentile(latencies, 95) * 1000:.0f} ms"
+          f" | p99: {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"Statuts: {dict(statuses)} | erreurs: {errors}")
+
+
+if __name__ == '__main__':
+    main()
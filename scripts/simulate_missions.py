@@ -0,0 +1,148 @@
+"""Simulate many emergency missions on a virtual (or accelerated) clock.
+Run: python scripts/simulate_missions.py --missions 1000 --concurrency 200
+     python scripts/simulate_missions.py --mode accelerated --speedup 50 --missions 20
+
+Firestore, ORS and the LLM are replaced by in-memory fakes: only the orchestrator
+state machine (phases, status transitions, pauses) is exercised.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.emergency_orchestrator import EmergencyOrchestrator
+from app.services.sim_clock import get_clock
+
+
+class _MemoryDoc:
+    def __init__(self, store, alert_id):
+        self.store, self.alert_id = store, alert_id
+
+    def update(self, data):
+        self.store.setdefault(self.alert_id, []).append(data)
+
+    def get(self):
+        return _MemorySnapshot()
+
+
+class _MemorySnapshot:
+    exists = False
+
+    def to_dict(self):
+        return None
+
+
+class MemoryAlerts:
+    """Collection 'alerts' en mémoire : conserve l'historique des mises à jour par alerte"""
+
+    def __init__(self):
+        self.store = {}
+
+    def document(self, alert_id):
+        return _MemoryDoc(self.store, alert_id)
+
+
+class FakeHospitals:
+    def find_nearest_hospital(self, lat, lng):
+        return {'name': 'CHU Simulation', 'coordinates': {'lat': lat + 0.05, 'lng': lng + 0.05}}
+
+    async def find_nearest_hospital_async(self, lat, lng, **kwargs):
+        return self.find_nearest_hospital(lat, lng)
+
+
+class FakeAmbulances:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def get_available_by_level(self, level):
+        return [{'id': f"AMB-{self.rng.randint(1, 50):03d}",
+                 'current_lat': 33.2 + self.rng.random() * 0.1,
+                 'current_lng': -8.5 + self.rng.random() * 0.1}]
+
+    async def get_available_by_level_async(self, level):
+        return self.get_available_by_level(level)
+
+
+class FakeORS:
+    def __init__(self, points):
+        self.points = points
+
+    def get_route(self, start, end):
+        coords = [[start[1] + (end[1] - start[1]) * i / self.points,
+                   start[0] + (end[0] - start[0]) * i / self.points] for i in range(self.points + 1)]
+        return {'coordinates': coords, 'distance_km': 5.0, 'duration_min': 8}
+
+
+class SimulatedOrchestrator(EmergencyOrchestrator):
+    """Orchestrateur sans couverture Firestore ni LLM : l'agent spécialiste est une pause sur l'horloge"""
+
+    llm_latency = 3.0
+
+    def update_coverage(self, ambulance, busy):
+        pass
+
+    async def run_specialist_agent(self, symptomes, age, ccmu):
+        await self.clock.sleep(self.llm_latency)
+        return {'diagnostic_suspecte': 'Simulation', 'protocole_transport': 'Standard',
+                'checklist_accueil': [], 'medicaments_a_preparer': []}
+
+
+async def run_missions(orchestrator, count, concurrency, rng):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def mission(i):
+        async with slots:
+            return await orchestrator.run_workflow(
+                f"SIM-{i:05d}", 33.25 + rng.random() * 0.1, -8.5 + rng.random() * 0.1,
+                rng.randint(1, 5), "douleur thoracique", str(rng.randint(1, 95))
+            )
+
+    return await asyncio.gather(*(mission(i) for i in range(count)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--missions', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--route-points', type=int, default=60)
+    parser.add_argument('--mode', choices=['virtual', 'accelerated', 'real'], default='virtual')
+    parser.add_argument('--speedup', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = get_clock(args.mode, args.speedup)
+    alerts = MemoryAlerts()
+    orchestrator = SimulatedOrchestrator(
+        clock=clock, alerts_collection=alerts, hospital_service=FakeHospitals(),
+        ambulance_service=FakeAmbulances(rng), ors_service=FakeORS(args.route_points), llm=False
+    )
+
+    # Les logs par mission noieraient le résumé
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    started_wall, started_sim = time.perf_counter(), clock.now()
+    try:
+        statuses = clock.run(run_missions(orchestrator, args.missions, args.concurrency, rng))
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+    wall = time.perf_counter() - started_wall
+    simulated = clock.now() - started_sim
+
+    transitions = Counter(u['status'] for updates in alerts.store.values() for u in updates if 'status' in u)
+    writes = sum(len(updates) for updates in alerts.store.values())
+    print(f"Missions: {args.missions} (mode {args.mode}, concurrence {args.concurrency})")
+    print(f"Résultats: {dict(Counter(statuses))}")
+    print(f"Temps simulé: {simulated:.1f} s | temps réel: {wall:.2f} s | x{simulated / wall if wall else 0:.0f}")
+    print(f"Écritures alertes: {writes} ({writes / max(args.missions, 1):.1f} par mission)")
+    print(f"Transitions: {dict(transitions)}")
+
+
+if __name__ == '__main__':
+    main()
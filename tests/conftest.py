@@ -0,0 +1,82 @@
+import pytest
+
+from app.services.ambulance_firebase_service import AmbulanceFirebaseService
+from app.services.hospital_firebase_service import HospitalFirebaseService
+
+
+class FakeClock:
+    """Horloge manuelle (time.monotonic factice) : le test avance clock.now"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeHospitals(HospitalFirebaseService):
+    """Service hôpitaux réel sans Firestore : catalogue en mémoire, lectures comptées"""
+
+    def __init__(self, hospitals):
+        self.hospitals = hospitals
+        self.reads = 0
+
+    def get_all_hospitals(self):
+        self.reads += 1
+        return [dict(h) for h in self.hospitals]
+
+    def find_nearest_hospital(self, *args, **kwargs):
+        raise AssertionError("le moteur ne doit pas relancer la sélection historique (ORS en double)")
+
+
+class FakeAmbulances(AmbulanceFirebaseService):
+    """Service ambulances réel sans Firestore : flotte en mémoire, unités 'busy' retirées"""
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self.busy = set()
+        self.reads = 0
+
+    def get_available_ambulances(self):
+        self.reads += 1
+        return [dict(a) for a in self.fleet if a['id'] not in self.busy]
+
+
+class CountingORS:
+    """ORS factice : trace les trajets demandés ; down -> indisponible, fallback -> estimation"""
+
+    def __init__(self):
+        self.calls = []
+        self.down = False
+        self.fallback = False
+
+    def get_route(self, start, end, deadline=None):
+        self.calls.append((tuple(start), tuple(end)))
+        if self.down:
+            raise ConnectionError('ORS indisponible')
+        route = {'coordinates': [start, end], 'distance_km': 3.0, 'duration_min': 6}
+        if self.fallback:
+            route['fallback'] = True
+        return route
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def hospitals(request):
+    """Hôpitaux du module de test (HOSPITALS)"""
+    return FakeHospitals(request.module.HOSPITALS)
+
+
+@pytest.fixture
+def ambulances(request):
+    """Flotte du module de test (FLEET)"""
+    return FakeAmbulances(request.module.FLEET)
+
+
+@pytest.fixture
+def ors():
+    return CountingORS()
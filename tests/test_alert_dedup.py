@@ -0,0 +1,35 @@
+from app.services.alert_dedup import AlertDeduplicator
+
+
+def test_idempotency_key_returns_first_alert_until_expiry(clock):
+    dedup = AlertDeduplicator(key_ttl=60, window=10, cell_km=0.2, clock=clock)
+    assert dedup.claim_key('a1', 'alice', 'k1') is None
+    assert dedup.claim_key('a2', 'alice', 'k1') == 'a1'
+    # Même clé, autre utilisateur : pas de collision
+    assert dedup.claim_key('a3', 'bob', 'k1') is None
+    assert dedup.claim_key('a4', 'alice', None) is None
+
+    clock.now = 61
+    assert dedup.claim_key('a5', 'alice', 'k1') is None
+    assert dedup.stats()['suppressed'] == 1
+
+
+def test_near_duplicate_same_user_same_area_within_window(clock):
+    dedup = AlertDeduplicator(key_ttl=60, window=10, cell_km=0.2, clock=clock)
+    assert dedup.claim_location('a1', 'alice', 33.2500, -8.5000) is None
+    # ~50 m plus loin, éventuellement dans la cellule voisine
+    assert dedup.claim_location('a2', 'alice', 33.2504, -8.5003) == 'a1'
+    assert dedup.claim_location('a3', 'bob', 33.2500, -8.5000) is None
+    assert dedup.claim_location('a4', 'alice', 33.3000, -8.5000) is None
+
+    clock.now = 11
+    assert dedup.claim_location('a5', 'alice', 33.2500, -8.5000) is None
+
+
+def test_release_after_failed_creation(clock):
+    dedup = AlertDeduplicator(key_ttl=60, window=10, cell_km=0.2, clock=clock)
+    dedup.claim_key('a1', 'alice', 'k1')
+    dedup.claim_location('a1', 'alice', 33.25, -8.5)
+    dedup.release('a1')
+    assert dedup.claim_key('a2', 'alice', 'k1') is None
+    assert dedup.claim_location('a2', 'alice', 33.25, -8.5) is None
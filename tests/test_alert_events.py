@@ -0,0 +1,60 @@
+from app.services.alert_events import AlertEventBus
+
+
+class FakeWatch:
+    def __init__(self):
+        self.callbacks = {}
+        self.stopped = []
+
+    def __call__(self, alert_id, callback):
+        self.callbacks[alert_id] = callback
+        return lambda: self.stopped.append(alert_id)
+
+
+def drain(sub):
+    events = []
+    while not sub.empty():
+        events.append(sub.get_nowait())
+    return events
+
+
+def test_single_source_and_changed_fields_only():
+    watch = FakeWatch()
+    bus = AlertEventBus(watch=watch, history=10)
+    sub1, backlog1 = bus.subscribe('a1')
+    sub2, _ = bus.subscribe('a1')
+    assert list(watch.callbacks) == ['a1'] and backlog1 == []
+
+    push = watch.callbacks['a1']
+    push({'status': 'DISPATCHED', 'logs': ['l1'], 'route_red': '[[1, 2]]'})
+    push({'status': 'DISPATCHED', 'logs': ['l1'], 'route_red': '[[1, 2]]'})  # aucun changement
+    push({'status': 'PATIENT_PICKUP', 'logs': ['l1', 'l2'], 'route_red': '[[1, 2]]'})
+
+    events = drain(sub1)
+    assert [name for _, name, _ in events] == ['snapshot', 'update']
+    assert events[1][2] == {'status': 'PATIENT_PICKUP', 'logs_append': ['l2']}
+    assert len(drain(sub2)) == 2
+
+    bus.unsubscribe('a1', sub1)
+    assert watch.stopped == []
+    bus.unsubscribe('a1', sub2)
+    assert watch.stopped == ['a1']
+
+
+def test_resume_from_last_event_id_or_fall_back_to_snapshot():
+    watch = FakeWatch()
+    bus = AlertEventBus(watch=watch, history=2)
+    keeper, _ = bus.subscribe('a1')
+    push = watch.callbacks['a1']
+    for i in range(5):
+        push({'status': f'S{i}'})
+    ids = [event_id for event_id, _, _ in drain(keeper)]
+
+    _, backlog = bus.subscribe('a1', last_event_id=ids[3])
+    assert [e[2] for e in backlog] == [{'status': 'S4'}]
+    _, backlog = bus.subscribe('a1', last_event_id=ids[4])
+    assert backlog == []
+    # Trop ancien (hors historique) ou autre processus : instantané complet
+    for stale in (ids[0], 'deadbeef:3'):
+        _, backlog = bus.subscribe('a1', last_event_id=stale)
+        assert backlog[0][1] == 'snapshot' and backlog[0][2]['status'] == 'S4'
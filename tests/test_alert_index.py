@@ -0,0 +1,57 @@
+from firebase_admin import firestore
+from app.services.alert_index import AlertIndex
+
+
+def new_alert(user, level=2, status='processing'):
+    return {'patient': {'nom_prenom': f'Patient {user}', 'age': 40, 'symptomes': 'douleur'},
+            'emergency_level': level, 'status': status, 'username': user, 'created_at': '2026-01-01T00:00:00'}
+
+
+def test_transitions_move_alerts_between_active_and_recent():
+    index = AlertIndex()
+    index.apply('a1', new_alert('alice', level=1))
+    index.apply('a2', new_alert('bob'))
+    index.apply('a1', {'status': 'DISPATCHED', 'eta_minutes': 7, 'version': firestore.Increment(1)})
+
+    active = index.active(user='alice')
+    assert [a['id'] for a in active] == ['a1']
+    assert active[0]['status'] == 'DISPATCHED' and active[0]['eta'] == 7
+    assert active[0]['patient_name'] == 'Patient alice'
+
+    index.apply('a1', {'status': 'RESOLVED'})
+    assert index.active(user='alice') == []
+    assert [a['id'] for a in index.recent()] == ['a2', 'a1']
+    assert index.recent(user='alice')[0]['status'] == 'RESOLVED'
+
+
+def test_filters_by_status_and_severity():
+    index = AlertIndex()
+    index.apply('a1', new_alert('alice', level=1))
+    index.apply('a2', new_alert('alice', level=3, status='DISPATCHED'))
+    assert [a['id'] for a in index.active(severity=[1])] == ['a1']
+    assert [a['id'] for a in index.recent(status=['DISPATCHED'])] == ['a2']
+
+
+def test_unknown_partial_updates_ignored_and_recent_bounded():
+    index = AlertIndex(recent=2)
+    assert index.apply('ghost', {'status': 'MOVING'}) is None
+
+    index.apply('a1', new_alert('alice'))
+    index.apply('a2', new_alert('alice', status='RESOLVED'))
+    index.apply('a3', new_alert('alice', status='RESOLVED'))
+    assert [a['id'] for a in index.recent(limit=None)] == ['a3', 'a2']
+    # Sortie des récentes mais toujours en cours
+    assert [a['id'] for a in index.active()] == ['a1']
+
+
+def test_warm_up_runs_one_bounded_query():
+    calls = []
+
+    def loader(limit):
+        calls.append(limit)
+        return [('a1', new_alert('alice'))]
+
+    index = AlertIndex(loader=loader, recent=50)
+    assert index.active()[0]['id'] == 'a1'
+    index.recent()
+    assert calls == [50]
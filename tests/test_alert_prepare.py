@@ -0,0 +1,81 @@
+import pytest
+
+from app.services.alert_prepare import AlertPreparer
+from app.services.dispatch_engine import DispatchEngine
+
+
+class FakeGeolocation:
+    def __init__(self):
+        self.calls = 0
+
+    def merge_all_location_sources(self, gps=None, manual=None, ip=None, deadline=None):
+        self.calls += 1
+        if gps:
+            return dict(gps, source='gps')
+        return {'lat': 33.2564, 'lng': -8.5106, 'address': manual['address'], 'source': 'photon_api'}
+
+
+HOSPITALS = [{'id': 'chu', 'name': 'CHU El Jadida', 'lat': 33.23, 'lng': -8.50}]
+
+FLEET = [{'id': 'SMUR-1', 'current_lat': 33.26, 'current_lng': -8.49}]
+
+
+@pytest.fixture
+def preparer(hospitals, ambulances, ors):
+    engine = DispatchEngine(hospitals, ambulances, ors, scoring='nearest')
+    return AlertPreparer(FakeGeolocation(), engine, ttl=60, max_tokens=100, max_drift_km=0.3)
+
+
+def test_prepared_dispatch_consumed_once_when_location_matches(preparer, ors):
+    token, entry = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50})
+    assert entry['assignment']['hospital']['name'] == 'CHU El Jadida'
+    # Les deux trajets du dispatch sont préchauffés
+    assert sorted(ors.calls) == [((-8.50, 33.25), (-8.50, 33.23)), ((-8.49, 33.26), (-8.50, 33.25))]
+    assert entry['candidates'] == {'hospital': 'CHU El Jadida', 'ambulance': 'SMUR-1'}
+
+    # ~100 m plus loin : toujours valable ; usage unique
+    assert preparer.consume(token, 'alice', 33.2509, -8.50) is entry
+    assert preparer.consume(token, 'alice', 33.25, -8.50) is None
+    assert preparer.stats()['used'] == 1
+
+
+def test_token_rejected_for_other_user_or_moved_patient(preparer):
+    token, _ = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50})
+    assert preparer.consume(token, 'bob', 33.25, -8.50) is None
+
+    token, _ = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50})
+    assert preparer.consume(token, 'alice', 33.30, -8.50) is None
+    assert preparer.stats()['mismatched'] == 1
+
+
+def test_address_prepared_on_form_open_matches_same_address(preparer):
+    token, entry = preparer.prepare('alice', address='El Jadida')
+    assert entry['location']['source'] == 'photon_api'
+    assert preparer.consume(token, 'alice', address='  el jadida ') is entry
+
+    first, _ = preparer.prepare('alice', address='El Jadida')
+    second, _ = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50}, previous_token=first)
+    assert preparer.consume(first, 'alice', address='El Jadida') is None
+    assert preparer.consume(second, 'alice', 33.25, -8.50)
+
+
+def test_submit_reuses_prepared_assignment_without_new_ors_calls(preparer, ors):
+    token, _ = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50})
+    entry = preparer.consume(token, 'alice', 33.25, -8.50)
+    calls = len(ors.calls)
+
+    assignment = preparer.assign(entry, 33.25, -8.50, 2, age=40, symptoms='douleur thoracique')
+    assert assignment is entry['assignment']
+    assert len(ors.calls) == calls
+    assert preparer.stats()['reused'] == 1
+
+
+def test_submit_replans_when_prepared_ambulance_is_gone(preparer, ambulances):
+    token, _ = preparer.prepare('alice', gps={'lat': 33.25, 'lng': -8.50})
+    entry = preparer.consume(token, 'alice', 33.25, -8.50)
+    # Entre l'ouverture du formulaire et l'envoi, SMUR-1 est partie sur une autre alerte
+    ambulances.fleet = [{'id': 'SMUR-2', 'current_lat': 33.27, 'current_lng': -8.48}]
+
+    assignment = preparer.assign(entry, 33.25, -8.50, 2)
+    assert assignment['ambulance']['id'] == 'SMUR-2'
+    assert preparer.stats()['replanned'] == 1
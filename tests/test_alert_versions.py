@@ -0,0 +1,41 @@
+from firebase_admin import firestore
+from app.services.alert_versions import VersionedViews, versioned, alert_version, strong_etag
+
+
+def test_versioned_update_and_current_version():
+    update = versioned({'status': 'DISPATCHED'})
+    assert update['status'] == 'DISPATCHED'
+    assert isinstance(update['version'], firestore.Increment)
+    assert alert_version({'version': 7}) == 7
+    assert alert_version({}) == 0
+
+
+def test_strong_etag_follows_content_and_version():
+    view = {'status': 'DISPATCHED', 'logs': ['l1']}
+    assert strong_etag(3, view) == strong_etag(3, dict(view))
+    assert strong_etag(3, view) != strong_etag(4, view)
+    assert strong_etag(3, view) != strong_etag(3, dict(view, status='RESOLVED'))
+
+
+def test_delta_since_known_version():
+    views = VersionedViews(max_alerts=10, depth=2)
+    views.remember('a1', 1, {'status': 'DISPATCHED', 'logs': ['l1'], 'eta_minutes': 8})
+    current = {'status': 'PATIENT_PICKUP', 'logs': ['l1', 'l2'], 'eta_minutes': 8}
+
+    assert views.delta('a1', 1, current) == {'status': 'PATIENT_PICKUP', 'logs_append': ['l2']}
+    # Champs recalculés à chaque requête : toujours renvoyés
+    assert views.delta('a1', 1, current, always=('eta_minutes',))['eta_minutes'] == 8
+    # Version inconnue : le client reçoit la représentation complète
+    assert views.delta('a1', 5, current) is None
+
+
+def test_history_is_bounded():
+    views = VersionedViews(max_alerts=2, depth=2)
+    for version in (1, 2, 3):
+        views.remember('a1', version, {'version': version})
+    assert views.get('a1', 1) is None and views.get('a1', 3) == {'version': 3}
+
+    views.remember('a2', 1, {})
+    views.remember('a3', 1, {})
+    assert views.get('a1', 3) is None
+    assert views.stats()['alerts'] == 2
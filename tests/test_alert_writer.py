@@ -0,0 +1,69 @@
+from app.services.alert_writer import CoalescingAlertWriter
+from app.services.sim_clock import VirtualClock
+
+
+class FakeDoc:
+    def __init__(self, writes, alert_id):
+        self.writes, self.alert_id = writes, alert_id
+
+    def update(self, data):
+        self.writes.append((self.alert_id, data))
+
+
+class FakeCollection:
+    def __init__(self):
+        self.writes = []
+
+    def document(self, alert_id):
+        return FakeDoc(self.writes, alert_id)
+
+
+def test_positions_are_coalesced_and_transitions_flush_in_order():
+    clock = VirtualClock()
+    alerts = FakeCollection()
+    writer = CoalescingAlertWriter(alerts, clock=clock, flush_interval_ms=5000)
+
+    async def mission():
+        writer.update('a1', 'DISPATCHED', ["Ambulance en route"], {'eta_minutes': 8})
+        for i in range(20):
+            writer.update('a1', 'MOVING', [], {'ambulance': {'current_lat': i}})
+            await clock.sleep(0.6)
+        writer.update('a1', 'PATIENT_PICKUP', ["Arrivée sur site"])
+        writer.update('a1', 'MOVING', [], {'ambulance': {'current_lat': 99}})
+        return await writer.close('a1')
+
+    counts = clock.run(mission())
+
+    statuses = [data['status'] for _, data in alerts.writes]
+    assert statuses[0] == 'DISPATCHED'
+    assert 'PATIENT_PICKUP' in statuses
+    assert statuses[-1] == 'MOVING'
+    # 22 mises à jour -> 1 transition + 12 s de positions (5 s) + 1 transition + reliquat
+    assert counts == {'updates': 23, 'writes': len(alerts.writes)}
+    assert len(alerts.writes) <= 5
+    assert alerts.writes[-1][1]['ambulance'] == {'current_lat': 99}
+    assert writer.stats()['missions'] == 1
+
+
+def test_logs_are_merged_into_one_array_union():
+    clock = VirtualClock()
+    alerts = FakeCollection()
+    writer = CoalescingAlertWriter(alerts, clock=clock, flush_interval_ms=1000)
+
+    async def mission():
+        writer.update('a1', None, ["log 1"])
+        writer.update('a1', None, ["log 2"], {'eta_minutes': 3})
+        await writer.close('a1')
+
+    clock.run(mission())
+    assert len(alerts.writes) == 1
+    data = alerts.writes[0][1]
+    assert data['eta_minutes'] == 3
+    assert list(data['logs'].values) == ["log 1", "log 2"]
+
+
+def test_writes_directly_outside_event_loop():
+    alerts = FakeCollection()
+    writer = CoalescingAlertWriter(alerts, flush_interval_ms=1000)
+    writer.update('a1', 'ERROR', ["Erreur"])
+    assert alerts.writes[0][1]['status'] == 'ERROR'
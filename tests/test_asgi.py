@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+
+from flask import Flask, Response, request
+
+from app.asgi import AsgiApp, create_asgi_app
+
+
+def make_flask():
+    app = Flask(__name__)
+
+    @app.route('/api/alert', methods=['POST'])
+    def alert():
+        return {'received': request.get_json()['patient'], 'header': request.headers.get('X-Test')}
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'data: {i}\n\n' for i in range(3)), mimetype='text/event-stream')
+
+    return app
+
+
+def call(app, method, path, body=b'', headers=()):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(k.encode(), v.encode()) for k, v in headers]}
+    asyncio.run(app(scope, receive, send))
+    status = sent[0]['status']
+    payload = b''.join(m.get('body', b'') for m in sent[1:])
+    return status, payload
+
+
+def test_bridge_routes_flask_requests_and_streams():
+    asgi = AsgiApp(make_flask(), io_threads=4, wsgi_threads=2, io_routes=['/api/alert'], stream_threads=2)
+    status, payload = call(asgi, 'POST', '/api/alert', json.dumps({'patient': 'Ali'}).encode(),
+                           headers=[('content-type', 'application/json'), ('x-test', 'ok')])
+    assert status == 200
+    assert json.loads(payload) == {'received': 'Ali', 'header': 'ok'}
+
+    status, payload = call(asgi, 'GET', '/stream')
+    assert status == 200 and payload == b'data: 0\n\ndata: 1\n\ndata: 2\n\n'
+    assert asgi.stats()['in_flight'] == 0 and asgi.stats()['peak_in_flight'] == 1
+
+
+class FakeGeolocation:
+    def __init__(self):
+        self.clients = []
+
+    async def geocode_address_async(self, address, client=None):
+        self.clients.append(client)
+        return {'lat': 33.25, 'lng': -8.5, 'display_name': address}
+
+
+def test_native_geocode_route_bypasses_flask():
+    geo = FakeGeolocation()
+    asgi = create_asgi_app(make_flask(), geolocation_service=geo)
+    status, payload = call(asgi, 'POST', '/api/geocode', json.dumps({'address': 'El Jadida'}).encode())
+    assert status == 200
+    assert json.loads(payload) == {'success': True, 'lat': 33.25, 'lng': -8.5, 'display_name': 'El Jadida'}
+    assert geo.clients[0] is asgi.http_client()
+
+    status, payload = call(asgi, 'POST', '/api/geocode', b'{}')
+    assert status == 400
+
+
+def test_lifespan_startup_and_shutdown():
+    asgi = AsgiApp(make_flask(), io_threads=1, wsgi_threads=1)
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(asgi({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+
+
+def test_open_streams_do_not_starve_alert_creation():
+    app, release = make_flask(), threading.Event()
+
+    @app.route('/api/alert/<alert_id>/stream')
+    def alert_stream(alert_id):
+        def generate():
+            yield 'retry: 3000\n\n'
+            release.wait(5)  # tracker ouvert : le thread reste bloqué en attente d'événements
+        return Response(generate(), mimetype='text/event-stream')
+
+    asgi = AsgiApp(app, io_threads=2, wsgi_threads=1, stream_threads=8,
+                   io_routes=['/api/alert'], stream_routes=['/api/alert/[^/]+/stream'])
+    assert asgi.bridge_for('/api/alert/a1/stream') is asgi.stream_bridge
+    assert asgi.bridge_for('/api/alert') is asgi.io_bridge
+    assert asgi.bridge_for('/api/alert/a1') is asgi.wsgi_bridge
+
+    async def scenario():
+        def request(method, path, body=b''):
+            sent, disconnect = [], asyncio.Event()
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+                     'headers': [(b'content-type', b'application/json')]}
+            return asyncio.ensure_future(asgi(scope, receive, send)), sent
+
+        streams = [request('GET', f'/api/alert/a{i}/stream') for i in range(4)]
+        await asyncio.sleep(0.2)
+        task, sent = request('POST', '/api/alert', json.dumps({'patient': 'Ali'}).encode())
+        await asyncio.wait_for(task, 2)
+        release.set()
+        await asyncio.gather(*(t for t, _ in streams))
+        return sent[0]['status']
+
+    assert asyncio.run(scenario()) == 200
@@ -0,0 +1,68 @@
+import pytest
+
+from app.services.batch_intake import BatchPlanner
+from app.services.dispatch_engine import DispatchEngine
+from app.services.dispatch_regions import RegionalCatalog
+
+
+HOSPITALS = [
+    {'id': 'kids', 'name': "Hôpital d'Enfants El Jadida", 'lat': 33.24, 'lng': -8.48},
+    {'id': 'near', 'name': 'Hôpital Proche', 'lat': 33.241, 'lng': -8.481, 'available_beds': 2},
+    {'id': 'far', 'name': 'CHU Lointain', 'lat': 33.57, 'lng': -7.59, 'available_beds': 100},
+]
+
+FLEET = [
+    {'id': 'SMUR-1', 'name': 'SMUR 1', 'current_lat': 33.25, 'current_lng': -8.49},
+    {'id': 'AMB-2', 'name': 'Ambulance 2', 'current_lat': 33.25, 'current_lng': -8.49},
+    {'id': 'AMB-3', 'name': 'Ambulance 3', 'current_lat': 33.30, 'current_lng': -8.40},
+]
+
+
+@pytest.fixture
+def engine(hospitals, ambulances, ors):
+    catalog = RegionalCatalog(hospitals, ambulances, ttl=60, fleet_ttl=60)
+    return DispatchEngine(hospitals, ambulances, ors, scoring='nearest', catalog=catalog)
+
+
+ADULTS = [{'emergency_level': 1, 'age': 40}, {'emergency_level': 3, 'age': 35}, {'emergency_level': 2, 'age': 60}]
+
+
+def test_one_read_per_source_and_distinct_routes_only(engine, hospitals, ambulances, ors):
+    plan = BatchPlanner(engine, max_per_hospital=4).plan(33.24, -8.48, ADULTS)
+
+    assert hospitals.reads == 1 and ambulances.reads == 1
+    # 2 positions d'ambulance distinctes + 2 hôpitaux : 4 itinéraires pour 3 patients
+    assert len(ors.calls) == 4
+    # Le plus grave reçoit le SMUR et l'hôpital le plus proche ; 2 lits seulement
+    assert plan[1]['ambulance']['id'] == 'SMUR-1'
+    assert [p['hospital']['id'] for p in plan] == ['far', 'near', 'near']
+    assert len({p['ambulance']['id'] for p in plan}) == 3
+    assert set(plan[0]['routes']) == {'red', 'blue'}
+
+
+def test_adults_are_not_sent_to_the_pediatric_hospital(engine):
+    plan = BatchPlanner(engine, max_per_hospital=10).plan(33.24, -8.48, [{'emergency_level': 2, 'age': 45}, {'emergency_level': 2, 'age': 6}])
+    assert plan[0]['hospital']['id'] != 'kids'
+    assert plan[1]['hospital']['id'] == 'kids'
+
+
+def test_batch_reserves_units_and_skips_those_held_by_other_alerts(engine):
+    planner = BatchPlanner(engine, max_per_hospital=10)
+    # Alerte seule simultanée : elle garde son unité
+    single = engine.plan(33.24, -8.48, 1)
+
+    plan = planner.plan(33.24, -8.48, [{'emergency_level': 2, 'age': 30}] * 3)
+    ids = [p.get('ambulance', {}).get('id') for p in plan]
+    assert single['ambulance']['id'] not in ids and ids.count(None) == 1
+    assert engine.catalog.stats()['reserved'] == 3
+
+    # Alertes rejetées (file pleine) : réservations rendues
+    planner.release(plan)
+    assert engine.catalog.stats()['reserved'] == 1
+
+
+def test_estimated_routes_are_recomputed_by_the_workflow(engine, ors):
+    ors.down = True
+    plan = BatchPlanner(engine).plan(33.24, -8.48, ADULTS[:1])
+    assert plan[0]['routes']['red']['fallback']
+    assert 'routes' not in engine.for_workflow(plan[0])
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from app.crew.context_projector import ContextProjector, estimate_tokens, project
+
+
+ROUTE = {'distance_km': 7.4, 'duration_min': 12, 'geometry': 'x' * 500,
+         'coordinates': [[33.2 + i / 1000, -8.5] for i in range(200)], 'cum_km': list(range(200))}
+
+
+def test_projection_keeps_declared_fields_and_drops_geometry():
+    coordinator = {'decision_operationnelle': {'statut': 'ASSIGNED'},
+                   'selected_hospital': {'name': 'CHU', 'distance_km': 7.4, 'eta_minutes': 12, 'route_geometry': 'y' * 900}}
+    projector = ContextProjector(default_budget=600, enabled=True, compare=True)
+    usage = projector.begin()
+    text = projector.render('valider_la_demande_du_coordonnateur', {'route': ROUTE, 'coordinator': coordinator})
+    assert text.splitlines()[0] == 'route: {"distance_km":7.4,"duration_min":12}'
+    assert '"name":"CHU"' in text and 'geometry' not in text and 'cum_km' not in text
+
+    report = projector.report(usage)
+    assert report['tasks']['valider_la_demande_du_coordonnateur']['tokens'] < 60
+    assert report['reduction'] > 0.9
+
+
+def test_unexpected_llm_output_is_kept_without_geometry():
+    assert project({'raw_response': 'texte', 'coordinates': [[1, 2]]}, ['triage_medical']) == {'raw_response': 'texte'}
+
+
+def test_budget_truncates_lowest_priority_sources():
+    projector = ContextProjector(budgets={'traitement_du_specialiste': 50}, enabled=True)
+    usage = projector.begin()
+    medical = {'triage_medical': {'niveau_gravite': 'CRITIQUE'}}
+    text = projector.render('traitement_du_specialiste', {'medical': medical, 'notes': {'texte': 'z' * 2000}})
+    assert text.startswith('medical: ')
+    assert estimate_tokens(text) <= 55
+    assert projector.report(usage)['tasks']['traitement_du_specialiste']['truncated']
+
+
+def test_projection_can_be_disabled_for_comparison():
+    projector = ContextProjector(enabled=False)
+    usage = projector.begin()
+    text = projector.render('traitement_du_specialiste', {'route': ROUTE})
+    assert '"geometry"' in text
+    assert projector.report(usage)['reduction'] == 0.0
+
+
+def test_legacy_context_is_not_built_unless_compared(monkeypatch):
+    projector = ContextProjector(enabled=True, compare=False)
+    monkeypatch.setattr(ContextProjector, '_legacy', staticmethod(lambda sources: pytest.fail('contexte historique construit')))
+    usage = projector.begin()
+    projector.render('traitement_du_specialiste', {'route': ROUTE})
+    report = projector.report(usage)
+    assert report['tokens'] > 0 and report['legacy_tokens'] is None and report['reduction'] is None
+
+
+def test_concurrent_runs_keep_their_own_usage():
+    projector = ContextProjector(enabled=True)
+
+    async def run(task, sources):
+        usage = projector.begin()
+        await asyncio.sleep(0)
+        # Les agents tournent dans des tâches filles : même relevé que le passage qui les lance
+        await asyncio.gather(asyncio.ensure_future(_render(projector, task, sources)))
+        await asyncio.sleep(0)
+        return usage
+
+    async def scenario():
+        return await asyncio.gather(run('traitement_du_specialiste', {'medical': {'triage_medical': {}}}),
+                                    run('valider_la_demande_du_coordonnateur', {'route': ROUTE}))
+
+    first, second = asyncio.run(scenario())
+    assert list(first) == ['traitement_du_specialiste']
+    assert list(second) == ['valider_la_demande_du_coordonnateur']
+
+
+async def _render(projector, task, sources):
+    projector.render(task, sources)
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import deque
+
+from app.services.coverage_service import FleetCoverageEngine
+
+
+def make_engine():
+    # Deux foyers de demande : El Jadida (3 alertes) et Casablanca (1 alerte)
+    demand = [(33.2564, -8.5106, 1.0)] * 3 + [(33.5731, -7.5898, 1.0)]
+    units = [
+        {'id': 'AMB-1', 'current_lat': 33.2564, 'current_lng': -8.5106, 'status': 'available'},
+        {'id': 'AMB-2', 'current_lat': 33.2570, 'current_lng': -8.5100, 'status': 'available'},
+    ]
+    sites = [{'id': 'casa', 'name': 'CHU Ibn Rochd', 'lat': 33.5731, 'lng': -7.5898}]
+    return FleetCoverageEngine(demand, units, sites, minutes=10, cell_km=1.0)
+
+
+def test_initial_coverage_counts_only_reachable_demand():
+    engine = make_engine()
+    assert engine.coverage() == 0.75
+
+
+def test_claim_and_release_are_incremental():
+    engine = make_engine()
+    assert engine.claim('AMB-1')
+    # AMB-2 couvre toujours El Jadida
+    assert engine.coverage() == 0.75
+    assert engine.claim('AMB-2')
+    assert engine.coverage() == 0.0
+    assert not engine.claim('AMB-2')
+
+    # Libération à Casablanca : seule la demande de Casablanca est couverte
+    assert engine.release('AMB-2', 33.5731, -7.5898)
+    assert engine.coverage() == 0.25
+    assert engine.cover_count.sum() > 0
+
+
+def test_recommendation_moves_redundant_unit_to_uncovered_site():
+    engine = make_engine()
+    moves = engine.recommend_relocations(max_moves=2)
+    assert len(moves) == 1
+    assert moves[0]['to']['site_id'] == 'casa'
+    assert moves[0]['coverage_after'] == 1.0
+    # La recommandation ne modifie pas l'état réel
+    assert engine.coverage() == 0.75
+
+
+def test_updates_never_block_while_the_engine_is_built(monkeypatch):
+    from app.services import coverage_service
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(2)  # lecture Firestore de l'historique
+        return make_engine()
+
+    monkeypatch.setattr(coverage_service, '_load_engine', slow_load)
+    monkeypatch.setattr(coverage_service, '_engine', None)
+    monkeypatch.setattr(coverage_service, '_warming', False)
+    monkeypatch.setattr(coverage_service, '_pending', deque())
+
+    begin = time.monotonic()
+    coverage_service.update_unit({'id': 'AMB-1'}, busy=True)
+    coverage_service.update_unit({'id': 'AMB-2'}, busy=True)
+    assert time.monotonic() - begin < 0.5
+    assert started.wait(2)
+
+    release.set()
+    for _ in range(100):
+        if coverage_service._engine is not None:
+            break
+        time.sleep(0.02)
+    # Départs survenus pendant la construction rejoués : plus aucune unité libre à El Jadida
+    assert coverage_service._engine.coverage() == 0.0
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+import time
+
+from app.crew.context_projector import ContextProjector
+from app.crew.crew_simple import MediAlertCrew
+from app.services import llm_cache
+from app.services.llm_cache import LLMResponseCache
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowLLM:
+    """LLM factice : 50 ms par appel, trace les appels simultanés"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return _Response(json.dumps({'ok': True}))
+
+
+class FakeHospitals:
+    def find_nearest_hospital(self, lat, lng):
+        return {'id': 'CHU', 'name': 'CHU', 'service': 'Urgences', 'distance_km': 4.0, 'eta_minutes': 9,
+                'coordinates': {'lat': 33.58, 'lng': -7.60}, 'route_geometry': ''}
+
+
+def make_crew():
+    crew = MediAlertCrew.__new__(MediAlertCrew)
+    crew.llm = SlowLLM()
+    crew.hospital_service = FakeHospitals()
+    crew.ors_service = None
+    crew.projector = ContextProjector()
+    crew._loop = None
+    crew._loop_lock = threading.Lock()
+    crew._load_configurations()
+    return crew
+
+
+def test_independent_agents_run_concurrently_and_latency_is_reported(monkeypatch):
+    # Cache LLM du processus (et son niveau disque LLM_CACHE_PATH) hors jeu : chaque appel compte
+    monkeypatch.setattr(llm_cache, '_cache', LLMResponseCache(path='', enabled=False))
+    crew = make_crew()
+    inputs = {'nom_prenom': 'Test', 'age': 40, 'sexe': 'M', 'symptomes': 'douleur thoracique',
+              'localisation': 'Casablanca'}
+    started = time.perf_counter()
+    results = crew.execute_emergency_response(inputs)
+    wall = time.perf_counter() - started
+
+    assert crew.llm.calls == 7
+    assert set(results) >= {'alert', 'medical', 'coordinator', 'ambulance', 'hospital', 'specialist', 'ui'}
+    # Spécialiste en parallèle de la chaîne coordination -> ambulance -> hôpital
+    assert crew.llm.max_active == 2
+    latency = results['latency']
+    assert 'specialist' not in latency['critical_path']
+    assert latency['wall_s'] < latency['sum_s']
+    assert wall < 7 * 0.05
@@ -0,0 +1,77 @@
+from unittest.mock import Mock, patch
+
+from app.services.deadline import Deadline, LRUCache
+from app.services.geolocation import GeolocationService
+from app.services.ors_service import ORSService
+
+
+def test_deadline_caps_and_exhausts_budget(clock):
+    deadline = Deadline(2.0, clock=clock)
+    assert deadline.timeout(10) == 2.0
+    assert deadline.timeout(0.5) == 0.5
+    clock.now = 1.9
+    assert deadline.timeout(10) is None and not deadline.expired()
+    clock.now = 2.5
+    assert deadline.expired() and deadline.remaining() == 0
+
+
+def test_lru_cache_evicts_and_expires(clock):
+    cache = LRUCache(2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    clock.now = 11
+    assert cache.get('a') is None
+
+
+def test_ors_skips_network_without_budget_and_estimates_distance():
+    ors = ORSService()
+    ors.api_key = 'test-key'
+    expired = Deadline(0)
+    with patch('app.services.ors_service.requests.post') as post:
+        route = ors.get_route([-8.50, 33.25], [-8.49, 33.26], deadline=expired)
+    post.assert_not_called()
+    assert route['fallback'] and route['distance_km'] > 1 and route['duration_min'] >= 1
+
+
+def test_ors_passes_remaining_budget_and_caches_routes():
+    ors = ORSService()
+    ors.api_key = 'test-key'
+    response = Mock(status_code=200)
+    response.json.return_value = {'features': [{
+        'geometry': {'coordinates': [[-7.60, 33.50], [-7.61, 33.51]]},
+        'properties': {'summary': {'distance': 2500, 'duration': 300}}}]}
+    with patch('app.services.ors_service.requests.post', return_value=response) as post:
+        first = ors.get_route([-7.60, 33.50], [-7.61, 33.51], deadline=Deadline(1.5))
+        second = ors.get_route([-7.60, 33.50], [-7.61, 33.51])
+    assert post.call_count == 1
+    assert 0 < post.call_args.kwargs['timeout'] <= 1.5
+    assert first['distance_km'] == second['distance_km'] == 2.5
+
+
+def test_geocoding_without_budget_uses_city_then_gps():
+    geo = GeolocationService()
+    with patch('app.services.geolocation.requests.get') as get:
+        city = geo.geocode_address('Rue inconnue, El Jadida', deadline=Deadline(0))
+        location = geo.merge_all_location_sources(
+            gps={'lat': 33.1, 'lng': -8.6, 'source': 'gps'},
+            manual={'address': 'Adresse introuvable', 'lat': None, 'lng': None},
+            deadline=Deadline(0))
+    get.assert_not_called()
+    assert city['source'] == 'fallback'
+    assert location['source'] == 'gps'
+
+
+def test_budget_below_network_floor_falls_back_to_gps(clock):
+    geo = GeolocationService()
+    deadline = Deadline(0.1, clock=clock)  # pas encore expiré, mais sous le plancher réseau (0.2 s)
+    with patch('app.services.geolocation.requests.get') as get:
+        location = geo.merge_all_location_sources(
+            gps={'lat': 33.1, 'lng': -8.6, 'source': 'gps'},
+            manual={'address': 'Adresse introuvable', 'lat': None, 'lng': None},
+            deadline=deadline)
+    get.assert_not_called()
+    assert not deadline.expired()
+    assert location['source'] == 'gps'
@@ -0,0 +1,48 @@
+from app.services.dispatch_engine import DispatchEngine
+
+
+HOSPITALS = [
+    {'id': 'near', 'name': 'Hôpital Proche', 'lat': 33.24, 'lng': -8.48, 'available_beds': 0},
+    {'id': 'mid', 'name': 'CHU Moyen', 'lat': 33.29, 'lng': -8.45, 'available_beds': 30},
+]
+
+FLEET = [
+    {'id': 'AMB-FAR', 'name': 'Ambulance 1', 'current_lat': 33.40, 'current_lng': -8.30},
+    {'id': 'AMB-NEAR', 'name': 'Ambulance 2', 'current_lat': 33.25, 'current_lng': -8.49},
+]
+
+
+def test_single_route_per_leg_and_workflow_assignment(hospitals, ambulances, ors):
+    engine = DispatchEngine(hospitals, ambulances, ors, scoring='nearest')
+    assignment = engine.plan(33.24, -8.48, 2, age=40, symptoms='chute')
+
+    assert len(ors.calls) == 2
+    assert assignment['hospital']['id'] == 'near'
+    assert assignment['ambulance']['id'] == 'AMB-NEAR'
+    # Remis tel quel au workflow : phases hospital / ambulance / routes déjà faites
+    assert engine.for_workflow(assignment) is assignment
+
+    summary = engine.summary(assignment, 33.24, -8.48, 2)
+    assert summary['hospital']['name'] == 'Hôpital Proche'
+    assert summary['mission']['total_distance_km'] == 6.0
+    assert summary['mission']['estimated'] is False
+    assert summary['route_coordinates'][0] == [33.25, -8.49]
+
+
+def test_scoring_is_pluggable(hospitals, ambulances, ors):
+    capacity = DispatchEngine(hospitals, ambulances, ors, scoring='capacity')
+    assert capacity.plan(33.24, -8.48)['hospital']['id'] == 'mid'
+
+    farthest = DispatchEngine(hospitals, ambulances, ors,
+                              scoring=lambda entry, level: -entry['distance'])
+    assert farthest.plan(33.24, -8.48)['hospital']['id'] == 'mid'
+
+
+def test_estimated_routes_left_to_the_workflow(hospitals, ambulances, ors):
+    ors.fallback = True
+    engine = DispatchEngine(hospitals, ambulances, ors)
+    assignment = engine.plan(33.24, -8.48)
+    handed = engine.for_workflow(assignment)
+    assert 'routes' not in handed
+    assert handed['hospital'] == assignment['hospital'] and handed['ambulance'] == assignment['ambulance']
+    assert engine.summary(assignment, 33.24, -8.48, 2)['mission']['estimated'] is True
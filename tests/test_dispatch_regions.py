@@ -0,0 +1,79 @@
+from app.services.dispatch_engine import DispatchEngine
+from app.services.dispatch_regions import HashRing, REGIONS, RegionalCatalog, neighbours, owned_regions, region_of
+
+
+def test_region_of_known_cities():
+    assert region_of(33.2316, -8.5007) == 'Casablanca-Settat'  # El Jadida
+    assert region_of(34.0331, -5.0003) == 'Fès-Meknès'
+    assert region_of(32.30, -9.24) == 'Marrakech-Safi'  # Safi
+    assert 'Casablanca-Settat' in neighbours('Rabat-Salé-Kénitra')
+
+
+def test_consistent_hashing_moves_only_the_new_node_regions():
+    before = HashRing(['node-a', 'node-b', 'node-c'])
+    after = HashRing(['node-a', 'node-b', 'node-c', 'node-d'])
+    moved = [r for r in REGIONS if before.node_for(r) != after.node_for(r)]
+    assert all(after.node_for(r) == 'node-d' for r in moved)
+
+    shards = [owned_regions(['node-a', 'node-b'], node) for node in ('node-a', 'node-b')]
+    assert sorted(shards[0] + shards[1]) == sorted(REGIONS)
+    assert owned_regions([], 'node-a') is None
+
+
+HOSPITALS = [
+    {'id': 'jadida', 'name': 'Hôpital El Jadida', 'lat': 33.235, 'lng': -8.479},
+    {'id': 'casa', 'name': 'CHU Casablanca', 'lat': 33.58, 'lng': -7.61},
+    {'id': 'fes', 'name': 'CHU Fès', 'lat': 34.03, 'lng': -5.00},
+]
+
+FLEET = [
+    {'id': 'AMB-CASA', 'name': 'Ambulance Casa', 'current_lat': 33.57, 'current_lng': -7.59},
+    {'id': 'AMB-RABAT', 'name': 'Ambulance Rabat', 'current_lat': 34.02, 'current_lng': -6.84},
+]
+
+
+def test_regional_catalog_with_cross_border_fallback(hospitals, ambulances, ors):
+    catalog = RegionalCatalog(hospitals, ambulances, ttl=60, fleet_ttl=60)
+    engine = DispatchEngine(hospitals, ambulances, ors, scoring='nearest', catalog=catalog)
+
+    # El Jadida : hôpital et ambulance de la région
+    plan = engine.plan(33.24, -8.48)
+    assert plan['hospital']['id'] == 'jadida' and plan['ambulance']['id'] == 'AMB-CASA'
+    assert catalog.cross_border == 0
+
+    # Fès : hôpital local, mais aucune ambulance dans la région -> région voisine (Rabat)
+    plan = engine.plan(34.03, -5.00)
+    assert plan['hospital']['id'] == 'fes' and plan['ambulance']['id'] == 'AMB-RABAT'
+    assert catalog.cross_border == 1
+
+    # Catalogue en mémoire : une seule lecture par source
+    assert hospitals.reads == 1 and ambulances.reads == 1
+    assert catalog.stats()['hospitals']['Casablanca-Settat'] == 2
+
+
+def test_assigned_ambulance_is_not_offered_to_the_next_alert(hospitals, ambulances, ors, clock):
+    catalog = RegionalCatalog(hospitals, ambulances, ttl=60, fleet_ttl=5, reserve_ttl=600, clock=clock)
+    engine = DispatchEngine(hospitals, ambulances, ors, scoring='nearest', catalog=catalog)
+
+    first = engine.plan(33.24, -8.48)
+    second = engine.plan(33.25, -8.49)
+    assert first['ambulance']['id'] == 'AMB-CASA'
+    # Même flotte en cache : la seconde alerte passe à l'unité libre suivante (région voisine)
+    assert second['ambulance']['id'] == 'AMB-RABAT'
+    assert catalog.stats()['reserved'] == 2
+
+    # Alerte rejetée (file pleine) : l'ambulance redevient proposable
+    engine.release(second)
+    assert engine.plan(34.02, -6.84)['ambulance']['id'] == 'AMB-RABAT'
+
+    # Une estimation (préchauffage) ne réserve rien
+    engine.release(first)
+    assert engine.pick_ambulance(33.24, -8.48, reserve=False)['id'] == 'AMB-CASA'
+    assert catalog.stats()['reserved'] == 1
+    assert engine.plan(33.24, -8.48)['ambulance']['id'] == 'AMB-CASA'
+
+    # Flotte relue sans AMB-CASA (passée 'busy' par le workflow) : réservation levée
+    ambulances.busy = {'AMB-CASA'}
+    clock.now = 10
+    catalog.ambulances(['Casablanca-Settat'])
+    assert catalog.stats()['reserved'] == 1
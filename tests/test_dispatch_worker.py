@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import pytest
+from app.services.dispatch_worker import DispatchWorker, DispatchQueueFull
+from app.services.workflow_queue import SQLiteWorkflowQueue
+
+
+class FakeOrchestrator:
+    instances = 0
+
+    def __init__(self):
+        FakeOrchestrator.instances += 1
+        self.order = []
+        self.gate = asyncio.Event()
+        self.done = threading.Event()
+
+    async def run_workflow(self, alert_id, emergency_level, checkpoint=None, resume_state=None, **kwargs):
+        if alert_id == 'blocker':
+            await self.gate.wait()
+        await checkpoint('TRIAGE', {'completed': ['TRIAGE']})
+        self.order.append(alert_id)
+        if len(self.order) == 4:
+            self.done.set()
+        return 'RESOLVED'
+
+    def update_status(self, *args, **kwargs):
+        pass
+
+
+def test_missions_run_by_emergency_level_with_one_orchestrator():
+    FakeOrchestrator.instances = 0
+    holder = {}
+
+    def factory():
+        holder['orch'] = FakeOrchestrator()
+        return holder['orch']
+
+    queue = SQLiteWorkflowQueue(':memory:')
+    worker = DispatchWorker(orchestrator_factory=factory, queue=queue, max_queue=3, max_concurrent=1).start()
+    try:
+        worker.submit('blocker', 1)
+        # Attendre que le premier job occupe l'unique slot
+        while worker.stats()['running'] == 0:
+            pass
+        worker.submit('low', 1)
+        worker.submit('critical', 3)
+        worker.submit('medium', 2)
+
+        with pytest.raises(DispatchQueueFull):
+            worker.submit('overflow', 3)
+        assert worker.stats()['rejected'] == 1
+
+        worker.loop.call_soon_threadsafe(holder['orch'].gate.set)
+        assert holder['orch'].done.wait(timeout=5)
+        assert holder['orch'].order == ['blocker', 'critical', 'medium', 'low']
+        assert FakeOrchestrator.instances == 1
+        while worker.stats()['completed'] < 4:
+            pass
+        assert queue.get('critical')['status'] == 'done'
+    finally:
+        worker.stop()
+
+
+def test_worker_shares_configured_clock_and_rejects_virtual_mode():
+    from app.services.sim_clock import AcceleratedClock, VirtualClock
+    with pytest.raises(ValueError):
+        DispatchWorker(queue=SQLiteWorkflowQueue(':memory:'), clock=VirtualClock())
+
+    clock = AcceleratedClock(10)
+    worker = DispatchWorker(queue=SQLiteWorkflowQueue(':memory:'), clock=clock)
+    assert worker.clock is clock
+
+
+def test_release_hook_runs_when_the_mission_ends():
+    released = []
+    done = threading.Event()
+
+    class Orchestrator:
+        async def run_workflow(self, alert_id, emergency_level, checkpoint=None, resume_state=None, **kwargs):
+            return 'ERROR' if alert_id == 'failed' else 'RESOLVED'
+
+    worker = DispatchWorker(orchestrator_factory=Orchestrator, queue=SQLiteWorkflowQueue(':memory:'))
+
+    def hook(assignment):
+        released.append(assignment['ambulance']['id'])
+        if len(released) == 2:
+            done.set()
+    worker.add_release_hook(hook)
+    worker.start()
+    try:
+        worker.submit('ok', 2, assignment={'ambulance': {'id': 'SMUR-1'}})
+        worker.submit('failed', 2, assignment={'ambulance': {'id': 'SMUR-2'}})
+        assert done.wait(timeout=5)
+        assert sorted(released) == ['SMUR-1', 'SMUR-2']
+    finally:
+        worker.stop()
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from app.services.emergency_orchestrator import EmergencyOrchestrator
+from app.services.sim_clock import VirtualClock
+
+
+class MemoryAlerts:
+    def __init__(self):
+        self.store = {}
+
+    def document(self, alert_id):
+        store = self.store
+
+        class Doc:
+            def update(self, data):
+                store.setdefault(alert_id, []).append(data)
+
+            def get(self):
+                return type('Snapshot', (), {'exists': False, 'to_dict': lambda self: None})()
+        return Doc()
+
+
+class Hospitals:
+    async def find_nearest_hospital_async(self, lat, lng, **kwargs):
+        return {'name': 'CHU El Jadida', 'coordinates': {'lat': lat + 0.05, 'lng': lng + 0.05}}
+
+
+class Ambulances:
+    async def get_available_by_level_async(self, level):
+        return [{'id': 'SMUR-1', 'current_lat': 33.26, 'current_lng': -8.49}]
+
+
+class ORS:
+    def get_route(self, start, end):
+        return {'coordinates': [[start[1], start[0]], [end[1], end[0]]], 'distance_km': 5.0, 'duration_min': 8}
+
+
+class Orchestrator(EmergencyOrchestrator):
+    """Couverture et agent spécialiste factices : seules les transitions comptent"""
+
+    def __init__(self):
+        super().__init__(clock=VirtualClock(), alerts_collection=MemoryAlerts(), hospital_service=Hospitals(),
+                         ambulance_service=Ambulances(), ors_service=ORS(), llm=False)
+        self.coverage = []
+
+    def update_coverage(self, ambulance, busy):
+        self.coverage.append((ambulance['id'], busy))
+
+    async def run_specialist_agent(self, symptomes, age, ccmu):
+        await self.clock.sleep(3)
+        return {'diagnostic_suspecte': 'Test', 'protocole_transport': 'Standard',
+                'checklist_accueil': [], 'medicaments_a_preparer': []}
+
+
+def run(orchestrator, **kwargs):
+    return orchestrator.clock.run(orchestrator.run_workflow('A1', 33.25, -8.50, 3, 'douleur thoracique', '40', **kwargs))
+
+
+def test_resolved_mission_frees_the_ambulance():
+    orchestrator = Orchestrator()
+    assert run(orchestrator) == 'RESOLVED'
+    assert orchestrator.coverage == [('SMUR-1', True), ('SMUR-1', False)]
+
+
+def test_lost_lease_keeps_the_ambulance_engaged():
+    orchestrator = Orchestrator()
+
+    async def checkpoint(phase, state):
+        if phase == 'to_patient':
+            # Un autre worker a repris la mission
+            raise asyncio.CancelledError('bail perdu')
+
+    with pytest.raises(asyncio.CancelledError):
+        run(orchestrator, checkpoint=checkpoint)
+    assert orchestrator.coverage == [('SMUR-1', True)]
+    # Protocole spéculatif abandonné : rien ne reste en vol ni dans le tampon de l'alerte close
+    assert orchestrator.protocols.metrics()['in_flight'] == 0
+    assert 'A1' not in orchestrator.writer._buffers
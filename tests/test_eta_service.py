@@ -0,0 +1,53 @@
+import pytest
+from app.services.eta_service import EtaTracker, route_profile
+
+# Route nord-sud puis est, ~2.2 km + ~1.9 km, 10 minutes au total
+ROUTE = {'coordinates': [[33.20, -8.50], [33.21, -8.50], [33.22, -8.50], [33.22, -8.48]],
+         'distance_km': 4.1, 'duration_min': 10}
+
+
+class FakeORS:
+    def __init__(self):
+        self.calls = []
+
+    def get_route(self, start, end):
+        self.calls.append((start, end))
+        return {'coordinates': [[start[1], start[0]], [end[1], end[0]]], 'distance_km': 1, 'duration_min': 3}
+
+
+def make_tracker():
+    ors = FakeORS()
+    tracker = EtaTracker(ors_service=ors, deviation_km=0.3)
+    tracker.load('a1', route_profile(dict(ROUTE), [33.22, -8.48], 'RED'))
+    return tracker, ors
+
+
+def test_eta_decreases_along_the_route_without_ors_calls():
+    tracker, ors = make_tracker()
+
+    start = tracker.update('a1', 33.20, -8.50)
+    middle = tracker.update('a1', 33.2151, -8.5001)
+    end = tracker.update('a1', 33.22, -8.48)
+
+    assert start['eta_minutes'] == pytest.approx(10, abs=0.1)
+    assert end['eta_minutes'] == 0 < middle['eta_minutes'] < start['eta_minutes']
+    assert end['remaining_km'] == pytest.approx(0, abs=0.01)
+    assert middle['deviation_km'] < 0.05
+    assert ors.calls == []
+
+
+def test_deviation_beyond_threshold_triggers_single_reroute():
+    tracker, ors = make_tracker()
+    tracker.update('a1', 33.20, -8.50)
+
+    result = tracker.update('a1', 33.21, -8.46)  # ~3.7 km à l'est de la route
+
+    assert result['rerouted'] is True
+    assert result['route_profile']['leg'] == 'RED'
+    assert result['eta_minutes'] == pytest.approx(3, abs=0.1)
+    assert ors.calls == [([-8.46, 33.21], [-8.48, 33.22])]
+
+
+def test_unknown_alert_returns_none():
+    tracker, _ = make_tracker()
+    assert tracker.update('other', 33.2, -8.5) is None
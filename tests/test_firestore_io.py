@@ -0,0 +1,55 @@
+import asyncio
+import time
+from app.services.firestore_io import FirestoreIO
+
+
+def test_calls_run_off_loop_with_bounded_concurrency():
+    io = FirestoreIO(max_workers=4)
+    ticks = []
+
+    def slow_rpc(i):
+        time.sleep(0.05)
+        return i
+
+    async def ticker():
+        # La boucle reste disponible pendant les appels bloquants
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        results, _ = await asyncio.gather(asyncio.gather(*(io.run(slow_rpc, i) for i in range(12))), ticker())
+        return results
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        io.shutdown()
+
+    assert results == list(range(12))
+    stats = io.stats()
+    assert stats['peak'] == 4 and stats['in_flight'] == 0 and stats['completed'] == 12
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.12
+
+
+def test_hospital_routing_stays_out_of_the_firestore_pool():
+    import threading
+    from app.services.hospital_firebase_service import HospitalFirebaseService
+
+    class Hospitals(HospitalFirebaseService):
+        def __init__(self):
+            self.threads = {}
+
+        def get_all_hospitals(self):
+            self.threads['firestore'] = threading.current_thread().name
+            return [{'id': 'chu', 'name': 'CHU El Jadida', 'lat': 33.23, 'lng': -8.50}]
+
+        def route_to(self, hospital, patient_lat, patient_lon, dist_vol_oiseau):
+            self.threads['ors'] = threading.current_thread().name
+            return {'distance_km': 2.0, 'duration_min': 4}
+
+    hospitals = Hospitals()
+    selected = asyncio.run(hospitals.find_nearest_hospital_async(33.25, -8.50))
+    assert selected['name'] == 'CHU El Jadida' and selected['eta_minutes'] == 4
+    assert hospitals.threads['firestore'].startswith('firestore-io')
+    assert not hospitals.threads['ors'].startswith('firestore-io')
@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.llm_cache import LLMResponseCache, cache_key
+
+
+def completion(text, tokens=None):
+    """call() d'un site d'appel : compte les vrais appels au LLM"""
+    calls = []
+
+    def call():
+        calls.append(1)
+        return text, tokens
+    return call, calls
+
+
+MESSAGES = [{'role': 'system', 'content': 'Tu es MediBot.\n    Réponds en français.'},
+            {'role': 'user', 'content': 'douleur thoracique'}]
+
+
+def test_exact_match_hits_and_saved_tokens():
+    cache = LLMResponseCache(size=10, ttl=60, path='', enabled=True)
+    call, calls = completion('réponse', tokens=120)
+    assert cache.cached_call('llama', 0.3, MESSAGES, call, max_tokens=200) == 'réponse'
+    # Même requête à l'indentation près : servie par le cache
+    reformatted = [{'role': 'system', 'content': 'Tu es MediBot. Réponds en français.'}, MESSAGES[1]]
+    assert cache.cached_call('llama', 0.3, reformatted, call, max_tokens=200) == 'réponse'
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['saved_tokens'], stats['hit_rate']) == (1, 1, 120, 0.5)
+
+
+def test_key_covers_model_temperature_and_max_tokens():
+    base = cache_key('llama', 0.3, MESSAGES, 200)
+    assert base != cache_key('llama', 0.7, MESSAGES, 200)
+    assert base != cache_key('mixtral', 0.3, MESSAGES, 200)
+    assert base != cache_key('llama', 0.3, MESSAGES, 400)
+    assert cache_key('m', 0.3, 'prompt') == cache_key('m', 0.3, [SimpleNamespace(type='user', content='prompt')])
+
+
+def test_bypass_and_ttl(clock):
+    cache = LLMResponseCache(size=10, ttl=60, path='', enabled=True, clock=clock)
+    call, calls = completion('texte')
+    cache.cached_call('llama', 0.7, MESSAGES, call, bypass=True)
+    cache.cached_call('llama', 0.7, MESSAGES, call, bypass=True)
+    assert len(calls) == 2 and cache.stats()['bypassed'] == 2
+
+    cache.cached_call('llama', 0.3, MESSAGES, call)
+    clock.now = 61
+    cache.cached_call('llama', 0.3, MESSAGES, call)
+    assert len(calls) == 4
+    # Sans usage renvoyé par l'API, les tokens sont estimés
+    assert cache.stats()['misses'] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite3')
+    call, calls = completion('protocole', tokens=300)
+    LLMResponseCache(size=10, ttl=60, path=path, enabled=True).cached_call('llama', 0.3, MESSAGES, call)
+
+    restarted = LLMResponseCache(size=10, ttl=60, path=path, enabled=True)
+    assert restarted.cached_call('llama', 0.3, MESSAGES, call) == 'protocole'
+    assert len(calls) == 1
+    assert restarted.stats()['disk_hits'] == 1 and restarted.stats()['saved_tokens'] == 300
+
+
+def test_async_calls_share_the_cache():
+    cache = LLMResponseCache(size=10, ttl=60, path='', enabled=True)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return '{"ok": true}', None
+
+    async def run():
+        return [await cache.acached_call('llama', 0.3, 'prompt', call) for _ in range(3)]
+
+    assert asyncio.run(run()) == ['{"ok": true}'] * 3
+    assert len(calls) == 1
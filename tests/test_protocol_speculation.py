@@ -0,0 +1,86 @@
+import asyncio
+from app.services.protocol_speculation import SpeculativeProtocolManager, protocol_fingerprint
+
+
+def make_generator(delay=0.0):
+    calls = []
+
+    async def generate(symptomes, age, ccmu):
+        calls.append(symptomes)
+        await asyncio.sleep(delay)
+        return {'symptomes': symptomes, 'ccmu': ccmu}
+    return generate, calls
+
+
+def test_protocol_ready_before_pickup_is_counted_in_time():
+    generate, calls = make_generator()
+    cached = []
+
+    async def cache(alert_id, entry):
+        cached.append((alert_id, entry))
+
+    async def scenario():
+        manager = SpeculativeProtocolManager(generate, cache=cache)
+        manager.start('a1', 'douleur thoracique', '60', 4)
+        await asyncio.sleep(0.01)  # trajet vers le patient
+        result = await manager.deliver('a1', 'douleur thoracique', '60', 4)
+        return manager, result
+
+    manager, result = asyncio.run(scenario())
+    assert result == {'symptomes': 'douleur thoracique', 'ccmu': 4}
+    assert calls == ['douleur thoracique']
+    assert cached[0][0] == 'a1'
+    assert cached[0][1]['fingerprint'] == protocol_fingerprint('douleur thoracique', '60', 4)
+    metrics = manager.metrics()
+    assert metrics['ready_in_time'] == 1 and metrics['waited'] == 0
+    assert metrics['ready_ratio'] == 1.0 and metrics['in_flight'] == 0
+
+
+def test_symptom_change_invalidates_and_regenerates():
+    generate, calls = make_generator(delay=0.01)
+
+    async def scenario():
+        manager = SpeculativeProtocolManager(generate)
+        manager.start('a1', 'chute', '80', 3)
+        result = await manager.deliver('a1', 'chute + perte de connaissance', '80', 3)
+        return manager, result
+
+    manager, result = asyncio.run(scenario())
+    assert result['symptomes'] == 'chute + perte de connaissance'
+    assert calls[-1] == 'chute + perte de connaissance'
+    metrics = manager.metrics()
+    assert metrics['invalidated'] == 1 and metrics['waited'] == 1 and metrics['started'] == 1
+
+
+def test_cached_protocol_is_reused_after_resume():
+    generate, calls = make_generator()
+    cached = {'fingerprint': protocol_fingerprint('Dyspnée ', '45', 3), 'protocol': {'ok': True}}
+
+    async def scenario():
+        manager = SpeculativeProtocolManager(generate)
+        return manager, await manager.deliver('a1', 'dyspnée', '45', 3, cached=cached)
+
+    manager, result = asyncio.run(scenario())
+    assert result == {'ok': True}
+    assert calls == []
+    assert manager.metrics()['cache_hits'] == 1
+
+
+def test_discarded_mission_never_caches_its_protocol():
+    generate, calls = make_generator(delay=0.05)
+    cached = []
+
+    async def cache(alert_id, entry):
+        cached.append(alert_id)
+
+    async def scenario():
+        manager = SpeculativeProtocolManager(generate, cache=cache)
+        manager.start('a1', 'douleur thoracique', '60', 4)
+        await asyncio.sleep(0)
+        assert manager.discard('a1')
+        await asyncio.sleep(0.1)
+        return manager
+
+    manager = asyncio.run(scenario())
+    assert cached == [] and manager.metrics()['in_flight'] == 0
+    assert not manager.discard('a1')
@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Flask, jsonify
+from google.cloud.firestore_v1 import DELETE_FIELD
+
+from app.services.serialization import (
+    FastJSONProvider, decode_field, dumps, is_sentinel, loads, to_firestore, to_plain
+)
+
+
+def test_to_plain_converts_typed_values_without_string_round_trip():
+    when = datetime(2024, 5, 1, 12, 30)
+    value = {'at': when, 'tags': ('a', 'b'), 'price': Decimal('1.5'), 3: None, 'gone': DELETE_FIELD}
+    assert to_plain(value) == {'at': '2024-05-01T12:30:00', 'tags': ['a', 'b'], 'price': 1.5,
+                               '3': None, 'gone': None}
+    assert is_sentinel(DELETE_FIELD) and not is_sentinel('x')
+
+
+def test_to_firestore_flattens_nested_arrays_only():
+    dispatch = {'route_coordinates': [[33.2, -8.5], [33.3, -8.4]], 'legs': [{'points': [1, 2]}]}
+    stored = to_firestore(dispatch)
+    assert stored['route_coordinates'] == ['[33.2,-8.5]', '[33.3,-8.4]']
+    assert stored['legs'] == [{'points': [1, 2]}]
+    assert to_firestore({'op': DELETE_FIELD})['op'] is DELETE_FIELD
+
+
+def test_dumps_loads_and_legacy_string_fields():
+    payload = {'b': 1, 'a': 'é', 'when': datetime(2024, 1, 1)}
+    text = dumps(payload, sort_keys=True)
+    assert json.loads(text) == {'a': 'é', 'b': 1, 'when': '2024-01-01T00:00:00'}
+    assert loads(text)['a'] == 'é'
+    # dispatch_info : dict (format actuel) ou chaîne JSON (anciennes alertes)
+    assert decode_field({'hospital': {'name': 'CHU'}}) == {'hospital': {'name': 'CHU'}}
+    assert decode_field('{"hospital": {"name": "CHU"}}') == {'hospital': {'name': 'CHU'}}
+    assert decode_field('pas du json') is None
+
+
+def test_flask_provider_keeps_flask_output_format():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    with app.app_context():
+        body = jsonify({'z': 1, 'a': datetime(2024, 1, 1)}).get_data(as_text=True)
+    assert json.loads(body) == {'a': 'Mon, 01 Jan 2024 00:00:00 GMT', 'z': 1}
+    assert body.index('"a"') < body.index('"z"')
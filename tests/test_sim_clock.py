@@ -0,0 +1,72 @@
+import asyncio
+import time
+import pytest
+from app.services.sim_clock import Clock, VirtualClock, AcceleratedClock, RealClock, get_clock
+
+
+def test_virtual_clock_skips_sleeps_and_keeps_order():
+    clock = VirtualClock()
+    events = []
+
+    async def mission(name, delay):
+        await clock.sleep(delay)
+        events.append((name, clock.now()))
+
+    async def scenario():
+        await asyncio.gather(mission('b', 3600), mission('a', 60), mission('c', 7200))
+
+    started = time.perf_counter()
+    clock.run(scenario())
+
+    assert time.perf_counter() - started < 1
+    assert events == [('a', 60), ('b', 3600), ('c', 7200)]
+    assert clock.utcnow().hour == 2
+
+
+def test_virtual_clock_does_not_expire_timeouts_while_a_thread_is_running():
+    clock = VirtualClock()
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.to_thread(time.sleep, 0.05), timeout=5)
+
+    clock.run(scenario())
+    assert clock.now() < 5
+
+
+def test_virtual_clock_fires_timeouts():
+    clock = VirtualClock()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(clock.sleep(100), timeout=10)
+
+    clock.run(scenario())
+    assert clock.now() == pytest.approx(10)
+
+
+def test_accelerated_clock_scales_sleeps():
+    clock = AcceleratedClock(factor=100)
+    started = time.perf_counter()
+    before = clock.now()
+    clock.run(clock.sleep(5))
+    assert time.perf_counter() - started < 1
+    assert clock.now() - before >= 5
+
+
+def test_get_clock_modes():
+    assert isinstance(get_clock('real'), RealClock)
+    assert get_clock('accelerated', 4).factor == 4
+    with pytest.raises(ValueError):
+        get_clock('bogus')
+
+
+def test_clock_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        Clock()
+
+    class Partial(Clock):
+        def now(self):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        Partial()
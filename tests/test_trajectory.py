@@ -0,0 +1,35 @@
+import pytest
+from app.services.trajectory import Trajectory, encode_polyline, decode_polyline, ambulance_position
+
+ROUTE = [[33.25, -8.50], [33.26, -8.50], [33.26, -8.48], [33.27, -8.47]]
+
+
+def test_polyline_round_trip():
+    assert encode_polyline([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert decode_polyline(encode_polyline(ROUTE)) == ROUTE
+
+
+def test_position_interpolates_along_cumulative_time():
+    traj = Trajectory(ROUTE, start_ts=1000, duration_s=60)
+
+    assert traj.cum_s[0] == 0 and traj.cum_s[-1] == pytest.approx(60)
+    assert traj.position_at(900) == tuple(ROUTE[0])
+    assert traj.position_at(2000) == tuple(ROUTE[-1])
+    # à mi-parcours du premier segment
+    t_mid = 1000 + traj.cum_s[1] / 2
+    lat, lng = traj.position_at(t_mid)
+    assert lat == pytest.approx(33.255) and lng == pytest.approx(-8.50)
+
+    remaining_km, remaining_s = traj.remaining_at(1030)
+    assert remaining_s == pytest.approx(30)
+    assert remaining_km == pytest.approx(traj.distance_km / 2, rel=1e-6)
+
+
+def test_serialized_trajectory_and_ambulance_position():
+    traj = Trajectory(ROUTE, start_ts=1000, duration_s=60)
+    data = traj.to_dict()
+    restored = Trajectory.from_dict(data)
+
+    assert restored.position_at(1045) == pytest.approx(traj.position_at(1045), abs=1e-5)
+    assert ambulance_position({'trajectory': data}, 1060) == pytest.approx(tuple(ROUTE[-1]))
+    assert ambulance_position({}, 1060) is None
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.services.workflow_dag import WorkflowDAG, Phase, PhaseTimeout
+
+
+def test_independent_phases_run_concurrently():
+    events = []
+
+    def step(name, delay, value):
+        async def run(results):
+            events.append(('start', name))
+            await asyncio.sleep(delay)
+            events.append(('end', name))
+            return value
+        return run
+
+    dag = WorkflowDAG([
+        Phase('triage', step('triage', 0, 3)),
+        Phase('hospital', step('hospital', 0.05, 'H'), ['triage']),
+        Phase('ambulance', step('ambulance', 0.05, 'A'), ['triage']),
+        Phase('routes', step('routes', 0, 'R'), ['hospital', 'ambulance']),
+    ])
+    results = asyncio.run(dag.run())
+
+    assert results == {'triage': 3, 'hospital': 'H', 'ambulance': 'A', 'routes': 'R'}
+    # hospital et ambulance démarrent toutes deux avant que l'une ne se termine
+    assert events.index(('start', 'ambulance')) < events.index(('end', 'hospital'))
+    assert events[-2:] == [('start', 'routes'), ('end', 'routes')]
+    assert set(dag.timings) == {'triage', 'hospital', 'ambulance', 'routes'}
+
+
+def test_resume_skips_completed_phases_and_reports_each_phase():
+    calls, done = [], []
+
+    def step(name):
+        async def run(results):
+            calls.append(name)
+            return name.upper()
+        return run
+
+    async def on_done(name, results):
+        done.append(name)
+
+    dag = WorkflowDAG([Phase('a', step('a')), Phase('b', step('b'), ['a'])])
+    results = asyncio.run(dag.run({'a': 'A'}, on_phase_done=on_done))
+    assert calls == ['b'] and done == ['b']
+    assert results == {'a': 'A', 'b': 'B'}
+
+
+def test_timeouts_abort_required_phases_but_not_optional_ones():
+    async def slow(results):
+        await asyncio.sleep(1)
+
+    dag = WorkflowDAG([Phase('llm', slow, timeout=0.01, optional=True)])
+    assert asyncio.run(dag.run()) == {'llm': None}
+
+    dag = WorkflowDAG([Phase('routes', slow, timeout=0.01)])
+    with pytest.raises(PhaseTimeout):
+        asyncio.run(dag.run())
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    async def noop(results):
+        return None
+
+    with pytest.raises(ValueError):
+        WorkflowDAG([Phase('a', noop, ['b']), Phase('b', noop, ['a'])])
+    with pytest.raises(ValueError):
+        WorkflowDAG([Phase('a', noop, ['missing'])])
+
+
+def test_critical_path_follows_longest_dependency_chain():
+    def step(delay):
+        async def run(results):
+            await asyncio.sleep(delay)
+        return run
+
+    dag = WorkflowDAG([
+        Phase('medical', step(0.02)),
+        Phase('routes', step(0.05), ['medical']),
+        Phase('specialist', step(0.01), ['medical']),
+        Phase('ui', step(0), ['routes', 'specialist']),
+    ])
+    asyncio.run(dag.run())
+    path, duration = dag.critical_path()
+    assert path == ['medical', 'routes', 'ui']
+    assert duration >= 0.07
@@ -0,0 +1,73 @@
+import time
+import pytest
+from app.services.workflow_queue import SQLiteWorkflowQueue, WorkflowQueue
+
+
+def test_claim_orders_by_priority_and_respects_leases(tmp_path):
+    queue = SQLiteWorkflowQueue(str(tmp_path / 'queue.sqlite3'))
+    queue.enqueue('a1', {'alert_id': 'a1'}, priority=1)
+    queue.enqueue('a3', {'alert_id': 'a3'}, priority=3)
+    queue.enqueue('a3', {'alert_id': 'duplicate'}, priority=3)
+
+    jobs = queue.claim('worker-1', lease_seconds=30, limit=5)
+    assert [j['id'] for j in jobs] == ['a3', 'a1']
+    assert jobs[0]['payload'] == {'alert_id': 'a3'}
+
+    # Un second processus (même fichier) ne voit rien tant que les baux sont valides
+    other = SQLiteWorkflowQueue(str(tmp_path / 'queue.sqlite3'))
+    assert other.claim('worker-2', lease_seconds=30) == []
+    assert other.pending_count() == 0
+
+
+def test_expired_lease_resumes_from_last_checkpoint(tmp_path):
+    queue = SQLiteWorkflowQueue(str(tmp_path / 'queue.sqlite3'))
+    queue.enqueue('a1', {'alert_id': 'a1'}, priority=2)
+
+    job = queue.claim('worker-1', lease_seconds=0.01)[0]
+    assert queue.checkpoint(job['id'], 'worker-1', 'DISPATCHED', {'completed': ['TRIAGE', 'DISPATCHED']})
+    time.sleep(0.05)
+
+    resumed = queue.claim('worker-2', lease_seconds=30)[0]
+    assert resumed['phase'] == 'DISPATCHED'
+    assert resumed['state']['completed'] == ['TRIAGE', 'DISPATCHED']
+    assert resumed['attempts'] == 2
+
+    # L'ancien worker a perdu son bail : ses écritures sont refusées
+    assert not queue.checkpoint('a1', 'worker-1', 'PATIENT_PICKUP', {})
+    assert queue.heartbeat('worker-1', ['a1'], 30) == []
+    assert queue.complete('a1', 'worker-2')
+    assert queue.get('a1')['status'] == 'done'
+
+
+def test_region_claims_and_cross_border_takeover(tmp_path):
+    queue = SQLiteWorkflowQueue(str(tmp_path / 'queue.sqlite3'))
+    queue.enqueue('casa', {'alert_id': 'casa'}, priority=2, region='Casablanca-Settat')
+    queue.enqueue('fes', {'alert_id': 'fes'}, priority=3, region='Fès-Meknès')
+    queue.enqueue('legacy', {'alert_id': 'legacy'}, priority=1)
+
+    jobs = queue.claim('node-a', lease_seconds=30, limit=5, regions=['Casablanca-Settat'], steal_after=60)
+    assert [j['id'] for j in jobs] == ['casa', 'legacy']
+
+    # Le nœud de Fès ne répond pas : le job est repris une fois le délai dépassé
+    time.sleep(0.05)
+    stolen = queue.claim('node-a', lease_seconds=30, regions=['Casablanca-Settat'], steal_after=0.01)
+    assert [j['id'] for j in stolen] == ['fes']
+
+
+def test_job_crashing_every_worker_fails_after_max_attempts(tmp_path):
+    queue = SQLiteWorkflowQueue(str(tmp_path / 'queue.sqlite3'), max_attempts=2)
+    queue.enqueue('poison', {'alert_id': 'poison'}, priority=2)
+
+    # Chaque worker meurt avant la fin : le bail expire sans complete()
+    for worker in ('worker-1', 'worker-2'):
+        assert queue.claim(worker, lease_seconds=0.01)[0]['id'] == 'poison'
+        time.sleep(0.03)
+
+    assert queue.claim('worker-3', lease_seconds=30) == []
+    job = queue.get('poison')
+    assert job['status'] == 'failed' and job['attempts'] == 2 and 'tentatives' in job['error']
+
+
+def test_queue_interface_is_abstract():
+    with pytest.raises(TypeError):
+        WorkflowQueue()